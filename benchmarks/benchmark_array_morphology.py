@@ -0,0 +1,104 @@
+""" Compare the memory footprint and construction time of dictionary-backed
+and array-backed morphologies.
+
+usage: python benchmarks/benchmark_array_morphology.py [num_nodes ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.constants import SOMA, AXON
+
+
+def random_columns(num_nodes, seed=0):
+    """ Columns of a random tree, in which each node's parent precedes it
+    """
+
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, num_nodes + 1)
+    parents = np.empty(num_nodes, dtype=int)
+    parents[0] = -1
+    # mostly continue the previous node, occasionally branch off an earlier one
+    parents[1:] = ids[:-1]
+    branch = rng.random(num_nodes - 1) < 0.01
+    parents[1:][branch] = rng.integers(1, ids[:-1][branch] + 1)
+
+    types = np.full(num_nodes, AXON)
+    types[0] = SOMA
+
+    return {
+        "id": ids,
+        "type": types,
+        "x": rng.normal(size=num_nodes),
+        "y": rng.normal(size=num_nodes),
+        "z": rng.normal(size=num_nodes),
+        "radius": rng.random(num_nodes),
+        "parent": parents
+    }
+
+
+def build_dict_backed(columns):
+    keys = list(columns)
+    nodes = [
+        dict(zip(keys, row))
+        for row in zip(*(columns[key].tolist() for key in keys))
+    ]
+    return Morphology(
+        nodes,
+        node_id_cb=lambda node: node["id"],
+        parent_id_cb=lambda node: node["parent"]
+    )
+
+
+def build_array_backed(columns):
+    morphology = ArrayMorphology.from_columns(
+        ids=columns["id"],
+        types=columns["type"],
+        x=columns["x"],
+        y=columns["y"],
+        z=columns["z"],
+        radius=columns["radius"],
+        parent=columns["parent"]
+    )
+    # build the parent and child indices, as the dict-backed version does
+    morphology.arrays.child_offsets
+    return morphology
+
+
+def measure(builder, columns):
+    tracemalloc.start()
+    start = time.perf_counter()
+    morphology = builder(columns)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del morphology
+    return elapsed, current, peak
+
+
+def main(sizes):
+    print(
+        f"{'nodes':>10} {'backend':>8} {'build (s)':>10} "
+        f"{'retained (MB)':>14} {'peak (MB)':>10}"
+    )
+    for num_nodes in sizes:
+        columns = random_columns(num_nodes)
+        for name, builder in (
+            ("dict", build_dict_backed),
+            ("array", build_array_backed)
+        ):
+            elapsed, current, peak = measure(builder, columns)
+            print(
+                f"{num_nodes:>10} {name:>8} {elapsed:>10.3f} "
+                f"{current / 1e6:>14.1f} {peak / 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,123 @@
+""" Measure the throughput of extracting features from many small
+reconstructions with 1 to 64 worker processes, comparing BatchExecutor with
+a pool which hydrates the global parameters for every reconstruction (as
+extract_multiple used to). Each worker holds its own copy of the hydrated
+global parameters, so large worker counts need a correspondingly large amount
+of memory.
+
+usage: python benchmarks/benchmark_batch_executor.py [num_workers ...]
+"""
+
+import sys
+import os
+import time
+import logging
+import tempfile
+import functools
+import multiprocessing as mp
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+from neuron_morphology.morphology_builder import (
+    MorphologyBuilder, NeuriteStatistics)
+from neuron_morphology.features.layer.layered_point_depths import \
+    LayeredPointDepths
+from neuron_morphology.feature_extractor.run_feature_extraction import \
+    run_feature_extraction
+from neuron_morphology.feature_extractor.batch_executor import BatchExecutor
+
+
+NUM_RECONSTRUCTIONS = 128
+
+# rows in the (global) layered point depths file
+NUM_DEPTHS = 200_000
+
+STATISTICS = {
+    AXON: NeuriteStatistics(num_stems=1, max_branch_order=4),
+    BASAL_DENDRITE: NeuriteStatistics(num_stems=3, max_branch_order=2)
+}
+
+
+def write_inputs(directory):
+    reconstructions = []
+    for index in range(NUM_RECONSTRUCTIONS):
+        nodes = MorphologyBuilder().root().random_neurites(
+            STATISTICS, seed=index).build().nodes()
+        path = os.path.join(directory, f"{index}.swc")
+        write_swc(pd.DataFrame(nodes), path)
+        reconstructions.append({"swc_path": path, "identifier": str(index)})
+
+    rng = np.random.default_rng(0)
+    depth = rng.uniform(0, 300, NUM_DEPTHS)
+    layer = np.where(depth < 100, "1", np.where(depth < 200, "2", "wm"))
+    depths_path = os.path.join(directory, "layered_point_depths.csv")
+    LayeredPointDepths(
+        ids=np.arange(NUM_DEPTHS),
+        layer_name=layer,
+        depth=depth,
+        local_layer_pia_side_depth=np.floor(depth / 100) * 100,
+        local_layer_wm_side_depth=np.floor(depth / 100) * 100 + 100,
+        point_type=rng.choice([AXON, BASAL_DENDRITE], NUM_DEPTHS)
+    ).to_csv(depths_path)
+
+    global_parameters = {
+        "layered_point_depths_path": depths_path,
+        "reference_layer_depths": {
+            "names": ["1", "2", "wm"],
+            "boundaries": [0, 100, 200, 300]
+        }
+    }
+    return reconstructions, global_parameters
+
+
+def per_reconstruction_pool(reconstructions, global_parameters, num_workers):
+    extract = functools.partial(
+        run_feature_extraction,
+        feature_set="aibs_default",
+        only_marks=None,
+        required_marks=None,
+        global_parameter_spec=global_parameters
+    )
+    with mp.Pool(num_workers) as pool:
+        for _ in pool.imap_unordered(extract, reconstructions):
+            pass
+
+
+def batch_executor(reconstructions, global_parameters, num_workers):
+    with BatchExecutor(
+        "aibs_default",
+        global_parameters=global_parameters,
+        num_processes=num_workers
+    ) as executor:
+        for _ in executor.map(reconstructions):
+            pass
+
+
+def main(worker_counts):
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        reconstructions, global_parameters = write_inputs(directory)
+
+        print(
+            f"{'workers':>8} {'per-reconstruction (rec/s)':>27} "
+            f"{'batch executor (rec/s)':>23}"
+        )
+        for num_workers in worker_counts:
+            rates = []
+            for method in (per_reconstruction_pool, batch_executor):
+                start = time.perf_counter()
+                method(reconstructions, global_parameters, num_workers)
+                rates.append(
+                    len(reconstructions) / (time.perf_counter() - start))
+            print(f"{num_workers:>8} {rates[0]:>27.1f} {rates[1]:>23.1f}")
+
+
+if __name__ == "__main__":
+    main(
+        [int(arg) for arg in sys.argv[1:]]
+        or [1, 2, 4, 8, 16, 32, 64]
+    )
@@ -0,0 +1,65 @@
+""" Compare extracting the default features from a single large
+reconstruction serially, on threads, and in worker processes.
+
+usage: python benchmarks/benchmark_concurrent_extraction.py [num_nodes ...]
+"""
+
+import sys
+import time
+import logging
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.features.default_features import default_features
+
+from benchmark_array_morphology import random_columns
+
+
+CONFIGURATIONS = (
+    {},
+    {"num_threads": 4},
+    {"num_threads": 2, "num_processes": 2},
+    {"num_threads": 4, "num_processes": 4},
+)
+
+
+def large_morphology(num_nodes):
+    columns = random_columns(num_nodes)
+    columns["type"][num_nodes // 2:] = BASAL_DENDRITE
+    columns["type"][1: num_nodes // 2] = AXON
+    arrays = ArrayMorphology.from_columns(
+        ids=columns["id"],
+        types=columns["type"],
+        x=columns["x"],
+        y=columns["y"],
+        z=columns["z"],
+        radius=columns["radius"],
+        parent=columns["parent"]
+    ).arrays
+    return Morphology.from_arrays(arrays)
+
+
+def main(sizes):
+    logging.disable(logging.WARNING)
+    extractor = FeatureExtractor(default_features)
+
+    print(f"{'nodes':>10} {'threads':>8} {'processes':>10} {'time (s)':>9}")
+    for num_nodes in sizes:
+        morphology = large_morphology(num_nodes)
+        for options in CONFIGURATIONS:
+            start = time.perf_counter()
+            extractor.extract(
+                Data(morphology), capture_errors=True, **options)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{num_nodes:>10} {options.get('num_threads', 1):>8} "
+                f"{options.get('num_processes', 0):>10} {elapsed:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [20_000, 100_000])
@@ -0,0 +1,55 @@
+""" Measure the cost of constructing a dictionary-backed Morphology, with and
+without building its compartments.
+
+usage: python benchmarks/benchmark_lazy_compartments.py [num_nodes ...]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from benchmark_array_morphology import (
+    random_columns, build_dict_backed)
+
+
+def construct(columns):
+    return build_dict_backed(columns)
+
+
+def construct_and_access_compartments(columns):
+    morphology = build_dict_backed(columns)
+    morphology.compartments
+    return morphology
+
+
+def measure(builder, columns):
+    tracemalloc.start()
+    start = time.perf_counter()
+    morphology = builder(columns)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del morphology
+    return elapsed, current, peak
+
+
+def main(sizes):
+    print(
+        f"{'nodes':>10} {'compartments':>12} {'build (s)':>10} "
+        f"{'retained (MB)':>14} {'peak (MB)':>10}"
+    )
+    for num_nodes in sizes:
+        columns = random_columns(num_nodes)
+        for name, builder in (
+            ("lazy", construct),
+            ("accessed", construct_and_access_compartments)
+        ):
+            elapsed, current, peak = measure(builder, columns)
+            print(
+                f"{num_nodes:>10} {name:>12} {elapsed:>10.3f} "
+                f"{current / 1e6:>14.1f} {peak / 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
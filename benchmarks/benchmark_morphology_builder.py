@@ -0,0 +1,69 @@
+""" Compare building large synthetic morphologies node by node through
+MorphologyBuilder's fluent interface with building them in bulk.
+
+usage: python benchmarks/benchmark_morphology_builder.py [num_nodes ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from neuron_morphology.morphology_builder import (
+    MorphologyBuilder, NeuriteStatistics)
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+
+
+def fluent(num_nodes):
+    builder = MorphologyBuilder().root(0, 0, 0)
+    for ii in range(1, num_nodes):
+        builder.axon(0, 0, ii)
+    return builder.build()
+
+
+def bulk(num_nodes):
+    xyz = np.zeros((num_nodes - 1, 3))
+    xyz[:, 2] = np.arange(1, num_nodes)
+    return MorphologyBuilder().root(0, 0, 0).add_arrays(
+        np.arange(-1, num_nodes - 2), xyz, AXON).build(array_backed=True)
+
+
+def random_statistics(num_nodes):
+    """ Statistics producing (roughly) num_nodes nodes
+    """
+
+    num_stems = max(num_nodes // 20_000, 1)
+    mean_branch_length = num_nodes / (num_stems * 2 * 2 ** 10)
+    return {
+        AXON: NeuriteStatistics(
+            num_stems=num_stems, mean_branch_length=mean_branch_length,
+            bifurcation_probability=1, max_branch_order=9),
+        BASAL_DENDRITE: NeuriteStatistics(
+            num_stems=num_stems, mean_branch_length=mean_branch_length,
+            bifurcation_probability=1, max_branch_order=9),
+    }
+
+
+def random(num_nodes):
+    return MorphologyBuilder().root(0, 0, 0).random_neurites(
+        random_statistics(num_nodes), seed=0).build(array_backed=True)
+
+
+def timed(builder, num_nodes):
+    start = time.perf_counter()
+    morphology = builder(num_nodes)
+    return time.perf_counter() - start, len(morphology)
+
+
+def main(sizes):
+    print(f"{'nodes':>10} {'builder':>8} {'built':>10} {'time (s)':>10}")
+    for num_nodes in sizes:
+        for name, builder in (
+            ("fluent", fluent), ("bulk", bulk), ("random", random)
+        ):
+            elapsed, built = timed(builder, num_nodes)
+            print(f"{num_nodes:>10} {name:>8} {built:>10} {elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,69 @@
+""" Compare extracting the batched default features (see features.batched)
+from a MorphologyCollection against extracting them one reconstruction at a
+time.
+
+usage: python benchmarks/benchmark_morphology_collection.py [num_cells ...]
+"""
+
+import sys
+import time
+
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_collection import MorphologyCollection
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.features.default_features import default_features
+from neuron_morphology.features.batched import BATCHED_KERNELS, base_function
+
+from benchmark_array_morphology import random_columns
+
+
+def random_morphology(num_nodes, seed):
+    columns = random_columns(num_nodes, seed=seed)
+    # give the second half of each tree's nodes dendritic type
+    columns["type"][num_nodes // 2:] = BASAL_DENDRITE
+    columns["type"][1: num_nodes // 2] = AXON
+    arrays = ArrayMorphology.from_columns(
+        ids=columns["id"],
+        types=columns["type"],
+        x=columns["x"],
+        y=columns["y"],
+        z=columns["z"],
+        radius=columns["radius"],
+        parent=columns["parent"]
+    ).arrays
+    return Morphology.from_arrays(arrays)
+
+
+def main(sizes, num_nodes=2000):
+    extractor = FeatureExtractor(default_features)
+    extractor.features = [
+        feature for feature in extractor.features
+        if base_function(feature) in BATCHED_KERNELS
+    ]
+
+    print(f"{'cells':>8} {'per-cell (s)':>13} {'collection (s)':>15}")
+    for num_cells in sizes:
+        morphologies = {
+            str(seed): random_morphology(num_nodes, seed)
+            for seed in range(num_cells)
+        }
+
+        start = time.perf_counter()
+        for morphology in morphologies.values():
+            extractor.extract(Data(morphology))
+        per_cell = time.perf_counter() - start
+
+        start = time.perf_counter()
+        collection = MorphologyCollection.from_morphologies(morphologies)
+        extractor.extract_collection(collection).build_output_table()
+        batched = time.perf_counter() - start
+
+        print(f"{num_cells:>8} {per_cell:>13.3f} {batched:>15.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 100, 500])
@@ -0,0 +1,98 @@
+""" Compare the time taken to load swc files using the pandas-based reader
+and the numpy tokenizer-based reader, and to write them using pandas and
+the chunked array writer (with and without gzip compression).
+
+usage: python benchmarks/benchmark_swc_io.py [num_nodes ...]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import pandas as pd
+
+from neuron_morphology.morphology import Morphology
+import neuron_morphology.swc_io as swc_io
+
+from benchmark_array_morphology import random_columns
+
+
+def legacy_morphology_from_swc(swc_path):
+    """ The pandas-based loading path, as it was before read_swc_records
+    """
+
+    swc_data = swc_io.read_swc(swc_path, sep=" ")
+
+    nodes = swc_data.to_dict("records")
+    for node in nodes:
+        node["parent"] = int(node["parent"])
+        node["id"] = int(node["id"])
+        node["type"] = int(node["type"])
+
+    return Morphology(
+        nodes,
+        node_id_cb=lambda node: node["id"],
+        parent_id_cb=lambda node: node["parent"],
+    )
+
+
+def legacy_morphology_to_swc(morphology, swc_path):
+    """ The pandas-based writing path, as it was before write_swc_arrays
+    """
+
+    data = pd.DataFrame(morphology.nodes())
+    data = data[list(swc_io.SWC_COLUMNS)]
+    data.to_csv(swc_path, sep=" ", index=False, header=None)
+
+
+def write_random_swc(path, num_nodes):
+    data = pd.DataFrame(random_columns(num_nodes))
+    swc_io.write_swc(data, path, comments=[f"{num_nodes} random nodes"])
+
+
+def timed(loader, path):
+    start = time.perf_counter()
+    loader(path)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    loaders = (
+        ("pandas parse", swc_io.read_swc),
+        ("numpy parse", swc_io.read_swc_records),
+        ("pandas Morphology", legacy_morphology_from_swc),
+        ("numpy Morphology", swc_io.morphology_from_swc),
+        ("numpy ArrayMorphology", swc_io.array_morphology_from_swc),
+    )
+
+    print(f"{'nodes':>10} {'loader':>22} {'time (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_nodes in sizes:
+            path = os.path.join(tmp_dir, f"random_{num_nodes}.swc")
+            write_random_swc(path, num_nodes)
+
+            for name, loader in loaders:
+                print(
+                    f"{num_nodes:>10} {name:>22} "
+                    f"{timed(loader, path):>10.3f}"
+                )
+
+            morphology = swc_io.array_morphology_from_swc(path)
+            writers = (
+                ("pandas write", legacy_morphology_to_swc, ".swc"),
+                ("array write", swc_io.morphology_to_swc, ".swc"),
+                ("array write gz", swc_io.morphology_to_swc, ".swc.gz"),
+            )
+            for name, writer, suffix in writers:
+                out_path = os.path.join(tmp_dir, f"out_{num_nodes}{suffix}")
+                elapsed = timed(
+                    lambda target: writer(morphology, target), out_path)
+                print(
+                    f"{num_nodes:>10} {name:>22} {elapsed:>10.3f} "
+                    f"({os.path.getsize(out_path) / 1e6:.1f} MB)"
+                )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000])
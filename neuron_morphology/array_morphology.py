@@ -0,0 +1,475 @@
+""" An array-backed Morphology. Rather than storing a dictionary per node,
+ArrayMorphology keeps its nodes in a MorphologyArrays (contiguous id, type,
+parent, coordinate and radius columns plus a CSR child index). Node
+dictionaries requested through the Morphology API are lightweight views onto
+these columns.
+"""
+
+from typing import (
+    Optional, Dict, Any, List, Iterator, Sequence, Mapping as MappingType)
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_arrays import (
+    MorphologyArrays, NO_INDEX)
+
+
+# the keys of each node, in swc column order
+NODE_KEYS = ("id", "type", "x", "y", "z", "radius", "parent")
+_XYZ_AXES = {"x": 0, "y": 1, "z": 2}
+
+
+def node_id(node: MappingType[str, Any]) -> int:
+    """ The default node id callback of array-backed morphologies
+    """
+    return node["id"]
+
+
+class ArrayNode(MutableMapping):
+
+    __slots__ = ["_morphology", "_index"]
+
+    def __init__(self, morphology: "ArrayMorphology", index: int):
+        """ A dictionary-like view of a single node in an ArrayMorphology.
+        Reads and writes go directly to the morphology's arrays.
+
+        Parameters
+        ----------
+        morphology : the owner of this node's data
+        index : the storage index (not id!) of this node
+
+        """
+
+        self._morphology = morphology
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        arrays = self._morphology.arrays
+        index = self._index
+
+        if key in _XYZ_AXES:
+            return float(arrays.xyz[index, _XYZ_AXES[key]])
+        elif key == "id":
+            return arrays.ids[index].item()
+        elif key == "type":
+            return int(arrays.types[index])
+        elif key == "radius":
+            return float(arrays.radius[index])
+        elif key == "parent":
+            return arrays.parent_ids[index].item()
+        elif key in self._morphology.extra_columns:
+            value = self._morphology.extra_columns[key][index]
+            return value.item() if isinstance(value, np.generic) else value
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        self._morphology.set_node_value(self._index, key, value)
+
+    def __delitem__(self, key: str):
+        raise TypeError(
+            "cannot remove keys from the nodes of an ArrayMorphology")
+
+    def __iter__(self) -> Iterator[str]:
+        yield from NODE_KEYS
+        yield from self._morphology.extra_columns
+
+    def __len__(self) -> int:
+        return len(NODE_KEYS) + len(self._morphology.extra_columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __eq__(self, other):
+        if isinstance(other, ArrayNode) \
+                and other._morphology is self._morphology:
+            return self._index == other._index
+        return super(ArrayNode, self).__eq__(other)
+
+    __hash__ = None
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+class _NodeMapping(Mapping):
+    """ Maps node ids to ArrayNodes. Stands in for Morphology._nodes
+    """
+
+    def __init__(self, morphology: "ArrayMorphology"):
+        self._morphology = morphology
+
+    def __getitem__(self, node_id):
+        index = self._morphology.arrays.index_of_id(node_id)
+        return ArrayNode(self._morphology, index)
+
+    def __iter__(self):
+        return iter(self._morphology.arrays.ids.tolist())
+
+    def __len__(self):
+        return len(self._morphology.arrays)
+
+    def values(self):
+        return self._morphology.nodes_at(np.arange(len(self)))
+
+
+class _ParentIdMapping(Mapping):
+    """ Maps node ids to parent ids (or None, for roots). Stands in for
+    Morphology._parent_ids
+    """
+
+    def __init__(self, morphology: "ArrayMorphology"):
+        self._morphology = morphology
+
+    def __getitem__(self, node_id):
+        arrays = self._morphology.arrays
+        parent = arrays.parent_index[arrays.index_of_id(node_id)]
+        return None if parent == NO_INDEX else arrays.ids[parent].item()
+
+    def __iter__(self):
+        return iter(self._morphology.arrays.ids.tolist())
+
+    def __len__(self):
+        return len(self._morphology.arrays)
+
+
+class _ChildIdMapping(Mapping):
+    """ Maps node ids to lists of child ids. Stands in for
+    Morphology._child_ids
+    """
+
+    def __init__(self, morphology: "ArrayMorphology"):
+        self._morphology = morphology
+
+    def __getitem__(self, node_id):
+        arrays = self._morphology.arrays
+        children = arrays.children_of_index(arrays.index_of_id(node_id))
+        return arrays.ids[children].tolist()
+
+    def __iter__(self):
+        return iter(self._morphology.arrays.ids.tolist())
+
+    def __len__(self):
+        return len(self._morphology.arrays)
+
+
+class _CompartmentMapping(Mapping):
+    """ Maps the ids of non-root nodes to [parent, node] compartments. Stands
+    in for Morphology.compartments_for_nodes
+    """
+
+    def __init__(self, morphology: "ArrayMorphology"):
+        self._morphology = morphology
+
+    def __getitem__(self, node_id):
+        arrays = self._morphology.arrays
+        index = arrays.index_of_id(node_id)
+        parent = arrays.parent_index[index]
+        if parent == NO_INDEX:
+            raise KeyError(node_id)
+        return [
+            ArrayNode(self._morphology, int(parent)),
+            ArrayNode(self._morphology, index)
+        ]
+
+    def __iter__(self):
+        arrays = self._morphology.arrays
+        return iter(arrays.ids[arrays.parent_index != NO_INDEX].tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(
+            self._morphology.arrays.parent_index != NO_INDEX))
+
+
+class ArrayMorphology(Morphology):
+
+    def __init__(
+        self,
+        arrays: MorphologyArrays,
+        extra_columns: Optional[Dict[str, Sequence[Any]]] = None
+    ):
+        """ A Morphology whose nodes are stored as contiguous arrays. Supports
+        the Morphology API, but uses far less memory than a dictionary-backed
+        Morphology and allows vectorized calculations over all nodes (see
+        the arrays property).
+
+        Parameters
+        ----------
+        arrays : holds the id, parent, type, position and radius of each node
+        extra_columns : additional per-node values (e.g. "layer"), keyed by
+            name. Each must have one entry per node.
+
+        """
+
+        self._storage: MorphologyArrays = arrays
+        self.extra_columns: Dict[str, np.ndarray] = {}
+        for name, values in (extra_columns or {}).items():
+            values = np.asarray(values)
+            if len(values) != len(arrays):
+                raise ValueError(
+                    f"extra column {name} has {len(values)} values, but this "
+                    f"morphology has {len(arrays)} nodes"
+                )
+            self.extra_columns[name] = values
+
+        self.node_id_cb = node_id
+        self.parent_id_cb = self._parent_id_cb = self._parent_id_of
+
+        self._nodes = _NodeMapping(self)
+        self._parent_ids = _ParentIdMapping(self)
+        self._child_ids = _ChildIdMapping(self)
+        self.compartments_for_nodes = _CompartmentMapping(self)
+
+    def __getstate__(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_columns(
+        cls,
+        ids: Sequence[int],
+        types: Sequence[int],
+        x: Sequence[float],
+        y: Sequence[float],
+        z: Sequence[float],
+        radius: Sequence[float],
+        parent: Sequence[int],
+        **extra_columns: Sequence[Any]
+    ) -> "ArrayMorphology":
+        """ Build an ArrayMorphology from swc-like columns. Nodes whose parent
+        is not present (e.g. -1) are roots.
+        """
+
+        return cls(
+            MorphologyArrays(
+                ids=ids,
+                parent_ids=parent,
+                types=types,
+                xyz=np.stack([
+                    np.asarray(x, dtype=float),
+                    np.asarray(y, dtype=float),
+                    np.asarray(z, dtype=float)
+                ], axis=1),
+                radius=radius
+            ),
+            extra_columns=extra_columns
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: MorphologyArrays) -> "ArrayMorphology":
+        """ Build an ArrayMorphology which stores these arrays directly
+        """
+
+        return cls(arrays)
+
+    @classmethod
+    def from_morphology(cls, morphology: Morphology) -> "ArrayMorphology":
+        """ Convert a Morphology (of any kind) to an ArrayMorphology
+        """
+
+        if isinstance(morphology, ArrayMorphology):
+            extra = {
+                name: values.copy()
+                for name, values in morphology.extra_columns.items()
+            }
+            return cls(morphology.arrays.copy(), extra_columns=extra)
+
+        arrays = morphology.arrays.copy()
+        nodes = morphology.nodes()
+        extra_keys = {key for node in nodes for key in node} - set(NODE_KEYS)
+        extra = {
+            key: np.array([node.get(key) for node in nodes], dtype=object)
+            for key in extra_keys
+        }
+        return cls(arrays, extra_columns=extra)
+
+    @property
+    def arrays(self) -> MorphologyArrays:
+        """ The storage of this morphology. See MorphologyArrays.
+        """
+        return self._storage
+
+    @property
+    def compartments(self) -> List[List[ArrayNode]]:
+        return self.get_compartments()
+
+    def __len__(self):
+        return len(self._storage)
+
+    def _parent_id_of(self, node):
+        parent = self._storage.parent_index[node._index] \
+            if isinstance(node, ArrayNode) and node._morphology is self \
+            else self._storage.parent_index[
+                self._storage.index_of_id(node["id"])]
+        return None if parent == NO_INDEX else self._storage.ids[parent].item()
+
+    def node_at(self, index: int) -> ArrayNode:
+        """ Get the node stored at this index
+        """
+        return ArrayNode(self, int(index))
+
+    def nodes_at(self, indices: Any) -> List[ArrayNode]:
+        """ Get the nodes stored at each of these indices
+        """
+        return [ArrayNode(self, index) for index in np.asarray(indices).tolist()]
+
+    def set_node_value(self, index: int, key: str, value: Any):
+        """ Update a single value of a single node.
+
+        Parameters
+        ----------
+        index : the storage index of the node to update
+        key : which value to update (e.g. "x" or "radius")
+        value : the new value
+
+        """
+
+        arrays = self._storage
+        if key in _XYZ_AXES:
+            arrays.writable("xyz")[index, _XYZ_AXES[key]] = value
+        elif key == "radius":
+            arrays.writable("radius")[index] = value
+        elif key == "type":
+            arrays.writable("types")[index] = value
+            arrays.reset_index()
+        elif key == "parent":
+            arrays.writable("parent_ids")[index] = value
+            arrays.reset_index()
+        elif key == "id":
+            raise ValueError(
+                "the ids of nodes in an ArrayMorphology cannot be modified")
+        else:
+            if key not in self.extra_columns:
+                self.extra_columns[key] = np.full(len(arrays), None, dtype=object)
+            self.extra_columns[key][index] = value
+
+    def invalidate_caches(self):
+        self._storage.reset_index()
+
+    def refresh_caches(self) -> bool:
+        # nodes are views of the arrays, so that cached data cannot be stale
+        return False
+
+    def in_preorder(self, renumber=False):
+        """ Copy this morphology, storing its nodes (and extra columns) in
+        depth-first preorder. See Morphology.in_preorder.
+        """
+
+        order = self.arrays.subtrees.order
+        return self.__class__(
+            self.arrays.in_preorder(renumber),
+            extra_columns={
+                name: values[order]
+                for name, values in self.extra_columns.items()
+            }
+        )
+
+    def clone(self):
+        """ Make a copy of this morphology which shares its arrays until
+        either is modified (see MorphologyArrays.clone)
+        """
+
+        return self.__class__(
+            self._storage.clone(),
+            extra_columns={
+                name: values.copy()
+                for name, values in self.extra_columns.items()
+            }
+        )
+
+    def set_coordinates(self, xyz, radius=None):
+        self._storage.set_column("xyz", xyz)
+        if radius is not None:
+            self._storage.set_column("radius", radius)
+
+    def node_ids(self):
+        return self._storage.ids.tolist()
+
+    def nodes(self, node_ids=None):
+        if node_ids is None:
+            return self.nodes_at(np.arange(len(self)))
+        indices = self._storage.index_of(list(node_ids)).tolist()
+        return [
+            None if index == NO_INDEX else ArrayNode(self, index)
+            for index in indices
+        ]
+
+    def node_by_id(self, node_id):
+        return ArrayNode(self, self._storage.index_of_id(node_id))
+
+    def parent_ids(self, node_ids):
+        return [self._parent_ids[nid] for nid in node_ids]
+
+    def child_ids(self, node_ids):
+        return [self._child_ids[nid] for nid in node_ids]
+
+    def children_of(self, node):
+        if node:
+            index = self._storage.index_of_id(node["id"])
+            return self.nodes_at(self._storage.children_of_index(index))
+        return None
+
+    def parent_of(self, node):
+        if node:
+            index = self._storage.index_of_id(node["id"])
+            parent = self._storage.parent_index[index]
+            if parent != NO_INDEX:
+                return ArrayNode(self, int(parent))
+        return None
+
+    def get_max_id(self):
+        return self._storage.ids.max().item()
+
+    def get_compartments(self, nodes=None, node_types=None):
+        if nodes:
+            return super(ArrayMorphology, self).get_compartments(
+                nodes, node_types)
+
+        arrays = self._storage
+        children = np.flatnonzero(arrays.parent_index != NO_INDEX)
+        parents = arrays.parent_index[children]
+        if node_types:
+            keep = np.isin(arrays.types[parents], node_types)
+            children = children[keep]
+            parents = parents[keep]
+        return [
+            [ArrayNode(self, parent), ArrayNode(self, child)]
+            for parent, child in zip(parents.tolist(), children.tolist())
+        ]
+
+    def get_dimensions(self, node_types=None):
+        arrays = self._storage
+        if node_types:
+            xyz = arrays.xyz[np.isin(arrays.types, node_types)]
+            if len(xyz) == 0:
+                return None
+        else:
+            xyz = arrays.xyz
+
+        min_xyz = xyz.min(axis=0).tolist()
+        max_xyz = xyz.max(axis=0).tolist()
+        size = [high - low for low, high in zip(min_xyz, max_xyz)]
+        return size, min_xyz, max_xyz
+
+    def _insert_between(self, new_node, parent_id, child_id, set_parent_id_cb):
+        """ Add a node to this morphology between a parent and its child.
+        Note that this requires reallocating this morphology's arrays. Prefer
+        building a new morphology when inserting many nodes.
+        """
+
+        old = self._storage
+        self._storage = MorphologyArrays(
+            ids=np.append(old.ids, new_node["id"]),
+            parent_ids=np.append(old.parent_ids, parent_id),
+            types=np.append(old.types, new_node["type"]),
+            xyz=np.concatenate([
+                old.xyz,
+                [[new_node["x"], new_node["y"], new_node["z"]]]
+            ]),
+            radius=np.append(old.radius, new_node.get("radius", np.nan))
+        )
+        for name, values in self.extra_columns.items():
+            self.extra_columns[name] = np.append(
+                values, np.array([new_node.get(name)], dtype=values.dtype))
+
+        set_parent_id_cb(self.node_by_id(child_id), new_node["id"])
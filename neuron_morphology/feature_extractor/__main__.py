@@ -1,7 +1,6 @@
 import copy as cp
 import logging
 import multiprocessing as mp
-import functools
 from typing import Dict, Any, Tuple, List, Set, Optional, Type
 
 from argschema import ArgSchemaParser
@@ -9,8 +8,8 @@ from argschema import ArgSchemaParser
 from neuron_morphology.feature_extractor._schemas import (
     InputParameters, OutputParameters)
 
-from neuron_morphology.feature_extractor.run_feature_extraction import \
-    run_feature_extraction
+from neuron_morphology.feature_extractor.batch_executor import (
+    BatchExecutor, MAX_TASKS_PER_CHILD)
 
 from neuron_morphology.feature_extractor.feature_writer import (
     FeatureWriter, DEFAULT_FEATURE_FORMATTERS)
@@ -24,13 +23,15 @@ def extract_multiple(
     only_marks: Optional[List[str]] = None,
     num_processes: Optional[int] = None,
     global_parameters: Optional[Dict[str, Any]] = None,
-    output_table_path: Optional[str] = None
+    output_table_path: Optional[str] = None,
+    max_in_flight: Optional[int] = None,
+    max_tasks_per_child: Optional[int] = MAX_TASKS_PER_CHILD
 ):
     """ For each path in swc_paths, load the file into a morphology and (attempt 
     to) extract each feature in the set specified by feature_set.
 
-    Because of how Windows handles multiprocessing, run_feature_extraction
-    must be in another py file.
+    Because of how Windows handles multiprocessing, the worker functions
+    (see batch_executor) must be in another py file.
 
     Parameters
     ----------
@@ -44,6 +45,10 @@ def extract_multiple(
     global_parameters : a dictionary specifying cross-reconstruction
         parameters
     output_table_path : if not none, write a flattened table of features here
+    max_in_flight : the most reconstructions queued for or being processed by 
+        workers at once (see BatchExecutor)
+    max_tasks_per_child : replace each worker process after it has processed 
+        this many chunks of reconstructions
 
     Returns
     -------
@@ -55,30 +60,23 @@ def extract_multiple(
     num_processes = num_processes if num_processes else mp.cpu_count()
     num_processes = min(num_processes, len(reconstructions))
 
-    global_parameters = {} if global_parameters is None else global_parameters
-
-    extract = functools.partial(
-        run_feature_extraction,
-        feature_set=feature_set,
-        only_marks=only_marks,
-        required_marks=required_marks,
-        global_parameter_spec=global_parameters
-    )
-
-    if num_processes > 1:
-        pool = mp.Pool(num_processes)
-        mapper = pool.imap_unordered(extract, reconstructions)
-    else:
-        mapper = (extract(morph) for morph in reconstructions) # type: ignore[assignment]
-
     writer = FeatureWriter(
         heavy_output_path,
         output_table_path,
         formatters=DEFAULT_FEATURE_FORMATTERS
     )
 
-    for identifier, run in mapper:
-        writer.add_run(identifier, run)
+    with BatchExecutor(
+        feature_set,
+        only_marks=only_marks,
+        required_marks=required_marks,
+        global_parameters=global_parameters,
+        num_processes=num_processes,
+        max_in_flight=max_in_flight,
+        max_tasks_per_child=max_tasks_per_child
+    ) as executor:
+        for identifier, run in executor.map(reconstructions):
+            writer.add_run(identifier, run)
 
     return writer.write()
 
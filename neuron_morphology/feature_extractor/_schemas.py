@@ -163,6 +163,26 @@ class InputParameters(ArgSchema):
         default=None,
         allow_none=True
     )
+    max_in_flight = Int(
+        description=(
+            "At most this many reconstructions are queued for or being "
+            "processed by the pool at once, bounding memory use. Default is "
+            "8 per process."
+        ),
+        required=False,
+        default=None,
+        allow_none=True
+    )
+    max_tasks_per_child = Int(
+        description=(
+            "Replace each pool process after it has processed this many "
+            "chunks of reconstructions. Set to null to keep processes for "
+            "the whole run."
+        ),
+        required=False,
+        default=64,
+        allow_none=True
+    )
     global_parameters = Nested(
         GlobalParameters, 
         description=(
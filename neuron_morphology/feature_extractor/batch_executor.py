@@ -0,0 +1,278 @@
+""" Extract features from many reconstructions using a pool of worker
+processes (see BatchExecutor). Each worker prepares its feature extractor and
+hydrates the global parameters (e.g. reads layered point depths) once, rather
+than once per reconstruction.
+
+Like run_feature_extraction, this must be in a separate py file from
+__main__ due to how Windows handles multiprocessing.
+"""
+
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type)
+import itertools
+import multiprocessing as mp
+import queue
+import time
+
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.run_feature_extraction import (
+    resolve_feature_set, resolve_marks, hydrate_parameters, setup_data)
+
+
+# by default, keep this many reconstructions in flight per worker
+IN_FLIGHT_PER_PROCESS = 8
+
+# by default, replace each worker after it has processed this many chunks
+MAX_TASKS_PER_CHILD = 64
+
+# by default, size chunks to take about this long (in seconds) to process
+TARGET_CHUNK_SECONDS = 0.5
+
+# the weight of the latest chunk in the running estimate of the time taken
+# to process one reconstruction
+_SMOOTHING = 0.25
+
+
+class _BatchWorker:
+
+    def __init__(
+        self,
+        feature_set: str,
+        only_marks: Optional[List[str]],
+        required_marks: Optional[List[str]],
+        global_parameters: Dict[str, Any]
+    ):
+        """ The state shared by all tasks processed by a worker: a feature
+        extractor, the marks it uses, and hydrated global parameters.
+        """
+
+        self.extractor = FeatureExtractor(resolve_feature_set(feature_set))
+        self.only_marks: Optional[Set[Type[Mark]]] = \
+            resolve_marks(only_marks) if only_marks is not None else None
+        self.required_marks: Set[Type[Mark]] = \
+            resolve_marks(required_marks) if required_marks is not None \
+            else set()
+        self.global_parameters = hydrate_parameters(global_parameters)
+
+    def extract(
+        self,
+        reconstructions: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[str, Dict]], float]:
+        """ Extract features from a chunk of reconstructions
+
+        Returns
+        -------
+        outputs : the identifier and serialized run of each reconstruction
+        elapsed : the time taken (in seconds)
+
+        """
+
+        start = time.perf_counter()
+        outputs = []
+        for reconstruction in reconstructions:
+            identifier, data = setup_data(
+                dict(reconstruction),
+                self.global_parameters,
+                hydrate_global_parameters=False
+            )
+            run = self.extractor.extract(
+                data,
+                only_marks=self.only_marks,
+                required_marks=self.required_marks
+            )
+            outputs.append((identifier, run.serialize()))
+        return outputs, time.perf_counter() - start
+
+
+# this worker process's state. See _initialize_worker
+_worker: Optional[_BatchWorker] = None
+
+
+def _initialize_worker(*args):
+    global _worker
+    _worker = _BatchWorker(*args)
+
+
+def _extract_chunk(
+    reconstructions: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[str, Dict]], float]:
+    return _worker.extract(reconstructions)  # type: ignore[union-attr]
+
+
+class BatchExecutor:
+
+    def __init__(
+        self,
+        feature_set: str,
+        only_marks: Optional[List[str]] = None,
+        required_marks: Optional[List[str]] = None,
+        global_parameters: Optional[Dict[str, Any]] = None,
+        num_processes: int = 1,
+        max_in_flight: Optional[int] = None,
+        max_tasks_per_child: Optional[int] = MAX_TASKS_PER_CHILD,
+        target_chunk_seconds: float = TARGET_CHUNK_SECONDS
+    ):
+        """ Extracts features from many reconstructions in a pool of worker
+        processes. Use as a context manager, so that the pool is shut down
+        cleanly.
+
+        Parameters
+        ----------
+        feature_set : names the set of features for which calculation will
+            be attempted
+        only_marks : names marks to which calculation will be restricted
+        required_marks : raise an exception if these named marks fail
+            validation
+        global_parameters : cross-reconstruction parameters. These are sent
+            to and hydrated by each worker once.
+        num_processes : use this many worker processes. If 1 or fewer,
+            extract in this process.
+        max_in_flight : the most reconstructions sent to workers whose
+            results have not yet been received. This bounds the memory used
+            by queued tasks and results. Defaults to IN_FLIGHT_PER_PROCESS
+            per worker.
+        max_tasks_per_child : replace each worker after it has processed
+            this many chunks, releasing memory it has accumulated. If None,
+            workers are kept for the life of the pool.
+        target_chunk_seconds : reconstructions are sent to workers in chunks
+            sized (based on the time taken by previous chunks) to take about
+            this long
+
+        """
+
+        self.num_processes = num_processes
+        self.max_in_flight: int = max(
+            max_in_flight if max_in_flight is not None
+            else IN_FLIGHT_PER_PROCESS * num_processes,
+            1
+        )
+        self.max_tasks_per_child = max_tasks_per_child
+        self.target_chunk_seconds = target_chunk_seconds
+
+        self._worker_args = (
+            feature_set,
+            only_marks,
+            required_marks,
+            {} if global_parameters is None else global_parameters
+        )
+        self._seconds_per_reconstruction: Optional[float] = None
+        self._pool: Optional[Any] = None
+
+    def __enter__(self):
+        if self.num_processes > 1:
+            self._pool = mp.Pool(
+                self.num_processes,
+                initializer=_initialize_worker,
+                initargs=self._worker_args,
+                maxtasksperchild=self.max_tasks_per_child
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def close(self):
+        """ Wait for submitted work to finish, then stop the workers
+        """
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def terminate(self):
+        """ Stop the workers immediately, abandoning submitted work
+        """
+
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def chunksize(self) -> int:
+        """ The number of reconstructions to send to a worker at once. This
+        is 1 until a chunk has been timed, and never more than an even share
+        of max_in_flight.
+        """
+
+        if self._seconds_per_reconstruction is None:
+            return 1
+
+        size = int(round(
+            self.target_chunk_seconds
+            / max(self._seconds_per_reconstruction, 1e-6)
+        ))
+        share = self.max_in_flight // max(self.num_processes, 1)
+        return max(1, min(size, share))
+
+    def _observe(self, num_reconstructions: int, elapsed: float):
+        """ Update the estimated time taken to process one reconstruction
+        """
+
+        latest = elapsed / max(num_reconstructions, 1)
+        if self._seconds_per_reconstruction is None:
+            self._seconds_per_reconstruction = latest
+        else:
+            self._seconds_per_reconstruction = (
+                _SMOOTHING * latest
+                + (1 - _SMOOTHING) * self._seconds_per_reconstruction
+            )
+
+    def map(
+        self,
+        reconstructions: Iterable[Dict[str, Any]]
+    ) -> Iterator[Tuple[str, Dict]]:
+        """ Extract features from each reconstruction. Reconstructions are
+        consumed lazily, so this may be a generator.
+
+        Yields
+        ------
+        The identifier and serialized run of each reconstruction, in the
+            order in which they are completed
+
+        """
+
+        if self._pool is None:
+            worker = _BatchWorker(*self._worker_args)
+            for reconstruction in reconstructions:
+                outputs, _ = worker.extract([reconstruction])
+                yield from outputs
+            return
+
+        remaining = iter(reconstructions)
+        completed: queue.Queue = queue.Queue()
+        in_flight = 0
+        exhausted = False
+
+        while True:
+            while not exhausted and in_flight < self.max_in_flight:
+                size = min(self.chunksize(), self.max_in_flight - in_flight)
+                chunk = list(itertools.islice(remaining, size))
+                if not chunk:
+                    exhausted = True
+                    break
+
+                self._pool.apply_async(
+                    _extract_chunk,
+                    (chunk,),
+                    callback=completed.put,
+                    error_callback=completed.put
+                )
+                in_flight += len(chunk)
+
+            if in_flight == 0:
+                return
+
+            result = completed.get()
+            if isinstance(result, BaseException):
+                raise result
+
+            outputs, elapsed = result
+            in_flight -= len(outputs)
+            self._observe(len(outputs), elapsed)
+            yield from outputs
@@ -0,0 +1,341 @@
+from typing import (
+    AbstractSet, Any, Callable, Collection, Dict, List, Mapping, Optional,
+    Type)
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.constants import (
+    SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_collection import MorphologyCollection
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor.intermediate import keyword_arguments
+from neuron_morphology.feature_extractor.feature_extraction_run import \
+    FeatureExtractionRun
+from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.feature_extractor.mark import (
+    Mark, RequiresAxon, RequiresApical, RequiresBasal, RequiresDendrite,
+    RequiresSoma, RequiresRoot, RequiresRadii)
+from neuron_morphology.features.batched import (
+    BATCHED_KERNELS, BatchedKernel, base_function)
+
+
+# marks reconstructions for which a feature calculated one reconstruction at a
+# time produced no value for some key
+_MISSING = object()
+
+
+def _validate_root(collection: MorphologyCollection) -> np.ndarray:
+    num_roots = collection.num_roots()
+    multiply_rooted = int(np.count_nonzero(num_roots > 1))
+    if multiply_rooted:
+        warnings.warn(
+            f"{multiply_rooted} morphologies are not uniquely rooted! "
+            "Features using the root node of these morphologies may not "
+            "select that node consistently."
+        )
+    return num_roots >= 1
+
+
+# Batched equivalents of Mark.validate, for marks whose validation depends on
+# the morphology. Other marks with a custom validate are checked one
+# reconstruction at a time.
+COLLECTION_MARK_VALIDATORS: Dict[
+    Type[Mark], Callable[[MorphologyCollection], np.ndarray]
+] = {
+    RequiresAxon: lambda collection: collection.has_type(AXON),
+    RequiresApical: lambda collection: collection.has_type(APICAL_DENDRITE),
+    RequiresBasal: lambda collection: collection.has_type(BASAL_DENDRITE),
+    RequiresDendrite: lambda collection: (
+        collection.has_type(APICAL_DENDRITE)
+        | collection.has_type(BASAL_DENDRITE)
+    ),
+    RequiresSoma: lambda collection: collection.has_type(SOMA),
+    RequiresRoot: _validate_root,
+
+    # every node of a collection has a radius (possibly nan)
+    RequiresRadii: lambda collection: np.ones(len(collection), dtype=bool),
+}
+
+
+class CollectionExtractionRun:
+
+    def __init__(
+        self,
+        collection: MorphologyCollection,
+        kernels: Optional[Mapping[Callable, BatchedKernel]] = None,
+        parameters: Optional[Dict[str, Any]] = None
+    ):
+        """ Represents a single run of feature extraction across every
+        reconstruction of a collection. Features with a batched kernel (see
+        features.batched) are calculated for all reconstructions at once.
+        Others are calculated one reconstruction at a time, as by a
+        FeatureExtractionRun.
+
+        Parameters
+        ----------
+        collection : the reconstructions from which to extract features
+        kernels : batched kernels, keyed by the function underlying the
+            feature each reproduces. Defaults to features.batched's.
+        parameters : additional attributes (e.g. reference_layer_depths) of
+            the Data from which features without a kernel are calculated
+
+        """
+
+        self.collection: MorphologyCollection = collection
+        self.kernels: Mapping[Callable, BatchedKernel] = \
+            BATCHED_KERNELS if kernels is None else kernels
+        self.parameters: Dict[str, Any] = \
+            {} if parameters is None else parameters
+
+        # for each candidate mark, whether it validated on each reconstruction
+        self.mark_validity: Dict[Type[Mark], np.ndarray] = {}
+        self.selected_features: List[MarkedFeature] = []
+
+        # for each selected feature, its (unnested) results as arrays with one
+        # row per reconstruction, and whether it was calculated for each
+        self.results: Optional[Dict[str, Dict[str, Any]]] = None
+        self.calculated: Dict[str, np.ndarray] = {}
+
+        self._morphologies: Dict[int, Morphology] = {}
+
+    def morphology(self, cell: int) -> Morphology:
+        """ A single reconstruction of this run's collection, retained for the
+        duration of the run. Its nodes are dictionaries, which features
+        traversing the morphology node by node access most quickly.
+        """
+
+        if cell not in self._morphologies:
+            self._morphologies[cell] = Morphology.from_arrays(
+                self.collection[cell].arrays)
+        return self._morphologies[cell]
+
+    def data(self, cell: int, view: bool = False) -> Data:
+        """ Data from which to calculate features of a single reconstruction.
+        If view, its morphology is a (cheaply constructed) ArrayMorphology
+        over this run's collection.
+        """
+
+        morphology = self.collection[cell] if view else self.morphology(cell)
+        return Data(morphology, **self.parameters)
+
+    def select_marks(
+        self,
+        marks: Collection[Type[Mark]],
+        required_marks: AbstractSet[Type[Mark]] = frozenset()
+    ):
+        """ Validate candidate marks against each reconstruction. See
+        FeatureExtractionRun.select_marks.
+
+        Parameters
+        ----------
+        marks : candidate marks to be validated
+        required_marks : if provided, raise an exception if any of these marks
+            do not validate successfully for every reconstruction
+
+        Returns
+        -------
+        self : This CollectionExtractionRun, with mark_validity updated
+
+        """
+
+        num_cells = len(self.collection)
+        for mark in marks:
+            if mark in COLLECTION_MARK_VALIDATORS:
+                valid = COLLECTION_MARK_VALIDATORS[mark](self.collection)
+            elif mark.validate.__func__ is Mark.validate.__func__:
+                valid = np.ones(num_cells, dtype=bool)
+            else:
+                valid = np.array(
+                    [
+                        mark.validate(self.data(cell, view=True))
+                        for cell in range(num_cells)
+                    ],
+                    dtype=bool
+                )
+            self.mark_validity[mark] = valid
+
+        for mark in required_marks:
+            valid = self.mark_validity.get(mark)
+            if valid is None or not valid.all():
+                raise ValueError(
+                    f"required mark: {mark.__name__} failed validation!")
+
+        return self
+
+    def select_features(
+        self,
+        features: Collection[MarkedFeature],
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None
+    ):
+        """ Choose features to calculate for this run. A selected feature is
+        calculated for each reconstruction on which all of its marks
+        validated.
+
+        Parameters
+        ----------
+        features : Candidates features for selection
+        only_marks : if provided, reject features not marked with marks in
+            this set
+
+        Returns
+        -------
+        self : This CollectionExtractionRun, with selected_features updated
+
+        """
+
+        if only_marks is None:
+            only_marks = set()
+
+        for feature in features:
+            if feature.marks - set(self.mark_validity):
+                logging.info(f"skipping feature: {feature.name} (unvalidated marks)")
+            elif only_marks - feature.marks:
+                logging.info(f"skipping feature: {feature.name} (no marks from {only_marks})")
+            else:
+                self.selected_features.append(feature)
+
+        return self
+
+    def extract(self):
+        """ Calculate each selected feature for each reconstruction on which
+        it is valid
+
+        Returns
+        -------
+        self : This CollectionExtractionRun, with results updated
+        """
+
+        num_cells = len(self.collection)
+        self.results = {}
+        fallback: List[MarkedFeature] = []
+
+        with self.collection.cached_run():
+            for feature in self.selected_features:
+                valid = np.ones(num_cells, dtype=bool)
+                for mark in feature.marks:
+                    valid &= self.mark_validity[mark]
+                self.calculated[feature.name] = valid
+
+                kernel = self.kernels.get(base_function(feature))
+                if kernel is None:
+                    fallback.append(feature)
+                    continue
+
+                try:
+                    results = kernel(
+                        self.collection, **keyword_arguments(feature.feature))
+                except:
+                    logging.warning(f"feature extraction failed for {feature.name}")
+                    raise
+
+                # key results as unnest would
+                self.results[feature.name] = {
+                    (f".{key}" if key else key): values
+                    for key, values in results.items()
+                }
+
+        for feature in fallback:
+            self.results[feature.name] = {}
+
+        for cell in range(num_cells):
+            features = [
+                feature for feature in fallback
+                if self.calculated[feature.name][cell]
+            ]
+            if not features:
+                continue
+
+            run = FeatureExtractionRun(self.data(cell))
+            run.selected_features = features
+            run.extract()
+
+            for name, value in run.results.items():
+                for key, item in unnest({"": value}).items():
+                    self.results[name].setdefault(
+                        key, [_MISSING] * num_cells)[cell] = item
+
+        self._morphologies = {}
+        return self
+
+    def build_output_table(self) -> pd.DataFrame:
+        """ Convert this run's results to a reconstruction X feature table,
+        equivalent to that built by FeatureWriter.build_output_table (with the
+        default formatters) from individual runs on each reconstruction.
+        Features which were not calculated for a reconstruction are nan.
+
+        Returns
+        -------
+        the generated table
+
+        """
+
+        if self.results is None:
+            raise ValueError("features have not been extracted")
+
+        columns: Dict[str, Any] = {}
+        first_rows: Dict[str, int] = {}
+
+        for feature in self.selected_features:
+            valid = self.calculated[feature.name]
+            if not valid.any():
+                continue
+
+            for key, values in self.results[feature.name].items():
+                name = feature.name + key
+                if isinstance(values, list):
+                    present = valid & np.array(
+                        [value is not _MISSING for value in values])
+                else:
+                    present = valid
+                columns[name] = _as_column(values, present)
+                first_rows[name] = int(np.argmax(present))
+
+        # columns appear in the order that pandas would first encounter them
+        # if building this table one reconstruction at a time
+        order = sorted(
+            columns,
+            key=lambda name: first_rows[name]
+        )
+        table = pd.DataFrame(
+            {name: columns[name] for name in order},
+            index=pd.Index(
+                self.collection.identifiers, name="reconstruction_id")
+        )
+        return table
+
+
+def _as_column(values: Any, valid: np.ndarray) -> Any:
+    """ Convert a feature's results to a table column, replacing results for
+    reconstructions on which the feature was not calculated with nan.
+    """
+
+    if isinstance(values, list):
+        return [
+            _formatted(value) if is_valid else np.nan
+            for value, is_valid in zip(values, valid)
+        ]
+
+    if values.ndim > 1:
+        return [
+            row.tolist() if is_valid else np.nan
+            for row, is_valid in zip(values, valid)
+        ]
+
+    if valid.all():
+        return values
+    return np.where(valid, values, np.nan)
+
+
+def _formatted(value: Any) -> Any:
+    """ Make a feature value table-ready, as the default FeatureWriter
+    formatters would.
+    """
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
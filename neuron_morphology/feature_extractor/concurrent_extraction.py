@@ -0,0 +1,357 @@
+""" Calculate the selected features of a single dataset concurrently, for
+reconstructions large enough that one run dominates a batch.
+
+Features marked ReleasesGil spend most of their time in NumPy, and run on a
+pool of threads which share the run's intermediate cache (see
+run_cache.RunCache). Other features are pure Python, and run in a pool of
+worker processes. Each worker loads the reconstruction once, from shared
+memory where possible (see shared_morphology), then calculates contiguous
+chunks of the run's schedule.
+"""
+
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Sequence, Set, Union)
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from collections import Counter
+import importlib
+import io
+import logging
+import pickle
+import threading
+import traceback
+import types
+
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology, NODE_KEYS
+from neuron_morphology.shared_morphology import (
+    SharedMorphology, SharedMorphologyHandle)
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.mark import ReleasesGil
+from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
+from neuron_morphology.feature_extractor.intermediate import (
+    Intermediate, schedule)
+from neuron_morphology.feature_extractor.run_cache import RunCache
+
+
+# the features run in worker processes are split into about this many chunks
+# per worker, balancing load against reuse of intermediates within a chunk
+CHUNKS_PER_PROCESS = 4
+
+
+class FeatureFailure(NamedTuple):
+    """ Records a feature whose calculation raised an exception
+    """
+
+    # the name of the failed feature
+    name: str
+
+    # the exception raised
+    error: BaseException
+
+    # the formatted traceback of that exception
+    traceback: str
+
+
+def calculate_feature(feature: MarkedFeature, data: Data) -> Any:
+    """ Calculate a feature, returning a FeatureFailure rather than raising
+    if its calculation fails
+    """
+
+    try:
+        return feature(data)
+    except Exception as error:
+        logging.warning(f"feature extraction failed for {feature.name}")
+        return FeatureFailure(
+            name=feature.name,
+            error=error,
+            traceback=traceback.format_exc()
+        )
+
+
+def calculate_concurrently(
+    data: Data,
+    features: Sequence[MarkedFeature],
+    num_threads: int = 1,
+    num_processes: int = 0
+) -> List[Any]:
+    """ Calculate features from a dataset concurrently
+
+    Parameters
+    ----------
+    data : the dataset from which features will be calculated
+    features : the features to calculate
+    num_threads : calculate features marked ReleasesGil on this many
+        threads. Without worker processes, all features are calculated on
+        these threads.
+    num_processes : if positive, calculate features which are not marked
+        ReleasesGil in this many worker processes. These features must be
+        picklable (see dumps_features).
+
+    Returns
+    -------
+    The result of each feature, in the order given. Features whose
+        calculation failed have a FeatureFailure in place of a result.
+
+    """
+
+    if num_processes > 0:
+        threaded = [
+            index for index, feature in enumerate(features)
+            if ReleasesGil in feature.marks
+        ]
+        in_processes = [
+            index for index, feature in enumerate(features)
+            if ReleasesGil not in feature.marks
+        ]
+    else:
+        threaded = list(range(len(features)))
+        in_processes = []
+
+    results: List[Any] = [None] * len(features)
+    with ExitStack() as stack:
+        pending = []
+
+        # worker processes take longest to start, so are sent work first
+        if in_processes:
+            pool = stack.enter_context(_process_pool(
+                data, [features[index] for index in in_processes],
+                num_processes
+            ))
+            plan = schedule(
+                [features[index].intermediates() for index in in_processes])
+            for chunk in _chunks(
+                    plan.order, num_processes * CHUNKS_PER_PROCESS):
+                pending.append((
+                    [in_processes[position] for position in chunk],
+                    pool.submit(_calculate_in_worker, chunk)
+                ))
+
+        if threaded:
+            cache = stack.enter_context(data.cached_run())
+            consumed = [features[index].intermediates() for index in threaded]
+            evictor = _Evictor(cache, consumed)
+            threads = stack.enter_context(
+                ThreadPoolExecutor(max_workers=max(num_threads, 1)))
+
+            # threads start features in schedule order, so that the
+            # consumers of each intermediate run close together
+            for position in schedule(consumed).order:
+                index = threaded[position]
+                pending.append(([index], threads.submit(
+                    _calculate_on_thread,
+                    features[index], data, consumed[position], evictor
+                )))
+
+        for indices, future in pending:
+            for index, result in zip(indices, future.result()):
+                results[index] = result
+
+    return results
+
+
+class _Evictor:
+
+    def __init__(self, cache: RunCache, consumed: Sequence[Set[Intermediate]]):
+        """ Evicts each intermediate product from a cache once all of its
+        consumers have finished, in whatever order they finish.
+
+        Parameters
+        ----------
+        cache : holds the products
+        consumed : for each feature, the products it consumes
+
+        """
+
+        self.cache = cache
+        self.remaining: Counter = Counter(
+            product for products in consumed for product in products)
+        self._lock = threading.Lock()
+
+    def finished(self, products: Set[Intermediate]):
+        """ Record that a consumer of these products has finished
+        """
+
+        with self._lock:
+            for product in products:
+                self.remaining[product] -= 1
+                if self.remaining[product] == 0:
+                    self.cache.evict(product.name)
+
+
+def _calculate_on_thread(
+    feature: MarkedFeature,
+    data: Data,
+    products: Set[Intermediate],
+    evictor: _Evictor
+) -> List[Any]:
+    result = calculate_feature(feature, data)
+    evictor.finished(products)
+    return [result]
+
+
+def _chunks(items: Sequence[Any], num_chunks: int) -> List[Sequence[Any]]:
+    """ Split a sequence into at most num_chunks contiguous, nonempty pieces
+    of nearly equal length
+    """
+
+    num_chunks = max(1, min(num_chunks, len(items)))
+    bounds = [
+        position * len(items) // num_chunks
+        for position in range(num_chunks + 1)
+    ]
+    return [
+        items[start: stop] for start, stop in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+def _shareable(morphology: Morphology) -> bool:
+    """ Whether workers can rebuild this morphology from its node arrays
+    alone (see shared_morphology)
+    """
+
+    if morphology.arrays.ids.dtype.kind not in "iu":
+        return False
+    if isinstance(morphology, ArrayMorphology):
+        return not morphology.extra_columns
+    keys = set(NODE_KEYS)
+    return all(set(node) <= keys for node in morphology.nodes())
+
+
+@contextmanager
+def _process_pool(
+    data: Data,
+    features: Sequence[MarkedFeature],
+    num_processes: int
+) -> Iterator[ProcessPoolExecutor]:
+    """ Start worker processes holding a dataset and some features (see
+    _initialize_worker). The workers are stopped, and any shared memory
+    freed, on leaving the with block.
+    """
+
+    attributes = {
+        name: value for name, value in vars(data).items()
+        if name not in {"morphology", "run_cache", "_refreshed"}
+    }
+
+    shared = None
+    morphology: Union[Morphology, SharedMorphologyHandle] = data.morphology
+    as_dict = not isinstance(morphology, ArrayMorphology)
+    if _shareable(morphology):
+        shared = SharedMorphology(morphology)
+        morphology = shared.handle
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=num_processes,
+            initializer=_initialize_worker,
+            initargs=(morphology, as_dict, attributes, dumps_features(features))
+        ) as pool:
+            yield pool
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+# the dataset and features held by a worker process. See _initialize_worker
+_worker_data: Data = None  # type: ignore[assignment]
+_worker_features: List[MarkedFeature] = []
+
+
+def _initialize_worker(
+    morphology: Union[Morphology, SharedMorphologyHandle],
+    as_dict: bool,
+    attributes: Dict[str, Any],
+    features: bytes
+):
+    """ Set up a worker process's dataset and features
+
+    Parameters
+    ----------
+    morphology : the reconstruction, or a handle to it in shared memory
+    as_dict : if the reconstruction is shared, convert it to a
+        dictionary-backed Morphology (like the one from which it was shared)
+    attributes : the dataset's other attributes
+    features : the features this worker may calculate, pickled by
+        dumps_features
+
+    """
+
+    global _worker_data, _worker_features
+
+    if isinstance(morphology, SharedMorphologyHandle):
+        morphology = morphology.load()
+        if as_dict:
+            morphology = Morphology.from_arrays(morphology.arrays)
+
+    _worker_data = Data(morphology, **attributes)
+    _worker_features = pickle.loads(features)
+
+
+def _calculate_in_worker(indices: Sequence[int]) -> List[Any]:
+    """ Calculate some of a worker's features, sharing intermediates between
+    them
+    """
+
+    results = []
+    with _worker_data.cached_run():
+        for index in indices:
+            result = calculate_feature(_worker_features[index], _worker_data)
+            if isinstance(result, FeatureFailure):
+                result = _picklable_failure(result)
+            results.append(result)
+    return results
+
+
+def _picklable_failure(failure: FeatureFailure) -> FeatureFailure:
+    """ Replace a failure's exception with a RuntimeError describing it if it
+    cannot be sent back from a worker process
+    """
+
+    try:
+        pickle.dumps(failure.error)
+    except Exception:
+        return failure._replace(error=RuntimeError(repr(failure.error)))
+    return failure
+
+
+class _FeaturePickler(pickle.Pickler):
+    """ Pickles functions decorated as features (e.g. with marked) by
+    reference to the MarkedFeature which shadows them in their module.
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, types.FunctionType):
+            try:
+                owner = _lookup(obj.__module__, obj.__qualname__)
+            except (ImportError, AttributeError):
+                return NotImplemented
+            if isinstance(owner, MarkedFeature) and owner.feature is obj:
+                return _marked_function, (obj.__module__, obj.__qualname__)
+        return NotImplemented
+
+
+def dumps_features(features: Sequence[MarkedFeature]) -> bytes:
+    """ Pickle features for calculation in another process. Unlike
+    pickle.dumps, this supports features defined by decorating module-level
+    functions.
+    """
+
+    buffer = io.BytesIO()
+    _FeaturePickler(buffer).dump(list(features))
+    return buffer.getvalue()
+
+
+def _lookup(module: str, qualname: str) -> Any:
+    item = importlib.import_module(module)
+    for name in qualname.split("."):
+        item = getattr(item, name)
+    return item
+
+
+def _marked_function(module: str, qualname: str) -> Callable:
+    """ The function underlying a module-level MarkedFeature. See
+    _FeaturePickler.
+    """
+
+    return _lookup(module, qualname).feature
@@ -1,6 +1,8 @@
-from typing import Union, Any, Dict
+from typing import Union, Any, Dict, Optional, Iterator
+from contextlib import contextmanager
 
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.feature_extractor.run_cache import RunCache
 
 class Data:
 
@@ -11,20 +13,80 @@ class Data:
         """
 
         self.morphology: Morphology = morphology
+
+        # intermediate results shared by features during a run. See
+        # cached_run
+        self.run_cache: Optional[RunCache] = None
+
+        # whether the morphology's cached data have been refreshed outside of
+        # a run. See refresh_morphology
+        self._refreshed: bool = False
+
         for name, value in other_things.items():
             setattr(self, name, value)
 
     def __hash__(self):
         return hash(id(self))
 
+    def refresh_morphology(self) -> Morphology:
+        """ Refresh the morphology's cached data (see 
+        Morphology.refresh_caches, which takes time linear in the number of 
+        nodes) if this has not been done since this data was last used in a 
+        run, so that features calculated one after another share a single 
+        check. If you modify nodes in place between features, call 
+        self.morphology.refresh_caches afterwards.
+
+        Returns
+        -------
+        the morphology
+
+        """
+
+        if not self._refreshed:
+            self.morphology.refresh_caches()
+            self._refreshed = True
+        return self.morphology
+
+    @contextmanager
+    def cached_run(self) -> Iterator[RunCache]:
+        """ Memoize intermediate results (see run_cache.memoize) calculated 
+        from this data until the end of a with block, then evict them. If a 
+        run is already in progress, its cache is used (and left in place).
+        The morphology's cached data are refreshed (see 
+        Morphology.refresh_caches) when a run begins.
+        """
+
+        if self.run_cache is not None:
+            yield self.run_cache
+            return
+
+        self.morphology.refresh_caches()
+        cache = RunCache()
+        self.run_cache = cache
+        try:
+            yield cache
+        finally:
+            cache.clear()
+            self.run_cache = None
+            self._refreshed = False
+
 # Using get_morphology, functions can easily accept either a Data or a 
 # Morphology. This derived type expresses that union.
 MorphologyLike = Union[Data, Morphology]
 
 def get_morphology(data: MorphologyLike):
-    """ Decay a Data to a Morphology, leaving Morphologies untouched
+    """ Decay a Data to a Morphology, leaving Morphologies untouched. 
+    Outside of a run (see Data.cached_run), features see in-place 
+    modifications of the morphology's nodes: a Morphology is refreshed (see 
+    Morphology.refresh_caches, which takes time linear in the number of 
+    nodes) on every call, and a Data's morphology only once (see 
+    Data.refresh_morphology). Pass a Data to calculate several features 
+    outside of a run.
     """
 
     if isinstance(data, Morphology):
+        data.refresh_caches()
         return data
+    if isinstance(data, Data) and data.run_cache is None:
+        return data.refresh_morphology()
     return data.morphology
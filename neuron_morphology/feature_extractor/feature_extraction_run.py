@@ -4,8 +4,13 @@ import logging
 import warnings
 
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.run_cache import CacheStatistics
+from neuron_morphology.feature_extractor.intermediate import (
+    Schedule, schedule)
 from neuron_morphology.feature_extractor.marked_feature import MarkedFeature
 from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.concurrent_extraction import (
+    FeatureFailure, calculate_feature, calculate_concurrently)
 
 
 class FeatureExtractionRun:
@@ -25,6 +30,12 @@ class FeatureExtractionRun:
         self.selected_features: List[MarkedFeature] = []
         self.results: Optional[Dict] = None
 
+        # hits and misses of each intermediate memoized during extract
+        self.cache_statistics: Dict[str, CacheStatistics] = {}
+
+        # features whose calculation failed, by name. See extract
+        self.failures: Dict[str, FeatureFailure] = {}
+
     def select_marks(
         self, 
         marks: Collection[Type[Mark]], 
@@ -96,9 +107,35 @@ class FeatureExtractionRun:
         logging.info(f"selected features: {[feature.name for feature in self.selected_features]}")
         return self
 
-    def extract(self):
+    def schedule(self) -> Schedule:
+        """ Determine the order in which the selected features will be 
+        calculated, and when each intermediate product they declare (see 
+        marked_feature.requires) may be evicted.
+        """
+
+        return schedule(
+            [feature.intermediates() for feature in self.selected_features])
+
+    def extract(
+        self,
+        num_threads: int = 1,
+        num_processes: int = 0,
+        capture_errors: bool = False
+    ):
         """ For each selected feature, carry out calculation on this run's 
-        dataset.
+        dataset. Features are calculated in the order given by schedule, but 
+        results are reported in the order of selection.
+
+        Parameters
+        ----------
+        num_threads : if greater than 1, calculate features concurrently on 
+            this many threads (see concurrent_extraction)
+        num_processes : if positive, calculate features not marked 
+            ReleasesGil in this many worker processes
+        capture_errors : if True, record features whose calculation fails in 
+            this run's failures, and omit them from its results. Otherwise 
+            raise the exception of the first such feature (in order of 
+            selection).
 
         Returns
         -------
@@ -106,14 +143,51 @@ class FeatureExtractionRun:
         """
 
         self.results = {}
+        self.failures = {}
+
+        # intermediates shared between features are calculated once per run, 
+        # then evicted after their last declared consumer
+        with self.data.cached_run() as cache:
+            if num_threads > 1 or num_processes > 0:
+                calculated = calculate_concurrently(
+                    self.data, 
+                    self.selected_features, 
+                    num_threads=num_threads, 
+                    num_processes=num_processes
+                )
+            else:
+                calculated = [None] * len(self.selected_features)
+                plan = self.schedule()
+                for index, evictions in zip(plan.order, plan.evictions):
+                    feature = self.selected_features[index]
+                    if capture_errors:
+                        calculated[index] = calculate_feature(
+                            feature, self.data)
+                    else:
+                        try:
+                            calculated[index] = feature(self.data)
+                        except:
+                            logging.warning(f"feature extraction failed for {feature.name}")
+                            raise
+
+                    for name in evictions:
+                        cache.evict(name)
+
+        self.cache_statistics = cache.statistics()
+
+        for result in calculated:
+            if isinstance(result, FeatureFailure):
+                if not capture_errors:
+                    raise result.error
+                self.failures[result.name] = result
+
+        self.results = {
+            feature.name: result
+            for feature, result in zip(self.selected_features, calculated)
+            if not isinstance(result, FeatureFailure)
+        }
 
-        for feature in self.selected_features:
-            try:
-                self.results[feature.name] = feature(self.data)
-            except:
-                logging.warning(f"feature extraction failed for {feature.name}")
-                raise
-
+        logging.info(f"intermediate cache statistics: {self.cache_statistics}")
         return self
 
     def serialize(self):
@@ -124,5 +198,6 @@ class FeatureExtractionRun:
             "results": self.results,
             "selected_marks": [mark.__name__ for mark in self.selected_marks],
             "selected_features": [
-                feature.name for feature in self.selected_features]
+                feature.name for feature in self.selected_features],
+            "failed_features": list(self.failures)
         }
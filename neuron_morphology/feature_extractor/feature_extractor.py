@@ -1,6 +1,6 @@
 from typing import (
     Sequence, Set, AbstractSet, List, Optional, Type, Union, Iterable,
-    Mapping, Any)
+    Mapping, Any, Dict)
 import logging
 import collections
 
@@ -11,6 +11,9 @@ from neuron_morphology.feature_extractor.marked_feature import (
 from neuron_morphology.feature_extractor.feature_extraction_run import \
     FeatureExtractionRun
 from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.collection_extraction_run import \
+    CollectionExtractionRun
+from neuron_morphology.morphology_collection import MorphologyCollection
 
 
 # The register_features method on FeatureExtractor supports one level of
@@ -68,7 +71,10 @@ class FeatureExtractor:
         self,
         data: Data,
         only_marks: Optional[AbstractSet[Type[Mark]]] = None,
-        required_marks: AbstractSet[Type[Mark]] = frozenset()
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        num_threads: int = 1,
+        num_processes: int = 0,
+        capture_errors: bool = False
     ) -> FeatureExtractionRun:
         """ Run the feature extractor for a single dataset
 
@@ -78,6 +84,12 @@ class FeatureExtractor:
         only_marks : if provided, reject marks not in this set
         required_marks : if provided, raise an exception if any of these marks
             do not validate successfully
+        num_threads : calculate features concurrently on this many threads 
+            (see FeatureExtractionRun.extract)
+        num_processes : calculate pure-Python features in this many worker 
+            processes
+        capture_errors : record failed features in the run's failures, rather 
+            than raising
 
         Returns
         -------
@@ -88,6 +100,50 @@ class FeatureExtractor:
 
         return (
             FeatureExtractionRun(data)
+                .select_marks(
+                    self.marks,
+                    required_marks=required_marks
+                )
+                .select_features(
+                    self.features,
+                    only_marks=only_marks
+                )
+                .extract(
+                    num_threads=num_threads,
+                    num_processes=num_processes,
+                    capture_errors=capture_errors
+                )
+        )
+
+    def extract_collection(
+        self,
+        collection: MorphologyCollection,
+        only_marks: Optional[AbstractSet[Type[Mark]]] = None,
+        required_marks: AbstractSet[Type[Mark]] = frozenset(),
+        parameters: Optional[Dict[str, Any]] = None
+    ) -> CollectionExtractionRun:
+        """ Run the feature extractor across a collection of 
+        reconstructions, using batched kernels where available.
+
+        Parameters
+        ----------
+        collection : the reconstructions from which features will be 
+            calculated
+        only_marks : if provided, reject marks not in this set
+        required_marks : if provided, raise an exception if any of these marks
+            do not validate successfully on every reconstruction
+        parameters : additional data (e.g. reference_layer_depths) used by 
+            features calculated one reconstruction at a time
+
+        Returns
+        -------
+        The calculated features. Use its build_output_table method to obtain 
+            a reconstruction X feature table.
+
+        """
+
+        return (
+            CollectionExtractionRun(collection, parameters=parameters)
                 .select_marks(
                     self.marks,
                     required_marks=required_marks
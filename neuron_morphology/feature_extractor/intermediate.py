@@ -0,0 +1,158 @@
+""" Declarations of the intermediate products (e.g. the coordinates of a
+reconstruction's tips) from which features are calculated. Features declare
+the products they consume using the marked_feature.requires decorator. A
+FeatureExtractionRun uses these declarations to schedule its features, so that
+each product is calculated once (see run_cache.memoize) and evicted as soon as
+its last consumer has finished.
+"""
+
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple,
+    Union)
+import inspect
+import functools
+
+from neuron_morphology.feature_extractor.run_cache import memoize
+
+
+class Intermediate(NamedTuple):
+    """ A named product calculated from a Data and shared between features
+    """
+
+    # identifies this product in a run's cache
+    name: str
+
+    # other products from which this one is calculated
+    requires: Tuple["Intermediate", ...] = ()
+
+    def memoize(self, data: Any, function: Callable, *args, **kwargs) -> Any:
+        """ Calculate this product as function(*args, **kwargs), reusing the
+        result if it has already been calculated during this run. See
+        run_cache.memoize.
+        """
+
+        return memoize(data, self.name, function, *args, **kwargs)
+
+
+# Determines the products consumed by a specialized feature from the values of
+# its keyword arguments
+IntermediateResolver = Callable[..., Iterable[Intermediate]]
+
+# A feature's declared dependency. Either a product or a resolver.
+Requirement = Union[Intermediate, IntermediateResolver]
+
+
+def keyword_arguments(function: Callable) -> Dict[str, Any]:
+    """ Find the values that a (possibly partially applied) function will
+    use for its keyword arguments: its defaults, updated by any bound using
+    functools.partial.
+    """
+
+    bound: Dict[str, Any] = {}
+    while isinstance(function, functools.partial):
+        bound = {**function.keywords, **bound}
+        function = function.func
+
+    try:
+        signature = inspect.signature(function)
+    except (TypeError, ValueError):
+        return bound
+
+    values = {
+        name: parameter.default
+        for name, parameter in signature.parameters.items()
+        if parameter.default is not inspect.Parameter.empty
+    }
+    values.update(bound)
+    return values
+
+
+def resolve_requirements(
+    requirements: Iterable[Requirement],
+    kwargs: Dict[str, Any]
+) -> Set[Intermediate]:
+    """ Find the products (including those from which they are calculated)
+    consumed by a feature with these requirements and keyword arguments.
+    """
+
+    direct: List[Intermediate] = []
+    for requirement in requirements:
+        if isinstance(requirement, Intermediate):
+            direct.append(requirement)
+        else:
+            direct.extend(requirement(**kwargs))
+
+    resolved: Set[Intermediate] = set()
+    while direct:
+        current = direct.pop()
+        if current not in resolved:
+            resolved.add(current)
+            direct.extend(current.requires)
+    return resolved
+
+
+class Schedule(NamedTuple):
+    """ The order in which a run's features are calculated, along with the
+    products which may be evicted after each.
+    """
+
+    # indices (into the scheduled features) in order of execution
+    order: List[int]
+
+    # for each step of order, names of products no later step consumes
+    evictions: List[List[str]]
+
+
+def schedule(consumed: Sequence[Set[Intermediate]]) -> Schedule:
+    """ Order features so that the consumers of each intermediate product run
+    close together, bounding the number of products held at once.
+
+    Parameters
+    ----------
+    consumed : for each feature, the products it consumes
+
+    Returns
+    -------
+    The execution order. Features are scheduled greedily: at each step the
+    next feature is the one needing the fewest products which are not
+    already held, then the one finishing the most held products, then the
+    earliest.
+
+    """
+
+    remaining_consumers: Dict[Intermediate, int] = {}
+    for products in consumed:
+        for product in products:
+            remaining_consumers[product] = \
+                remaining_consumers.get(product, 0) + 1
+
+    held: Set[Intermediate] = set()
+    remaining = list(range(len(consumed)))
+    order: List[int] = []
+    evictions: List[List[str]] = []
+
+    while remaining:
+        best = min(
+            range(len(remaining)),
+            key=lambda position: (
+                len(consumed[remaining[position]] - held),
+                -sum(
+                    1 for product in consumed[remaining[position]]
+                    if remaining_consumers[product] == 1
+                ),
+                position
+            )
+        )
+        index = remaining.pop(best)
+        order.append(index)
+
+        finished = []
+        for product in consumed[index]:
+            held.add(product)
+            remaining_consumers[product] -= 1
+            if remaining_consumers[product] == 0:
+                held.discard(product)
+                finished.append(product.name)
+        evictions.append(sorted(finished))
+
+    return Schedule(order=order, evictions=evictions)
@@ -58,6 +58,13 @@ class AllNeuriteTypes(Mark):
     pass
 
 
+class ReleasesGil(Mark):
+    """Indicates features that spend most of their time in NumPy (or other
+    compiled) code which releases the GIL. These can run concurrently on
+    threads (see concurrent_extraction)."""
+    pass
+
+
 class RequiresDendrite(Mark):
     """This feature can only be calculated for neurons with at least one 
     dendrite node"""
@@ -111,7 +118,7 @@ class RequiresRoot(Mark):
 
     @classmethod
     def validate(cls, data: Data) -> bool:
-        num_roots = len(data.morphology.get_roots())
+        num_roots = data.morphology.topology.num_roots
 
         if num_roots > 1:
             warnings.warn(
@@ -10,13 +10,16 @@ from neuron_morphology.feature_extractor.feature_specialization import (
     FeatureSpecialization, SpecializationSet, SpecializationSets, 
     SpecializationOption
 )
+from neuron_morphology.feature_extractor.intermediate import (
+    Intermediate, Requirement, keyword_arguments, resolve_requirements
+)
 
 FeatureFn = Callable[[Data], Any]
 M = TypeVar("M", bound="MarkedFeature")
 
 class MarkedFeature:
 
-    __slots__ = ["marks", "feature", "name"]
+    __slots__ = ["marks", "feature", "name", "requires"]
 
     def __repr__(self):
         return (
@@ -38,6 +41,7 @@ class MarkedFeature:
         feature: 'Feature', 
         name: Optional[str] = None,
         preserve_marks: bool = True,
+        requires: Sequence[Requirement] = tuple()
     ):
         """ A feature-calculator with 0 or more marks.
 
@@ -49,11 +53,16 @@ class MarkedFeature:
             inferred
         preserve_marks : If True, any marks on the underlying feature will 
             be retained. Otherwise they will be discarded.
+        requires : intermediate products consumed by this feature (see 
+            intermediate.Intermediate), in addition to any required by the 
+            underlying feature
 
         """
 
         self.marks: Set[Type[Mark]] = marks
         self.feature: Feature = feature
+        self.requires: List[Requirement] = list(
+            getattr(feature, "requires", [])) + list(requires)
 
         if preserve_marks and hasattr(feature, "marks"):
             self.marks |= set(feature.marks) # type: ignore[union-attr]
@@ -76,6 +85,16 @@ class MarkedFeature:
 
         self.marks.add(mark)
 
+    def intermediates(self) -> Set[Intermediate]:
+        """ The intermediate products this feature consumes, given the 
+        keyword arguments bound on it (e.g. by specialization)
+        """
+
+        if not self.requires:
+            return set()
+        return resolve_requirements(
+            self.requires, keyword_arguments(self.feature))
+
     def __call__(self, *args, **kwargs):
         """ Execute the underlying feature, passing along all arguments
         """
@@ -90,6 +109,7 @@ class MarkedFeature:
             marks=cp.deepcopy(self.marks),
             feature=cp.deepcopy(self.feature),
             name=self.name,
+            requires=self.requires
         )
 
     def partial(self, *args, **kwargs):
@@ -236,3 +256,32 @@ def marked(mark: Type[Mark]):
     def _add_mark(feature):
         return MarkedFeature({mark}, feature)
     return _add_mark
+
+
+def requires(*requirements: Requirement):
+    """ Decorator for declaring the intermediate products (see 
+    intermediate.Intermediate) consumed by a function.
+
+    Parameters
+    ----------
+    *requirements : each is either an Intermediate or a resolver. Resolvers 
+        are called with the feature's keyword arguments (its defaults, updated 
+        by any bound through specialization) and return the consumed 
+        Intermediates.
+
+    Examples
+    --------
+    @requires(PATH_DISTANCES)
+    @marked(Geometric)
+    def some_path_feature(...):
+        ...
+
+    @requires(lambda coord_type, **kwargs: [coord_type.intermediate])
+    def some_coordinate_feature(data, coord_type=COORD_TYPE.NODE):
+        ...
+
+    """
+
+    def _add_requirements(feature):
+        return MarkedFeature(set(), feature, requires=requirements)
+    return _add_requirements
@@ -0,0 +1,206 @@
+""" Memoization of intermediate results (e.g. the coordinates of a
+reconstruction's tips) which are shared by many features. Results are cached
+on a Data for the duration of a single feature extraction run (see
+Data.cached_run) and evicted when the run ends.
+"""
+
+from typing import (
+    Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple)
+from collections import Counter
+from collections.abc import Mapping
+import functools
+import threading
+
+import numpy as np
+
+
+class CacheStatistics(NamedTuple):
+    """ How often an intermediate was requested during a run
+    """
+
+    # requests answered from the cache
+    hits: int
+
+    # requests which required calculation
+    misses: int
+
+
+class RunCache:
+
+    def __init__(self):
+        """ Intermediate results calculated during a feature extraction run,
+        keyed by the name of the intermediate and the arguments from which it
+        was calculated. Use memoize (or the memoized decorator) to read
+        through this cache.
+
+        Notes
+        -----
+        A RunCache may be shared by features running on several threads.
+        Each intermediate is then calculated once: threads requesting it
+        while it is being calculated wait for the result.
+
+        """
+
+        self._values: Dict[Tuple[str, Hashable], Any] = {}
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+
+        self._lock = threading.Lock()
+
+        # held while an intermediate is being calculated, by full key
+        self._pending: Dict[Tuple[str, Hashable], threading.Lock] = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(
+        self,
+        name: str,
+        key: Hashable,
+        calculate: Callable[[], Any]
+    ) -> Any:
+        """ Look up an intermediate, calculating and storing it if it is not
+        already present.
+
+        Parameters
+        ----------
+        name : identifies the intermediate
+        key : identifies the arguments from which it is calculated
+        calculate : called (with no arguments) on a miss. Exceptions are
+            propagated, and nothing is stored.
+
+        """
+
+        full_key = (name, key)
+        with self._lock:
+            if full_key in self._values:
+                self._hits[name] += 1
+                return self._values[full_key]
+            pending = self._pending.setdefault(full_key, threading.Lock())
+
+        with pending:
+            with self._lock:
+                if full_key in self._values:
+                    self._hits[name] += 1
+                    return self._values[full_key]
+                self._misses[name] += 1
+
+            try:
+                value = calculate()
+            except:
+                with self._lock:
+                    self._pending.pop(full_key, None)
+                raise
+
+            with self._lock:
+                self._values[full_key] = value
+                self._pending.pop(full_key, None)
+            return value
+
+    def statistics(self) -> Dict[str, CacheStatistics]:
+        """ Hits and misses of each named intermediate so far. Statistics
+        are kept after the cached values are evicted.
+        """
+
+        with self._lock:
+            return {
+                name: CacheStatistics(
+                    hits=self._hits[name], misses=self._misses[name])
+                for name in sorted(set(self._hits) | set(self._misses))
+            }
+
+    def evict(self, name: str):
+        """ Evict all cached values of a named intermediate
+        """
+
+        with self._lock:
+            self._values = {
+                key: value for key, value in self._values.items()
+                if key[0] != name
+            }
+
+    def clear(self):
+        """ Evict all cached values
+        """
+
+        with self._lock:
+            self._values = {}
+
+
+def memoize(
+    data: Any,
+    name: str,
+    function: Callable,
+    *args,
+    **kwargs
+) -> Any:
+    """ Call a function, reusing its result if it has already been called
+    with equal arguments during this run.
+
+    Parameters
+    ----------
+    data : supplies the cache. Any object without an active run cache (such
+        as a Morphology, or a Data outside of a run) disables memoization.
+    name : identifies the intermediate calculated by function
+    function : called as function(*args, **kwargs)
+
+    Notes
+    -----
+    Lists, dicts and sets among the arguments are compared by value. If any
+    argument cannot be made hashable (e.g. an array), the result is
+    calculated and not cached. Cached results are shared, so callers must
+    not modify them.
+
+    """
+
+    cache: Optional[RunCache] = getattr(data, "run_cache", None)
+    if cache is None:
+        return function(*args, **kwargs)
+
+    try:
+        key = _freeze((args, kwargs))
+    except TypeError:
+        return function(*args, **kwargs)
+
+    return cache.get(name, key, lambda: function(*args, **kwargs))
+
+
+def memoized(name: Optional[str] = None) -> Callable:
+    """ Decorate a function whose first argument is a Data (or any
+    MorphologyLike), so that its results are memoized during feature
+    extraction runs. See memoize.
+
+    Parameters
+    ----------
+    name : identifies the intermediate calculated by the decorated
+        function. Defaults to the function's qualified name.
+
+    """
+
+    def decorate(function: Callable) -> Callable:
+        intermediate = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(data, *args, **kwargs):
+            return memoize(
+                data, intermediate, function, data, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _freeze(value: Any) -> Hashable:
+    """ Convert containers to hashable equivalents, recursively. Raises a
+    TypeError for unhashable values.
+    """
+
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, Mapping):
+        return frozenset(
+            (_freeze(key), _freeze(item)) for key, item in value.items())
+    if isinstance(value, np.ndarray):
+        raise TypeError("arrays are not used as cache keys")
+    hash(value)
+    return value
@@ -7,6 +7,7 @@ from neuron_morphology.feature_extractor.feature_extractor import \
 from neuron_morphology.feature_extractor.mark import Mark
 import neuron_morphology.feature_extractor.mark as _mark
 from neuron_morphology.swc_io import morphology_from_swc
+from neuron_morphology.shared_morphology import SharedMorphologyHandle
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.features.layer.reference_layer_depths import \
     ReferenceLayerDepths, WELL_KNOWN_REFERENCE_LAYER_DEPTHS
@@ -90,16 +91,44 @@ def hydrate_parameters(parameters: Dict[str, Any]) -> Dict[str, Any]:
     return output
 
 
+def resolve_feature_set(feature_set: str) -> List[Any]:
+    """ Look up a known set of features by name
+    """
+
+    try:
+        return known_feature_sets[feature_set]
+    except KeyError:
+        print(
+            f"known feature sets: {list(known_feature_sets.keys())}\n"
+            f"you provided: {feature_set}"
+        )
+        raise
+
+
+def resolve_marks(names: List[str]) -> Set[Type[Mark]]:
+    """ Look up built-in marks by name
+    """
+
+    return {well_known_marks[name] for name in names}
+
+
 def setup_data(
     reconstruction: Dict[str, Any], 
-    global_parameters: Dict[str, Any]
+    global_parameters: Dict[str, Any],
+    hydrate_global_parameters: bool = True
 ) -> Tuple[str, Data]:
     """ Construct a Data for extracting features from a single reconstruction.
 
     Parameters
     ----------
-    reconstruction : The reconstruction to be setup. Must specify an swc_path
+    reconstruction : The reconstruction to be setup. Must specify either an
+        swc_path or a morphology. The latter may be a Morphology or a
+        SharedMorphologyHandle (which is loaded without copying the shared
+        node arrays).
     global_parameters : any cross-reconstruction feature parameters
+    hydrate_global_parameters : if False, global_parameters have already 
+        been hydrated (see hydrate_parameters), e.g. once for many 
+        reconstructions
 
     Returns 
     -------
@@ -110,10 +139,18 @@ def setup_data(
 
     parameters: Dict[str, Any] = {}
     identifier = reconstruction.get("identifier", reconstruction.get("swc_path"))
-    swc_path = reconstruction.pop("swc_path")
-    morphology = morphology_from_swc(swc_path)
 
-    parameters.update(hydrate_parameters(global_parameters))
+    if "morphology" in reconstruction:
+        morphology = reconstruction.pop("morphology")
+        if isinstance(morphology, SharedMorphologyHandle):
+            morphology = morphology.load()
+    else:
+        swc_path = reconstruction.pop("swc_path")
+        morphology = morphology_from_swc(swc_path)
+
+    if hydrate_global_parameters:
+        global_parameters = hydrate_parameters(global_parameters)
+    parameters.update(global_parameters)
     parameters.update(hydrate_parameters(reconstruction))
 
     return identifier, Data(morphology, **parameters)
@@ -130,7 +167,7 @@ def run_feature_extraction(
     Parameters
     ----------
     reconstruction_spec : a dictionary specifying a reconstruction. Must 
-        have an swc_path.
+        have an swc_path or a morphology (see setup_data).
     feature_set : names the set of features for which calculation will be 
         attempted
     only_marks : names marks to which calculation will be restricted
@@ -149,21 +186,12 @@ def run_feature_extraction(
 
     """
 
-    try:
-        features = known_feature_sets[feature_set]
-    except KeyError:
-        print(
-            f"known feature sets: {list(known_feature_sets.keys())}\n"
-            f"you provided: {feature_set}"
-        )
-        raise
+    features = resolve_feature_set(feature_set)
 
-    only_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in only_marks
-        } if only_marks is not None else None
-    required_mark_set: Set[Type[Mark]] = {
-        well_known_marks[name] for name in required_marks
-        } if required_marks is not None else set()
+    only_mark_set: Optional[Set[Type[Mark]]] = \
+        resolve_marks(only_marks) if only_marks is not None else None
+    required_mark_set: Set[Type[Mark]] = \
+        resolve_marks(required_marks) if required_marks is not None else set()
 
     identifier, data = setup_data(reconstruction_spec, global_parameter_spec)
 
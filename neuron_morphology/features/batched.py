@@ -0,0 +1,259 @@
+""" Batched equivalents of scalar features, which calculate a feature for
+every reconstruction of a MorphologyCollection at once using segmented NumPy
+reductions. Each kernel is registered (in BATCHED_KERNELS) against the
+feature it reproduces, and is called with the keyword arguments that feature
+would receive (including those bound by specialization).
+
+Kernels return a dictionary mapping result keys (as produced by unnesting the
+feature's output; "" for features returning a single value) to arrays with
+one row per reconstruction.
+"""
+
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import functools
+
+import numpy as np
+
+from neuron_morphology.constants import SOMA
+from neuron_morphology.morphology_arrays import NO_INDEX, compartment_geometry
+from neuron_morphology.morphology_collection import (
+    MorphologyCollection, segment_sum, segment_extrema)
+from neuron_morphology.feature_extractor.run_cache import memoize
+from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.intrinsic import num_nodes, num_tips
+from neuron_morphology.features.size import (
+    total_length, total_surface_area, total_volume)
+from neuron_morphology.features.dimension import dimension
+from neuron_morphology.features.statistics.moments import moments
+from neuron_morphology.features.statistics.overlap import overlap
+
+
+# calculates a feature for each reconstruction of a collection
+BatchedKernel = Callable[..., Dict[str, np.ndarray]]
+
+# the scalar features which have batched kernels, by underlying function
+BATCHED_KERNELS: Dict[Callable, BatchedKernel] = {}
+
+
+def batched_kernel(feature: Any) -> Callable:
+    """ Decorator registering a batched kernel for a feature
+    """
+
+    def _register(kernel: BatchedKernel) -> BatchedKernel:
+        BATCHED_KERNELS[base_function(feature)] = kernel
+        return kernel
+    return _register
+
+
+def base_function(feature: Any) -> Callable:
+    """ Find the plain function underlying a (possibly marked and
+    specialized) feature
+    """
+
+    function = getattr(feature, "feature", feature)
+    while isinstance(function, functools.partial):
+        function = function.func
+    return function
+
+
+def collection_coordinates(
+    collection: MorphologyCollection,
+    coord_type: COORD_TYPE,
+    node_types: Optional[Sequence[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Find coordinates of one type (see COORD_TYPE.get_coordinates) across
+    a collection. Memoized while the collection has an active run cache.
+
+    Returns
+    -------
+    cells : the reconstruction of each coordinate, in ascending order
+    xyz : (N, 3) array of coordinates
+
+    """
+
+    return memoize(
+        collection,
+        f"batched_{coord_type.name.lower()}_coordinates",
+        _collection_coordinates,
+        collection,
+        coord_type,
+        node_types
+    )
+
+
+def _collection_coordinates(collection, coord_type, node_types):
+    """ Find coordinates (see collection_coordinates) without memoization
+    """
+
+    if coord_type == COORD_TYPE.COMPARTMENT:
+        # compartments are selected regardless of node_types
+        child = np.flatnonzero(collection.parent_index != NO_INDEX)
+        parent = collection.parent_index[child]
+        xyz = (collection.xyz[parent] + collection.xyz[child]) * 0.5
+        return collection.cells[child], xyz
+
+    if node_types:
+        mask = np.isin(collection.types, node_types)
+    elif coord_type == COORD_TYPE.NODE:
+        mask = np.ones(collection.num_nodes, dtype=bool)
+    else:
+        mask = collection.types != SOMA
+
+    if coord_type == COORD_TYPE.TIP:
+        mask &= collection.num_children == 0
+    elif coord_type == COORD_TYPE.BIFURCATION:
+        mask &= collection.num_children > 1
+
+    indices = np.flatnonzero(mask)
+    return collection.cells[indices], collection.xyz[indices]
+
+
+@batched_kernel(num_nodes)
+def batched_num_nodes(collection, node_types=None, **_):
+    cells, _xyz = collection_coordinates(
+        collection, COORD_TYPE.NODE, node_types)
+    return {"": np.bincount(cells, minlength=len(collection))}
+
+
+@batched_kernel(num_tips)
+def batched_num_tips(collection, node_types=None, **_):
+    cells, _xyz = collection_coordinates(
+        collection, COORD_TYPE.TIP, node_types)
+    return {"": np.bincount(cells, minlength=len(collection))}
+
+
+def _compartment_totals(collection, node_types, name, exclude_soma_root):
+    geometry = memoize(
+        collection,
+        "batched_compartment_geometry",
+        compartment_geometry,
+        collection,
+        node_types
+    )
+
+    values = getattr(geometry, name)
+    cells = collection.cells[geometry.child_index]
+    if exclude_soma_root:
+        parents = geometry.parent_index
+        keep = ~(
+            (collection.types[parents] == SOMA)
+            & (collection.parent_index[parents] == NO_INDEX)
+        )
+        values = values[keep]
+        cells = cells[keep]
+
+    return {"": segment_sum(cells, values, len(collection))}
+
+
+@batched_kernel(total_length)
+def batched_total_length(collection, node_types=None, **_):
+    return _compartment_totals(collection, node_types, "length", True)
+
+
+@batched_kernel(total_surface_area)
+def batched_total_surface_area(collection, node_types=None, **_):
+    return _compartment_totals(collection, node_types, "surface_area", False)
+
+
+@batched_kernel(total_volume)
+def batched_total_volume(collection, node_types=None, **_):
+    return _compartment_totals(collection, node_types, "volume", False)
+
+
+@batched_kernel(dimension)
+def batched_dimension(
+    collection,
+    node_types=None,
+    coord_type=COORD_TYPE.NODE,
+    signed_bias=(False, True, False),
+    **_
+):
+    cells, xyz = collection_coordinates(collection, coord_type, node_types)
+
+    roots = collection.first_roots()
+    relative = xyz - collection.xyz[roots[cells]]
+    min_xyz, max_xyz = segment_extrema(cells, relative, len(collection))
+
+    bias_xyz = np.abs(np.maximum(max_xyz, 0)) - np.abs(np.minimum(min_xyz, 0))
+    for dim, signed in enumerate(signed_bias):
+        if not signed:
+            bias_xyz[:, dim] = np.abs(bias_xyz[:, dim])
+
+    size = max_xyz - min_xyz
+    return {
+        "width": size[:, 0],
+        "height": size[:, 1],
+        "depth": size[:, 2],
+        "min_xyz": min_xyz,
+        "max_xyz": max_xyz,
+        "bias_xyz": bias_xyz
+    }
+
+
+@batched_kernel(moments)
+def batched_moments(
+    collection,
+    node_types=None,
+    coord_type=COORD_TYPE.NODE,
+    **_
+):
+    cells, xyz = collection_coordinates(collection, coord_type, node_types)
+    num_cells = len(collection)
+
+    # these follow scipy.stats.describe (with ddof=1 and bias=True)
+    counts = np.bincount(cells, minlength=num_cells)[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = segment_sum(cells, xyz, num_cells) / counts
+        deviation = xyz - mean[cells]
+        squared = deviation ** 2
+        m2 = segment_sum(cells, squared, num_cells) / counts
+        m3 = segment_sum(cells, squared * deviation, num_cells) / counts
+        m4 = segment_sum(cells, squared ** 2, num_cells) / counts
+
+        variance = m2 * np.divide(counts, counts - 1)
+        zero = m2 <= (np.finfo(m2.dtype).resolution * mean) ** 2
+        skew = np.where(zero, np.nan, m3 / m2 ** 1.5)
+        kurt = np.where(zero, np.nan, m4 / m2 ** 2.0) - 3
+
+    return {
+        "mean": mean,
+        "std": np.sqrt(variance),
+        "var": variance,
+        "skew": skew,
+        "kurt": kurt
+    }
+
+
+@batched_kernel(overlap)
+def batched_overlap(
+    collection,
+    node_types=None,
+    node_types_to_compare=None,
+    coord_type=COORD_TYPE.NODE,
+    **_
+):
+    num_cells = len(collection)
+    cells_a, xyz_a = collection_coordinates(
+        collection, coord_type, node_types)
+    cells_b, xyz_b = collection_coordinates(
+        collection, coord_type, node_types_to_compare)
+
+    # as in overlap, comparisons are always made along y
+    min_b, max_b = segment_extrema(cells_b, xyz_b[:, 1], num_cells)
+    with np.errstate(invalid="ignore"):
+        num_above = np.bincount(
+            cells_a[xyz_a[:, 1] > max_b[cells_a]], minlength=num_cells)
+        num_below = np.bincount(
+            cells_a[xyz_a[:, 1] < min_b[cells_a]], minlength=num_cells)
+    count = np.bincount(cells_a, minlength=num_cells)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        above = num_above / count
+        below = num_below / count
+    overlapping = 1 - above - below
+
+    empty_b = np.bincount(cells_b, minlength=num_cells) == 0
+    for values in (above, overlapping, below):
+        values[empty_b] = -1
+
+    return {"above": above, "overlap": overlapping, "below": below}
@@ -46,21 +46,19 @@ def calculate_outer_bifs(
 
     """
 
-    nodes = morphology.get_node_by_types(node_types)
-    far = 0
-    for node in nodes:
-        dist = morphology.euclidean_distance(soma, node)
-        if dist > far:
-            far = dist
-
-    count = 0
-    rad = far / 2.0
-    for node in nodes:
-        if len(morphology.children_of(node)) > 1:
-            dist = morphology.euclidean_distance(soma, node)
-            if dist > rad:
-                count += 1
-    return count
+    topology = morphology.topology
+    if node_types:
+        indices = topology.indices_of_types(node_types)
+    else:
+        indices = np.arange(len(topology.num_children))
+    if len(indices) == 0:
+        return 0
+
+    center = np.array([soma["x"], soma["y"], soma["z"]], dtype=float)
+    dist = np.linalg.norm(morphology.arrays.xyz[indices] - center, axis=1)
+    rad = max(dist.max(), 0) / 2.0
+
+    return int(np.count_nonzero(topology.is_branch[indices] & (dist > rad)))
 
 
 @marked(Geometric)
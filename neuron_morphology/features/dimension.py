@@ -2,18 +2,23 @@ from typing import Optional, List
 
 import numpy as np
 
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
 from neuron_morphology.feature_extractor.mark import (
     Geometric,
-    RequiresRoot
+    RequiresRoot,
+    ReleasesGil
     )
 
 from neuron_morphology.feature_extractor.data import Data
-from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, coordinate_intermediates)
 
 
+@requires(coordinate_intermediates)
 @marked(RequiresRoot)
 @marked(Geometric)
+@marked(ReleasesGil)
 def dimension(
             data: Data,
             node_types: Optional[List] = None,
@@ -39,14 +44,14 @@ def dimension(
 
     """
     coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
+                    data, node_types=node_types)
     if not coordinates:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
 
         dimension_features = {
-            'height': float('nan'),
             'width': float('nan'),
+            'height': float('nan'),
             'depth': float('nan'),
             'min_xyz': nan_array,
             'max_xyz': nan_array,
@@ -1,13 +1,18 @@
 from typing import Optional, List
-from functools import partial
+
+import numpy as np
 
 from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.features.statistics.coordinates import COORD_TYPE
 
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
 from neuron_morphology.feature_extractor.mark import Intrinsic
+from neuron_morphology.morphology_arrays import (
+    BREADTH_FIRST, PREORDER, NO_INDEX)
 
 
+@requires(COORD_TYPE.TIP.intermediate)
 @marked(Intrinsic)
 def num_tips(
         data: Data,
@@ -25,7 +30,7 @@ def num_tips(
 
     """
     # Alternative method:
-    num_tips = len(COORD_TYPE.TIP.get_coordinates(data.morphology,
+    num_tips = len(COORD_TYPE.TIP.get_coordinates(data,
                                                   node_types=node_types))
     return num_tips
 
@@ -78,27 +83,20 @@ def calculate_branches_from_root(morphology,
 
         node_types: a list of node types (see neuron_morphology constants)
     """
-    counter = {'num_branches': 0}
-
-    def branch_visitor(node, counter, node_types):
-        num_children = len(morphology.get_children(node,
-                                                   node_types=node_types))
-        if num_children > 1:
-            # branches + (implicit branches from successive bifurcations)
-            counter['num_branches'] += num_children + (num_children - 2)
-        elif counter['num_branches'] == 0:  # still count root with one child
-            counter['num_branches'] += 1
-
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    neighbor_cb = partial(child_ids_by_type,
-                          morphology=morphology,
-                          node_types=node_types)
-    morphology.breadth_first_traversal(visitor,
-                                       start_id=morphology.node_id_cb(root),
-                                       neighbor_cb=neighbor_cb)
-    return counter['num_branches']
+    order = morphology.traversal_order(
+        BREADTH_FIRST, morphology.node_id_cb(root), node_types)
+    num_children = \
+        morphology.topology.num_children_of_types(node_types)[order]
+
+    # branches + (implicit branches from successive bifurcations)
+    num_branches = int(np.sum(
+        np.where(num_children > 1, 2 * num_children - 2, 0)))
+
+    # still count root with one child
+    if num_children[0] <= 1:
+        num_branches += 1
+
+    return num_branches
 
 
 @marked(Intrinsic)
@@ -117,17 +115,26 @@ def num_branches(
         node_types: a list of node types (see neuron_morphology constants)
 
     """
-    morphology = data.morphology
-    nodes = morphology.get_node_by_types(node_types)
-    roots = morphology.get_roots_for_nodes(nodes)
-    num_branches = 0
-    for root in roots:
-        num_branches += calculate_branches_from_root(
-            morphology, root, node_types=node_types)
-        if (morphology.parent_of(root) is not None and
-            len(morphology.get_children_of_node_by_types(root, node_types)) > 1):
-             # if root is a branching node, include the branch that connects root to tree
-            num_branches += 1
+    # every node of these types is reached from exactly one root of the
+    # view, so the branches of all roots can be counted at once
+    view = data.morphology.view(node_types)
+    num_children = view.topology.num_children
+
+    # branches + (implicit branches from successive bifurcations)
+    view_children = num_children[view.indices]
+    num_branches = int(np.sum(
+        np.where(view_children > 1, 2 * view_children - 2, 0)))
+
+    # still count roots with one child
+    roots = view.topology.root_indices
+    root_children = num_children[roots]
+    num_branches += int(np.count_nonzero(root_children <= 1))
+
+    # if a root is a branching node, include the branch that connects root
+    # to tree
+    has_parent = view.arrays.base.parent_index[roots] != NO_INDEX
+    num_branches += int(np.count_nonzero(has_parent & (root_children > 1)))
+
     return num_branches
 
 
@@ -152,35 +159,24 @@ def calculate_mean_fragmentation_from_root(morphology,
 
         node_types: a list of node types (see neuron_morphology constants)
     """
-    counter = {'num_branches': 0,
-               'num_compartments': 0}
-
-    def branch_visitor(node, counter, node_types):
-        num_children = len(morphology.get_children(node,
-                                                   node_types=node_types))
-        if num_children > 1:
-            # branches + (implicit branches from successive bifurcations)
-            counter['num_branches'] += num_children + (num_children - 2)
-            counter['num_compartments'] += num_children + (num_children - 2)
-        elif num_children == 1:
-            counter['num_compartments'] += 1
-            if counter['num_branches'] == 0:  # still count root with one child
-                counter['num_branches'] += 1
-
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    neighbor_cb = partial(child_ids_by_type,
-                          morphology=morphology,
-                          node_types=node_types)
-    morphology.breadth_first_traversal(visitor,
-                                       start_id=morphology.node_id_cb(root),
-                                       neighbor_cb=neighbor_cb)
-
-    mean_fragmentation = counter['num_compartments'] / counter['num_branches']
+    order = morphology.traversal_order(
+        BREADTH_FIRST, morphology.node_id_cb(root), node_types)
+    num_children = \
+        morphology.topology.num_children_of_types(node_types)[order]
+
+    # branches + (implicit branches from successive bifurcations)
+    implicit = np.where(num_children > 1, 2 * num_children - 2, 0)
+    num_branches = int(np.sum(implicit))
+    num_compartments = num_branches + int(np.count_nonzero(num_children == 1))
+
+    # still count root with one child
+    if num_children[0] == 1:
+        num_branches += 1
+
+    mean_fragmentation = num_compartments / num_branches
     return (mean_fragmentation,
-            counter['num_branches'],
-            counter['num_compartments'])
+            num_branches,
+            num_compartments)
 
 
 @marked(Intrinsic)
@@ -244,37 +240,25 @@ def calculate_max_branch_order_from_root(morphology,
 
     """
 
-    root_id = morphology.node_id_cb(root)
-    counter = {'branches_to_node': {root_id: 0},
-               'max_branches': 0}
+    subtree = morphology.traversal_order(
+        PREORDER, morphology.node_id_cb(root))
+    return _max_leaf_branch_order(morphology, subtree, node_types)
 
-    def branch_visitor(node, counter, node_types):
-        cur_branches = counter['branches_to_node'][node['id']]
-        children = morphology.get_children(node)
-        num_children = len(children)
 
-        if num_children > 1:
-            for child in children:
-                counter['branches_to_node'][child['id']] = \
-                    cur_branches + 1
-        elif num_children == 1:
-            if cur_branches == 0:
-                # create a branch even if its just the root + one node
-                counter['branches_to_node'][children[0]['id']] = 1
-            else:
-                counter['branches_to_node'][children[0]['id']] = cur_branches
-        elif num_children == 0 and (node_types is None or node['type'] in node_types):
-            if cur_branches > counter['max_branches']:
-                counter['max_branches'] = cur_branches
-
-    visitor = partial(branch_visitor,
-                      counter=counter,
-                      node_types=node_types)
-    morphology.depth_first_traversal(visitor,
-                                     start_id=root_id)
+def _max_leaf_branch_order(morphology, candidates, node_types=None):
+    """ The greatest branch order (see Morphology.node_orders) among those
+    leaves of the candidate nodes which are of these types
+    """
 
+    leaves = candidates[morphology.topology.is_leaf[candidates]]
+    if node_types is not None:
+        leaves = leaves[np.isin(morphology.arrays.types[leaves], node_types)]
+    if len(leaves) == 0:
+        return 0
 
-    return counter['max_branches']
+    branch_order = morphology.node_orders().branch_order
+    # leaves which are not reached from a root have branch order -1
+    return max(int(branch_order[leaves].max()), 0)
 
 
 @marked(Intrinsic)
@@ -294,12 +278,6 @@ def max_branch_order(
 
     """
     morphology = data.morphology
-    roots = morphology.get_roots()
-    max_branch_order = 0
-    for root in roots:
-        local_max = calculate_max_branch_order_from_root(
-                morphology, root, node_types=node_types)
-        if local_max > max_branch_order:
-            max_branch_order = local_max
-
-    return max_branch_order
+    # every node descends from exactly one root
+    return _max_leaf_branch_order(
+        morphology, np.arange(len(morphology.arrays)), node_types)
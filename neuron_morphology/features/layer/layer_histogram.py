@@ -1,6 +1,5 @@
 from typing import NamedTuple, Optional, Dict, Sequence, Tuple, Type, Any, Union
 from enum import Enum
-from functools import lru_cache
 from collections.abc import Collection
 
 import numpy as np
@@ -13,9 +12,12 @@ from neuron_morphology.feature_extractor.data import Data
 from neuron_morphology.feature_extractor.mark import (
     RequiresReferenceLayerDepths, 
     RequiresLayeredPointDepths, 
-    RequiresRegularPointSpacing
+    RequiresRegularPointSpacing,
+    ReleasesGil
 )
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
+from neuron_morphology.feature_extractor.intermediate import Intermediate
 from neuron_morphology.constants import (
     AXON, SOMA, APICAL_DENDRITE, BASAL_DENDRITE)
 
@@ -114,9 +116,15 @@ class EarthMoversDistanceResult(NamedTuple):
         }
 
 
+# the intermediate product holding a run's per-layer depth histograms
+LAYER_HISTOGRAMS = Intermediate("layer_histograms")
+
+
+@requires(LAYER_HISTOGRAMS)
 @marked(RequiresRegularPointSpacing)
 @marked(RequiresLayeredPointDepths)
 @marked(RequiresReferenceLayerDepths)
+@marked(ReleasesGil)
 def earth_movers_distance(
     data: Data,
     node_types: Sequence[int],
@@ -199,9 +207,11 @@ def histogram_earth_movers_distance(
     )
 
 
+@requires(LAYER_HISTOGRAMS)
 @marked(RequiresRegularPointSpacing)
 @marked(RequiresLayeredPointDepths)
 @marked(RequiresReferenceLayerDepths)
+@marked(ReleasesGil)
 def normalized_depth_histogram(
     data: Data, 
     node_types: Optional[Sequence[int]] = None,
@@ -226,9 +236,6 @@ def normalized_depth_histogram(
     return normalized_depth_histograms_across_layers(
         data=data, point_types=ensure_node_types(node_types), bin_size=bin_size)
 
-# small cache since calling this fn many times probably means the user is 
-# running across multiple specimens, in which case we expect all misses.
-@lru_cache(maxsize=16) 
 def normalized_depth_histograms_across_layers(
     data: Data, 
     point_types: Optional[Tuple[int]] = None,
@@ -236,7 +243,8 @@ def normalized_depth_histograms_across_layers(
     bin_size=5.0
 ) -> Dict[str, LayerHistogram]:
     """ A helper function for running cortical depth histograms across multiple 
-    layers.
+    layers. Histograms are shared by the features of a feature extraction run 
+    (see Data.cached_run).
 
     Parameters
     ----------
@@ -248,6 +256,26 @@ def normalized_depth_histograms_across_layers(
 
     """
 
+    return LAYER_HISTOGRAMS.memoize(
+        data,
+        _normalized_depth_histograms_across_layers,
+        data,
+        point_types,
+        only_layers,
+        bin_size
+    )
+
+
+def _normalized_depth_histograms_across_layers(
+    data: Data, 
+    point_types: Optional[Tuple[int]],
+    only_layers: Optional[Tuple[str]],
+    bin_size: float
+) -> Dict[str, LayerHistogram]:
+    """ Calculate depth histograms (see 
+    normalized_depth_histograms_across_layers) without memoization
+    """
+
     depths = data.layered_point_depths.df # type: ignore[attr-defined]
     if point_types is not None:
         depths = depths[depths["point_type"].isin(set(point_types))]
@@ -1,85 +1,208 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, NamedTuple
+
+import numpy as np
 
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
 from neuron_morphology.feature_extractor.mark import RequiresRoot, Geometric
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
 from neuron_morphology.feature_extractor.data import (
     MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.intermediate import Intermediate
+from neuron_morphology.morphology_arrays import NO_INDEX, PREORDER
+
+
+# the intermediate product holding a run's PathDistances
+PATH_DISTANCES = Intermediate("path_distances")
+
+
+class PathDistances(NamedTuple):
+    """ Along-path distances calculated for every node of a reconstruction.
+    See calculate_path_distances.
+    """
+
+    # the along-path distance from each node's root to that node
+    from_root: np.ndarray
+
+    # the length of the longest (see calculate_path_distances) path from
+    # each node to a tip in its subtree, including the node's own compartment
+    max_downstream: np.ndarray
+
+    # the type of the tip at the end of that path
+    tip_type: np.ndarray
+
+
+def calculate_path_distances(
+    data: MorphologyLike,
+    node_types: Optional[List[int]] = None
+) -> PathDistances:
+    """ Calculate along-path distances for every node of a morphology without
+    recursion, so that arbitrarily long neurites are supported.
+
+    The downstream distance of a node is its compartment's length (zero for
+    roots and soma nodes) plus, if it has children, the greatest downstream
+    distance among them. At bifurcations, only positive distances to tips of
+    node_types are considered; when several children tie, the first (in
+    storage order) is used. If no child qualifies, only the node's own
+    compartment is counted and the node's type is reported as the tip type.
+
+    Parameters
+    ----------
+    data : the reconstruction to measure. Results are shared by all features
+        of a feature extraction run (see Data.cached_run).
+    node_types : types of tips to which paths are measured at bifurcations.
+        Defaults to soma, axon, apical and basal dendrite.
+
+    Returns
+    -------
+    Per-node distances, indexed like morphology.arrays
+
+    """
+
+    return PATH_DISTANCES.memoize(
+        data,
+        _calculate_path_distances,
+        get_morphology(data),
+        node_types
+    )
 
 
-# TODO: There is a breadth_first_traversal method defined on Morphology. We
-# should use that here
-def _calculate_max_path_distance(morphology, root, node_types):
-    # if root not specified, grab the soma root if it exists, and the
-    #   root of the first disconnected tree if not
+def _calculate_path_distances(
+    morphology,
+    node_types: Optional[List[int]]
+) -> PathDistances:
+    """ Calculate path distances (see calculate_path_distances) without
+    memoization
+    """
 
     if node_types is None:
         node_types = [SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE]
+    tip_types = set(node_types)
 
-    if root is None:
-        root = morphology.get_root()
-    total_length = 0.0
-    # sum up length for all child compartments
-    max_tip_type = None
-    while len(morphology.get_children(root)) > 0:
-        # the next node is a continuation from this node (ie, no
-        #   bifurcation). update path length and evaluate the
-        #   next node
-        # path tracing is done using nodes. if a node is associated
-        #   with a compartment (all non-root nodes are) then add that
-        #   compartment's length to the accumulated distance
-        if len(morphology.get_children(root)) == 1:
-            # get length of associated compartment, if it exists, and if
-            #   it's not soma
-            if root['type'] != SOMA:
-                compartment = morphology.get_compartment_for_node(root)
-                if compartment:
-                    total_length += morphology.get_compartment_length(compartment)
-            root = morphology.get_children(root)[0]
-        else:
-            # we reached a bifurcation point
-            # recurse to find length of each child branch and then
-            #   exit loop
-            max_sub_dist = 0.0
-            children_of_root = morphology.get_children(root)
-            for child in children_of_root:
-                dist, tip_type = _calculate_max_path_distance(morphology, child, node_types)
-                if dist > max_sub_dist and tip_type in node_types:
-                    max_sub_dist = dist
-                    max_tip_type = tip_type
-            total_length += max_sub_dist
-            break
-    # the length of this compartment hasn't been included yet, and if it
-    #   isn't part of the soma
-    if max_tip_type is None:
-        max_tip_type = root["type"]
-    if root['type'] != SOMA:
-        compartment = morphology.get_compartment_for_node(root)
-        if compartment:
-            total_length += morphology.get_compartment_length(compartment)
-    return total_length, max_tip_type
-
-
-def calculate_max_path_distance(morphology, root, node_types=None):
+    arrays = morphology.arrays
+    num_nodes = len(arrays)
+
+    geometry = morphology.get_compartment_geometry()
+    length = np.zeros(num_nodes)
+    length[geometry.child_index] = geometry.length
+
+    own_length = length.copy()
+    own_length[arrays.types == SOMA] = 0.0
+
+    from_root = arrays.subtrees.ancestor_sum(length)
+
+    downstream = None
+    if set(np.unique(arrays.types).tolist()) <= tip_types:
+        downstream = _max_downstream_by_reduction(morphology, own_length)
+    if downstream is None:
+        downstream = _max_downstream_by_traversal(
+            morphology, own_length, tip_types)
+
+    return PathDistances(
+        from_root=from_root,
+        max_downstream=downstream[0],
+        tip_type=downstream[1]
+    )
+
+
+def _max_downstream_by_reduction(morphology, own_length):
+    """ Find downstream distances (see calculate_path_distances) when every
+    tip qualifies. The longest path below a node then ends at the tip in its
+    subtree which is farthest from the root (the first, in preorder, among
+    equally distant tips), so that a single subtree reduction suffices.
+
+    Returns None if the result would differ from _max_downstream_by_traversal
+    (where a bifurcation's subtree has no length, and that bifurcation's type
+    would be reported).
+    """
+
+    arrays = morphology.arrays
+    subtrees = arrays.subtrees
+    reached = subtrees.position != NO_INDEX
+    own_from_root = subtrees.ancestor_sum(own_length)
+
+    # rank tips by descending distance from the root, then by position
+    tips = np.flatnonzero(morphology.topology.is_leaf & reached)
+    ranked = tips[np.lexsort(
+        (subtrees.position[tips], -own_from_root[tips]))]
+    rank = np.full(len(arrays), len(ranked), dtype=np.intp)
+    rank[ranked] = np.arange(len(ranked))
+
+    # nodes which are not reached are treated as their own tips
+    best = subtrees.min(rank, initial=len(ranked))
+    farthest = np.arange(len(arrays))
+    farthest[reached] = ranked[best[reached]]
+
+    max_downstream = np.where(
+        reached, own_from_root[farthest] - own_from_root + own_length, 0.0)
+    tip_type = arrays.types[farthest]
+
+    ambiguous = morphology.topology.is_branch \
+        & (max_downstream - own_length <= 0) & (tip_type != arrays.types)
+    if np.any(ambiguous):
+        return None
+    return max_downstream, tip_type
+
+
+def _max_downstream_by_traversal(morphology, own_length, tip_types):
+    """ Find downstream distances (see calculate_path_distances) in a single
+    traversal, visiting children before their parents
+    """
+
+    arrays = morphology.arrays
+    num_nodes = len(arrays)
+
+    offsets = arrays.child_offsets.tolist()
+    children = arrays.child_indices.tolist()
+    own_length = own_length.tolist()
+
+    max_downstream = [0.0] * num_nodes
+    tip_type = arrays.types.tolist()
+
+    for index in reversed(morphology.topology.forest_order(PREORDER).tolist()):
+        start, stop = offsets[index], offsets[index + 1]
+        if stop - start == 1:
+            child = children[start]
+            max_downstream[index] = own_length[index] + max_downstream[child]
+            tip_type[index] = tip_type[child]
+            continue
+
+        best = 0.0
+        for child in children[start: stop]:
+            if max_downstream[child] > best and tip_type[child] in tip_types:
+                best = max_downstream[child]
+                tip_type[index] = tip_type[child]
+        max_downstream[index] = own_length[index] + best
+
+    return (
+        np.array(max_downstream),
+        np.array(tip_type, dtype=arrays.types.dtype)
+    )
+
+
+def calculate_max_path_distance(data, root, node_types=None):
     """ Helper for max_path_distance. See below for more information.
     """
 
-    max_path = 0.0
-    root_children = morphology.get_children(root)
-    if root_children is None:
+    if root is None:
         return float('nan')
-    for node in root_children:
-        path, tip_type = _calculate_max_path_distance(morphology, node, node_types)
+
+    morphology = get_morphology(data)
+    distances = calculate_path_distances(data, node_types)
+    arrays = morphology.arrays
+    children = arrays.children_of_index(
+        arrays.index_of_id(morphology.node_id_cb(root)))
+
+    max_path = 0.0
+    for path in distances.max_downstream[children].tolist():
         if path > max_path:
-            if node_types and tip_type in node_types:
-                max_path = path
-            else:
-                max_path = path
+            max_path = path
     return max_path
 
 
+@requires(PATH_DISTANCES)
 @marked(RequiresRoot)
 @marked(Geometric)
 def max_path_distance(
@@ -106,12 +229,13 @@ def max_path_distance(
 
     morphology = get_morphology(data)
     return calculate_max_path_distance(
-        morphology,
+        data,
         morphology.get_root(),
         node_types
     )
 
 
+@requires(PATH_DISTANCES)
 @marked(RequiresRoot)
 @marked(Geometric)
 def early_branch_path(
@@ -142,106 +266,82 @@ def early_branch_path(
     morphology = get_morphology(data)
     soma = soma or morphology.get_root()
 
-    path_len = _calculate_max_path_distance(morphology, soma, node_types)[0]
+    arrays = morphology.arrays
+    distances = calculate_path_distances(data, node_types)
+    max_downstream = distances.max_downstream
+
+    path_len = max_downstream[arrays.index_of_id(morphology.node_id_cb(soma))]
     if path_len == 0:
         return 0.0
 
-    nodes = morphology.get_node_by_types(node_types)
-    longest_short = 0.0
-
-    for node in nodes:
-        if len(morphology.get_children(node, node_types)) < 2:
-            continue
-
-        current_short = min(
-            _calculate_max_path_distance(morphology, child, node_types)[0]
-            for child in morphology.children_of(node)
-        )
+    topology = morphology.topology
+    if node_types:
+        candidates = topology.indices_of_types(node_types)
+    else:
+        candidates = np.arange(len(arrays))
+    bifurcations = candidates[
+        topology.num_children_of_types(node_types)[candidates] >= 2]
 
+    longest_short = 0.0
+    for index in bifurcations.tolist():
+        current_short = max_downstream[arrays.children_of_index(index)].min()
         longest_short = max(longest_short, current_short)
 
-    return longest_short / path_len
-
-
-def _calculate_mean_contraction(morphology, reference, root, node_types):
-
-    """
-        Calculate the average contraction of all sections. In other words,
-        calculate the average ratio of euclidean distance to path distance
-        between all bifurcations in the morphology. Trifurcations are treated
-        as bifurcations.
-
-        Parameters
-        ----------
-
-        morphology: Morphology object
-
-        reference: dict
-        This is the node of the previous bifurcation
-
-        root: dict
-        This is the node from which to measure branch contraction under
-
-        node_types: list (AXON, BASAL_DENDRITE, APICAL_DENDRITE)
-        Type to restrict search to
+    return float(longest_short / path_len)
 
-        Returns
-        -------
 
-        Two scalars: euclidean distance, path distance
-        These are the total bif-bif and bif-tip distances under this root
-
-    """
-    # advance to next bifurcation or tip and measure distance to
-    #   reference location
-    # on bifurcation, recurse into this function again
-    # treat trifurcation as 2 successive bifs
-    euc_dist = 0
-    path_dist = morphology.euclidean_distance(reference, root)
-    tot_path = 0.0
-    tot_euc = 0.0
-    while len(morphology.get_children(root, node_types)) > 0:
-        # if the next compartment is a continuation (ie, no
-        #   bifurcation) then get the next node
-        if len(morphology.get_children(root, node_types)) == 1:
-            next_node = morphology.get_children(root, node_types)[0]
-            path_dist += morphology.euclidean_distance(root, next_node)
-            root = next_node
-        else:
-            # we reached a bifurcation point. recurse and analyze children
-            for child in morphology.get_children(root, node_types):
-                euc, path = _calculate_mean_contraction(morphology, root, child, node_types)
-                tot_euc += euc
-                tot_path += path
-            break
-    euc_dist += morphology.euclidean_distance(root, reference)
-    return tot_euc + euc_dist, tot_path + path_dist
-
-
-def calculate_mean_contraction(morphology, root=None, node_types=None):
-    """ See mean_contraction
+def calculate_mean_contraction(data, root=None, node_types=None):
+    """ See mean_contraction. Each section runs from a bifurcation to the
+    next bifurcation or tip. Path lengths are obtained as differences of
+    root-to-node distances (see calculate_path_distances).
     """
+    morphology = get_morphology(data)
     roots = morphology.get_roots_for_analysis(root, node_types)
     if roots is None:
         return float('nan')
-    euc_dist = 0.0
-    path_dist = 0.0
+
+    arrays = morphology.arrays
+    topology = morphology.topology
+    num_children = topology.num_children_of_types(node_types)
+    parent_index = arrays.parent_index.tolist()
+    is_bifurcation = (num_children >= 2).tolist()
+
+    section_starts = []
+    section_ends = []
     for ref in roots:
-        # advance to next bifurcation
-        while len(morphology.get_children(ref, node_types)) == 1:
-            ref = morphology.get_children(ref, node_types)[0]
-        if len(morphology.get_children(ref, node_types)) == 0:
-            continue
-        # analyze each branch from this bifurcation point
-        for child in morphology.get_children(ref, node_types):
-            euc, path = _calculate_mean_contraction(morphology, ref, child, node_types)
-            euc_dist += euc
-            path_dist += path
+        order = topology.traversal_order(
+            arrays.index_of_id(morphology.node_id_cb(ref)),
+            PREORDER,
+            node_types
+        ).tolist()
+
+        # the nearest bifurcation above each node, if any. Parents are
+        # visited before their children
+        start_of = {order[0]: NO_INDEX}
+        for index in order[1:]:
+            parent = parent_index[index]
+            start_of[index] = parent if is_bifurcation[parent] \
+                else start_of[parent]
+
+        for index in order:
+            if num_children[index] != 1 and start_of[index] != NO_INDEX:
+                section_starts.append(start_of[index])
+                section_ends.append(index)
+
+    if not section_ends:
+        return float('nan')
+
+    from_root = calculate_path_distances(data, node_types).from_root
+    path_dist = float(np.sum(from_root[section_ends] - from_root[section_starts]))
     if path_dist == 0.0:
         return float('nan')
+
+    delta = arrays.xyz[section_ends] - arrays.xyz[section_starts]
+    euc_dist = float(np.sum(np.sqrt(np.einsum("ij,ij->i", delta, delta))))
     return 1.0 * euc_dist / path_dist
 
 
+@requires(PATH_DISTANCES)
 @marked(Geometric)
 @marked(RequiresRoot)
 def mean_contraction(
@@ -265,9 +365,8 @@ def mean_contraction(
 
     """
 
-    morphology = get_morphology(data)
     return calculate_mean_contraction(
-        morphology,
+        data,
         None,
         node_types
     )
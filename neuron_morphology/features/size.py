@@ -4,6 +4,7 @@ from collections import defaultdict
 from functools import partial
 
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.morphology_arrays import NO_INDEX
 from neuron_morphology.constants import SOMA
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.mark import (
@@ -40,19 +41,14 @@ def total_length(
     """
 
     morphology = get_morphology(data)
+    arrays = morphology.arrays
+    geometry = morphology.get_compartment_geometry(node_types)
 
-    nodes = morphology.get_node_by_types(node_types)
-    compartment_list = morphology.get_compartments(nodes, node_types)
+    parents = geometry.parent_index
+    from_soma_root = (arrays.types[parents] == SOMA) \
+        & (arrays.parent_index[parents] == NO_INDEX)
 
-    total = 0.0
-    for compartment in compartment_list:
-        first_node_in_compartment = compartment[0]
-        if first_node_in_compartment['type'] is SOMA \
-            and not morphology.parent_of(first_node_in_compartment):
-            continue
-        total += morphology.get_compartment_length(compartment)
-
-    return total
+    return float(geometry.length[~from_soma_root].sum())
 
 
 @marked(RequiresRadii)
@@ -79,10 +75,9 @@ def total_surface_area(
     """
 
     morphology: Morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    geometry = morphology.get_compartment_geometry(node_types)
 
-    return sum(map(morphology.get_compartment_surface_area, compartments))
+    return float(geometry.surface_area.sum())
 
 
 @marked(RequiresRadii)
@@ -108,10 +103,9 @@ def total_volume(
     """
     
     morphology = get_morphology(data)
-    nodes = morphology.get_node_by_types(node_types)
-    compartments = morphology.get_compartments(nodes, node_types)
+    geometry = morphology.get_compartment_geometry(node_types)
 
-    return sum(map(morphology.get_compartment_volume, compartments))
+    return float(geometry.volume.sum())
 
 
 @marked(RequiresRadii)
@@ -1,7 +1,10 @@
-from typing import Optional, List
+from typing import Optional, List, Any
 from enum import Enum
 
 from neuron_morphology.morphology import Morphology
+from neuron_morphology.feature_extractor.data import (
+    MorphologyLike, get_morphology)
+from neuron_morphology.feature_extractor.intermediate import Intermediate
 from neuron_morphology.feature_extractor.marked_feature import marked
 from neuron_morphology.feature_extractor.feature_specialization import FeatureSpecialization
 from neuron_morphology.feature_extractor.mark import (
@@ -17,13 +20,39 @@ class COORD_TYPE(Enum):
     BIFURCATION = 2
     TIP = 3
 
-    def get_coordinates(self, morphology,
+    @property
+    def intermediate(self) -> Intermediate:
+        """ The intermediate product holding coordinates of this type
+        """
+        return Intermediate(f"{self.name.lower()}_coordinates")
+
+    def get_coordinates(self, data: MorphologyLike,
                         node_types: Optional[List[int]] = None):
+        """ Coordinates of this type, memoized for the duration of a
+        feature extraction run if data is a Data (see Data.cached_run).
+        Callers must not modify the returned list.
+        """
         fn = {COORD_TYPE.NODE: get_node_coordinates,
               COORD_TYPE.BIFURCATION: get_bifurcation_coordinates,
               COORD_TYPE.COMPARTMENT: get_compartment_coordinates,
               COORD_TYPE.TIP: get_tip_coordinates}.get(self)
-        return fn(morphology, node_types=node_types)
+        return self.intermediate.memoize(
+            data,
+            fn,
+            get_morphology(data),
+            node_types=node_types
+        )
+
+
+def coordinate_intermediates(
+    coord_type: COORD_TYPE = COORD_TYPE.NODE,
+    **kwargs: Any
+) -> List[Intermediate]:
+    """ Resolve the intermediate product consumed by a feature which
+    calculates statistics of the coordinates selected by its coord_type
+    argument (see marked_feature.requires)
+    """
+    return [coord_type.intermediate]
 
 
 class NodeSpec(FeatureSpecialization):
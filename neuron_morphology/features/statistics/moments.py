@@ -4,13 +4,17 @@ import numpy as np
 from scipy import stats
 
 from neuron_morphology.feature_extractor.data import Data
-from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, coordinate_intermediates)
 
-from neuron_morphology.feature_extractor.marked_feature import marked
-from neuron_morphology.feature_extractor.mark import Geometric
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
+from neuron_morphology.feature_extractor.mark import Geometric, ReleasesGil
 
 
+@requires(coordinate_intermediates)
 @marked(Geometric)
+@marked(ReleasesGil)
 def moments(data: Data,
             node_types: Optional[List] = None,
             coord_type: COORD_TYPE = COORD_TYPE.NODE,
@@ -30,7 +34,7 @@ def moments(data: Data,
     """
 
     coordinates = coord_type.get_coordinates(
-                    data.morphology, node_types=node_types)
+                    data, node_types=node_types)
     if not coordinates:
         nan_array = np.empty((3,))
         nan_array[:] = np.nan
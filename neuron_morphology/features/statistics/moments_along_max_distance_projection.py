@@ -5,12 +5,15 @@ from scipy import stats
 from scipy.spatial import distance
 
 from neuron_morphology.feature_extractor.data import Data
-from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, coordinate_intermediates)
 
-from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
 from neuron_morphology.feature_extractor.mark import Geometric,RequiresRoot
 
 
+@requires(COORD_TYPE.NODE.intermediate, coordinate_intermediates)
 @marked(Geometric)
 @marked(RequiresRoot)
 def moments_along_max_distance_projection(
@@ -35,8 +38,8 @@ def moments_along_max_distance_projection(
     """
 
     morphology = data.morphology
-    find_most_distant_coordinates = COORD_TYPE.NODE.get_coordinates(morphology, node_types=node_types)
-    measuring_coordinates = coord_type.get_coordinates(morphology, node_types=node_types)
+    find_most_distant_coordinates = COORD_TYPE.NODE.get_coordinates(data, node_types=node_types)
+    measuring_coordinates = coord_type.get_coordinates(data, node_types=node_types)
 
     if (not find_most_distant_coordinates) or (not measuring_coordinates):
         summary_dict = {
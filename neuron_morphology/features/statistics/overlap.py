@@ -3,10 +3,12 @@ from typing import Optional, List
 import numpy as np
 
 from neuron_morphology.feature_extractor.data import Data
-from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.statistics.coordinates import (
+    COORD_TYPE, coordinate_intermediates)
 
-from neuron_morphology.feature_extractor.marked_feature import marked
-from neuron_morphology.feature_extractor.mark import Geometric
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires)
+from neuron_morphology.feature_extractor.mark import Geometric, ReleasesGil
 
 
 def calculate_coordinate_overlap_from_min_max(coordinates: np.ndarray,
@@ -80,7 +82,9 @@ def calculate_coordinate_overlap(coordinates_a,
     return overlap_features
 
 
+@requires(coordinate_intermediates)
 @marked(Geometric)
+@marked(ReleasesGil)
 def overlap(data: Data,
             node_types: Optional[List[int]] = None,
             node_types_to_compare: Optional[List[int]] = None,
@@ -109,8 +113,8 @@ def overlap(data: Data,
         dimension: dimension to compare (0, 1, 2 for x, y, z), default 1 (y)
 
     """
-    coords_a = coord_type.get_coordinates(data.morphology, node_types)
-    coords_b = coord_type.get_coordinates(data.morphology, node_types_to_compare)
+    coords_a = coord_type.get_coordinates(data, node_types)
+    coords_b = coord_type.get_coordinates(data, node_types_to_compare)
 
     overlap_features = calculate_coordinate_overlap(coords_a,
                                                     coords_b,
@@ -7,11 +7,35 @@ from allensdk.core.simple_tree import SimpleTree
 import neuron_morphology.validation as validation
 from neuron_morphology.validation.result import InvalidMorphology
 from neuron_morphology.constants import *
+from neuron_morphology.morphology_arrays import (
+    MorphologyArrays, TopologyIndex, CompartmentGeometry, NearestNodes,
+    NodeOrders, compartment_geometry, NO_INDEX, PREORDER, BREADTH_FIRST)
+from neuron_morphology.morphology_view import MorphologyView
+from neuron_morphology.resample import resample_arrays
 from scipy.spatial.distance import euclidean
 import numpy as np
 import copy
 import queue
 import math
+import operator
+
+
+def node_id(node):
+    """ Get a node's id from its "id" key. Unlike an equivalent lambda, this
+    callback can be pickled.
+    """
+    return node["id"]
+
+
+def node_parent_id(node):
+    """ Get a node's parent's id from its "parent" key. Unlike an equivalent
+    lambda, this callback can be pickled.
+    """
+    return node["parent"]
+
+
+def _edge_parent_id(node):
+    return node["parent_id"]
 
 
 class Morphology(SimpleTree):
@@ -19,10 +43,10 @@ class Morphology(SimpleTree):
     def __init__(self, nodes, node_id_cb, parent_id_cb):
 
         self._nodes = {node_id_cb(n): n for n in nodes}
-        self._parent_id_cb = lambda node: parent_id_cb(node) if parent_id_cb(node) in self._nodes else None
+        self._raw_parent_id_cb = parent_id_cb
+        self._parent_id_cb = self._parent_id_if_present
         self._parent_ids = {nid: self._parent_id_cb(n) for nid, n in iteritems(self._nodes)}
         self._child_ids = {nid: [] for nid in self._nodes}
-        self.compartments_for_nodes = {}
 
         for nid in self._parent_ids:
             pid = self._parent_ids[nid]
@@ -31,13 +55,246 @@ class Morphology(SimpleTree):
 
         self.node_id_cb = node_id_cb
         self.parent_id_cb = self._parent_id_cb
-        self.nodes_by_types = {}
-        self._create_compartment_dictionary()
-        self.compartments = self.get_compartments()
+        self._arrays_cache = None
+        self._node_list_cache = None
+        self._shares_topology = False
+        self._compartments_for_nodes = None
+        self._compartments = None
 
     def __len__(self):
         return len(self._nodes)
 
+    def __getstate__(self):
+        # cached data are rebuilt on demand, so need not be pickled
+        state = dict(self.__dict__)
+        state["_arrays_cache"] = None
+        state["_node_list_cache"] = None
+        state["_compartments_for_nodes"] = None
+        state["_compartments"] = None
+        return state
+
+    def _parent_id_if_present(self, node):
+        """ The id of a node's parent, or None if the parent is not in this
+        morphology
+        """
+
+        parent_id = self._raw_parent_id_cb(node)
+        return parent_id if parent_id in self._nodes else None
+
+    @classmethod
+    def from_arrays(cls, arrays: MorphologyArrays) -> "Morphology":
+        """ Build a Morphology whose nodes are dictionaries (with id, type,
+        x, y, z, radius and parent keys) from a MorphologyArrays.
+        """
+
+        nodes = [
+            {
+                "id": node_id,
+                "type": node_type,
+                "x": x,
+                "y": y,
+                "z": z,
+                "radius": radius,
+                "parent": parent
+            }
+            for node_id, node_type, (x, y, z), radius, parent in zip(
+                arrays.ids.tolist(),
+                arrays.types.tolist(),
+                arrays.xyz.tolist(),
+                arrays.radius.tolist(),
+                arrays.parent_ids.tolist()
+            )
+        ]
+
+        return cls(
+            nodes,
+            node_id_cb=node_id,
+            parent_id_cb=node_parent_id,
+        )
+
+    @property
+    def compartments_for_nodes(self):
+        """ Maps the id of each non-root node to its compartment (a
+        [parent, node] list). Built on first access.
+        """
+
+        if self._compartments_for_nodes is None:
+            self._compartments_for_nodes = {}
+            self._create_compartment_dictionary()
+        return self._compartments_for_nodes
+
+    @compartments_for_nodes.setter
+    def compartments_for_nodes(self, value):
+        self._compartments_for_nodes = value
+
+    @property
+    def compartments(self):
+        """ A list of all compartments in this morphology. Built on first
+        access.
+        """
+
+        if self._compartments is None:
+            self._compartments = self.get_compartments()
+        return self._compartments
+
+    @compartments.setter
+    def compartments(self, value):
+        self._compartments = value
+
+    @property
+    def arrays(self) -> MorphologyArrays:
+        """ A struct-of-arrays (see MorphologyArrays) snapshot of this
+        morphology's nodes, suitable for vectorized calculations. Built on
+        first access and cached.
+
+        Notes
+        -----
+        Methods which modify this morphology discard the cached arrays. If
+        you modify node dictionaries directly, call invalidate_caches
+        afterwards. Features check for such modifications when they are
+        given this morphology, or when a run begins (see refresh_caches and
+        feature_extractor.data.get_morphology).
+
+        """
+
+        if self._arrays_cache is None:
+            self._arrays_cache = MorphologyArrays.from_nodes(
+                self._nodes.values(),
+                node_id_cb=self.node_id_cb,
+                parent_id_cb=self.parent_id_cb
+            )
+        return self._arrays_cache
+
+    @property
+    def topology(self) -> TopologyIndex:
+        """ Child counts, leaf / branch / root masks and per-type node
+        indices of this morphology. Built on first access and discarded
+        along with the arrays. Use node_at and nodes_at to look up the nodes
+        at these indices.
+        """
+
+        return self.arrays.topology
+
+    def content_hash(self) -> str:
+        """ A digest of this morphology's node ids, parents, types, positions
+        and radii (see MorphologyArrays.content_hash), suitable for keying
+        caches of results calculated from it. Cached along with self.arrays.
+
+        Notes
+        -----
+        Types, positions and radii modified in place are detected (see
+        refresh_caches), at a cost linear in the number of nodes, so that an
+        unchanged hash means unchanged nodes. Modifying ids or parents in
+        place is not supported; call invalidate_caches afterwards.
+
+        """
+
+        self.refresh_caches()
+        return self.arrays.content_hash()
+
+    def node_orders(self, node_types=None) -> NodeOrders:
+        """ The branch, centrifugal and Strahler order, subtree size and
+        subtree path length of every node (see
+        neuron_morphology.morphology_arrays.node_orders), computed in one
+        pass and cached along with self.arrays.
+
+        Parameters
+        ----------
+        node_types : consider only nodes of these types (see view). If not
+            provided, all nodes are considered.
+
+        Returns
+        -------
+        Arrays indexed by storage index. Use self.arrays.index_of to find the
+            storage indices of particular node ids.
+
+        """
+
+        return self.arrays.node_orders(node_types)
+
+    def view(self, node_types=None) -> MorphologyView:
+        """ The subgraph formed by the nodes of these types (see
+        MorphologyView). Its child index, roots and traversal orders are
+        computed once and discarded along with this morphology's other
+        cached data.
+
+        Parameters
+        ----------
+        node_types : include only nodes of these types. If not provided, all
+            nodes are included.
+
+        """
+
+        return MorphologyView(self, self.arrays.view(node_types))
+
+    def invalidate_caches(self):
+        """ Discard any data derived from this morphology's nodes. Must be
+        called after nodes are modified in place, unless only their types,
+        positions and radii changed and refresh_caches is called instead.
+        """
+
+        self._arrays_cache = None
+        self._node_list_cache = None
+        self._compartments_for_nodes = None
+        self._compartments = None
+
+    def refresh_caches(self) -> bool:
+        """ Discard any data derived from this morphology's nodes (see
+        invalidate_caches) if the type, position or radius of any node has
+        been modified in place since they were built. Takes time linear in
+        the number of nodes.
+
+        Returns
+        -------
+        Whether the cached data were discarded
+
+        """
+
+        arrays = self._arrays_cache
+        if arrays is None:
+            return False
+
+        nodes = list(self._nodes.values())
+        if len(nodes) != len(arrays):
+            self.invalidate_caches()
+            return True
+
+        current = {}
+        for key, default in (
+            ("type", NO_INDEX), ("x", np.nan), ("y", np.nan), ("z", np.nan),
+            ("radius", np.nan)
+        ):
+            try:
+                values = map(operator.itemgetter(key), nodes)
+                current[key] = np.fromiter(values, float, count=len(nodes))
+            except (KeyError, TypeError):
+                current[key] = np.array(
+                    [node.get(key, default) for node in nodes], dtype=float)
+
+        xyz = np.stack([current["x"], current["y"], current["z"]], axis=1)
+        if np.array_equal(current["type"], arrays.types) \
+                and np.array_equal(xyz, arrays.xyz, equal_nan=True) \
+                and np.array_equal(
+                    current["radius"], arrays.radius, equal_nan=True):
+            return False
+
+        self.invalidate_caches()
+        return True
+
+    def node_at(self, index):
+        """ Get the node stored at this index of self.arrays
+        """
+        return self.nodes_at([index])[0]
+
+    def nodes_at(self, indices):
+        """ Get the nodes stored at each of these indices of self.arrays
+        """
+
+        if self._node_list_cache is None:
+            self._node_list_cache = list(self._nodes.values())
+        node_list = self._node_list_cache
+        return [node_list[index] for index in np.asarray(indices).tolist()]
+
     def validate(self, strict=False):
         """
         Validate the neuron morphology in
@@ -119,24 +376,23 @@ class Morphology(SimpleTree):
         Root node object
 
         """
-        root_node = None
-        root_nodes = self.filter_nodes(lambda node: self.parent_id_cb(node) is None)
-        if root_nodes:
-            root_node = root_nodes[0]
-        return root_node
+        root_indices = self.topology.root_indices
+        if len(root_indices):
+            return self.node_at(root_indices[0])
+        return None
 
     def get_roots(self):
-        return self.filter_nodes(lambda node: self.parent_id_cb(node) is None)
+        return self.nodes_at(self.topology.root_indices)
 
     def get_root_id(self):
         return self.node_id_cb(self.get_root())
 
     def get_roots_for_nodes(self, nodes):
-        tree_roots = []
-        for node in nodes:
-            if self.parent_of(node) not in nodes:
-                tree_roots.append(node)
-        return tree_roots
+        node_ids = {node['id'] for node in nodes}
+        return [
+            node for node in nodes
+            if self._parent_ids[node['id']] not in node_ids
+        ]
 
     def get_roots_for_analysis(self, root=None, node_types=None):
         """
@@ -206,25 +462,15 @@ class Morphology(SimpleTree):
 
     def get_node_by_types(self, node_types=None):
         if node_types:
-            node_by_types = []
-            for node_type in node_types:
-                if node_type not in self.nodes_by_types:
-                    self.nodes_by_types[node_type] = self.filter_nodes(lambda node: node['type'] == node_type)
-                node_by_types += self.nodes_by_types[node_type]
-            return node_by_types
+            return self.nodes_at(self.topology.indices_of_types(node_types))
         else:
             return self.nodes()
 
     def has_type(self, node_type):
-        if node_type not in self.nodes_by_types:
-            self.nodes_by_types[node_type] = self.filter_nodes(lambda node: node['type'] == node_type)
-        if self.nodes_by_types[node_type]:
-            return True
-        else:
-            return False
+        return self.topology.has_type(node_type)
 
     def get_non_soma_nodes(self):
-        return self.filter_nodes(lambda node: node['type'] != SOMA)
+        return self.nodes_at(self.topology.non_soma_indices)
 
     def get_max_id(self):
         return max(self._nodes)
@@ -303,13 +549,12 @@ class Morphology(SimpleTree):
 
     def _create_compartment_dictionary(self):
 
-        nodes = self.nodes()
-        for node in nodes:
-            parent = self.parent_of(node)
-            if not parent:
+        compartments_for_nodes = self._compartments_for_nodes
+        for nid, node in iteritems(self._nodes):
+            pid = self._parent_ids[nid]
+            if pid is None:
                 continue
-            compartment = [parent, node]
-            self.compartments_for_nodes[node['id']] = compartment
+            compartments_for_nodes[node['id']] = [self._nodes[pid], node]
 
     def get_compartments(self, nodes=None, node_types=None):
 
@@ -389,37 +634,238 @@ class Morphology(SimpleTree):
             ( first_rad ** 2 + first_rad * second_rad + second_rad ** 2 )
 
 
+    def get_compartment_geometry(self, node_types=None) -> CompartmentGeometry:
+        """ Calculate the length, lateral surface area, volume and midpoint of
+        every compartment at once. See get_compartment_surface_area and
+        get_compartment_volume for the single-compartment equivalents.
+
+        Parameters
+        ----------
+        node_types : if provided, only include compartments whose nodes are
+            both of these types
+
+        Returns
+        -------
+        Arrays of compartment properties, indexed in parallel. Use
+            self.arrays.ids to convert the parent and child indices to ids.
+
+        """
+
+        return compartment_geometry(self.arrays, node_types)
+
+    def nearest_nodes(self, points, k=1, tolerance=None, node_types=None) -> NearestNodes:
+        """ Find the nodes nearest to each of some points, using a KD-tree
+        which is built on first use and cached along with self.arrays.
+
+        Parameters
+        ----------
+        points : a single (3,) point or an (M, 3) array of points
+        k : how many nodes to find per point
+        tolerance : if provided, only find nodes at most this far from each
+            point
+        node_types : if provided, only find nodes of these types
+
+        Returns
+        -------
+        Distances to, and storage indices of, the nodes found (see
+            MorphologyArrays.spatial_index). Missing nodes have index -1. Use
+            nodes_at to obtain the nodes themselves.
+
+        """
+
+        return self.arrays.spatial_index(node_types).nearest(
+            points, k, tolerance)
+
+    def nodes_within(self, point, radius, node_types=None):
+        """ Find the nodes (of these types, if provided) which are at most
+        radius away from a point
+        """
+
+        return self.nodes_at(
+            self.arrays.spatial_index(node_types).within(point, radius))
+
+    def lowest_common_ancestor(self, node_a, node_b):
+        """ Find the deepest node from which both of two nodes descend (a
+        node is considered to descend from itself), or None if they are in
+        different trees. See MorphologyArrays.ancestry.
+        """
+
+        arrays = self.arrays
+        index = arrays.ancestry.lowest_common_ancestor(
+            arrays.index_of_id(self.node_id_cb(node_a)),
+            arrays.index_of_id(self.node_id_cb(node_b))
+        )
+        if index == NO_INDEX:
+            return None
+        return self.node_at(index)
+
+    def path_distance(self, node_a, node_b) -> float:
+        """ Find the length of the path through this morphology between two
+        nodes (inf if they are in different trees). The first query builds a
+        lowest common ancestor index, which is cached along with self.arrays;
+        later queries take constant time.
+        """
+
+        arrays = self.arrays
+        return float(arrays.ancestry.path_distance(
+            arrays.index_of_id(self.node_id_cb(node_a)),
+            arrays.index_of_id(self.node_id_cb(node_b))
+        ))
+
+    def path_distances(self, nodes_a, nodes_b=None) -> np.ndarray:
+        """ Find the path distance between each of some nodes and each of
+        some others (e.g. between all pairs of tips).
+
+        Parameters
+        ----------
+        nodes_a : a sequence of M nodes
+        nodes_b : a sequence of K nodes. If not provided, use nodes_a
+
+        Returns
+        -------
+        An (M, K) array of path distances (see path_distance)
+
+        """
+
+        arrays = self.arrays
+        indices = []
+        for nodes in (nodes_a, nodes_b):
+            if nodes is None:
+                indices.append(None)
+                continue
+            ids = [self.node_id_cb(node) for node in nodes]
+            index = arrays.index_of(ids)
+            if np.any(index == NO_INDEX):
+                raise KeyError(ids[int(np.argmax(index == NO_INDEX))])
+            indices.append(index)
+
+        return arrays.ancestry.pairwise_path_distance(*indices)
+
     def get_compartment_midpoint(self, compartment):
         return self.midpoint(compartment[0], compartment[1])
 
     def get_leaf_nodes(self, node_types=None):
-        if not node_types:
-            nodes = self.get_non_soma_nodes()
-        else:
-            nodes = self.get_node_by_types(node_types)
+        return self.nodes_at(self.topology.leaf_indices(node_types))
 
-        leaf_nodes = []
-        for node in nodes:
-            if not self.get_children(node):
-                leaf_nodes.append(node)
+    def get_branching_nodes(self, node_types=None):
+        return self.nodes_at(self.topology.branching_indices(node_types))
 
-        return leaf_nodes
+    def clone(self):
+        """ Make a copy of this morphology whose nodes may be modified
+        independently. Node dictionaries are copied (shallowly), while the
+        parent / child id maps and any cached arrays are shared until either
+        morphology's topology is modified.
+        """
 
-    def get_branching_nodes(self, node_types=None):
-        if not node_types:
-            nodes = self.get_non_soma_nodes()
-        else:
-            nodes = self.get_node_by_types(node_types)
+        clone = copy.copy(self)
+        clone._nodes = {nid: copy.copy(node) for nid, node in iteritems(self._nodes)}
+        if self.parent_id_cb == self._parent_id_cb:
+            clone.parent_id_cb = clone._parent_id_if_present
+        clone._parent_id_cb = clone._parent_id_if_present
+        clone._compartments_for_nodes = None
+        clone._compartments = None
+        clone._node_list_cache = None
+        if self._arrays_cache is not None:
+            clone._arrays_cache = self._arrays_cache.clone()
+
+        self._shares_topology = True
+        clone._shares_topology = True
+        return clone
+
+    def set_coordinates(self, xyz, radius=None):
+        """ Replace the position (and optionally the radius) of every node at
+        once.
 
-        branching_nodes = []
-        for node in nodes:
-            if len(self.get_children(node)) > 1:
-                branching_nodes.append(node)
+        Parameters
+        ----------
+        xyz : (N, 3) array-like of new positions, ordered like self.arrays
+        radius : (N,) array-like of new radii, ordered like self.arrays
 
-        return branching_nodes
+        """
 
-    def clone(self):
-        return copy.deepcopy(self)
+        arrays = self.arrays
+        nodes = self.nodes_at(np.arange(len(arrays)))
+
+        xyz = np.asarray(xyz, dtype=float).reshape((-1, 3))
+        for node, (x, y, z) in zip(nodes, xyz.tolist()):
+            node['x'] = x
+            node['y'] = y
+            node['z'] = z
+        arrays.set_column("xyz", xyz)
+
+        if radius is not None:
+            radius = np.asarray(radius, dtype=float)
+            for node, node_radius in zip(nodes, radius.tolist()):
+                node['radius'] = node_radius
+            arrays.set_column("radius", radius)
+
+    def resample(self, spacing, keep_original_nodes=False):
+        """ Build a copy of this morphology whose nodes are placed at regular
+        intervals of path distance along each unbranched section. Roots,
+        branch points, tips, nodes on either side of a change of node type
+        and soma nodes are kept.
+        Unlike build_intermediate_nodes, all new nodes are calculated at once.
+
+        Parameters
+        ----------
+        spacing : float
+            The path distance between successive new nodes.
+        keep_original_nodes : bool, optional
+            If True, keep this morphology's other nodes as well. Defaults to
+            False.
+
+        Returns
+        -------
+        A new morphology of the same kind as this one, with contiguous ids
+            beginning at 1. See neuron_morphology.resample.resample_arrays.
+
+        """
+
+        self.refresh_caches()
+        return self.from_arrays(
+            resample_arrays(self.arrays, spacing, keep_original_nodes))
+
+    def in_preorder(self, renumber=False):
+        """ Build a copy of this morphology whose nodes are stored in
+        depth-first (preorder) order, so that each node's subtree occupies a
+        contiguous range of storage indices (see MorphologyArrays.subtrees)
+        and traversals read its arrays sequentially.
+
+        Parameters
+        ----------
+        renumber : bool, optional
+            If True, give nodes contiguous ids beginning at 1, in preorder.
+            The new ids are stored under the "id" and "parent" keys of each
+            (copied) node. Defaults to False.
+
+        Returns
+        -------
+        A new morphology of the same kind as this one
+
+        """
+
+        arrays = self.arrays
+        order = arrays.subtrees.order
+        if len(order) != len(arrays):
+            raise ValueError("cannot reorder a morphology containing cycles")
+
+        nodes = [copy.copy(node) for node in self.nodes_at(order)]
+        if not renumber:
+            return self.__class__(
+                nodes,
+                node_id_cb=self.node_id_cb,
+                parent_id_cb=self._raw_parent_id_cb
+            )
+
+        renumbered = arrays.in_preorder(renumber=True)
+        for node, new_id, parent_id in zip(
+            nodes, renumbered.ids.tolist(), renumbered.parent_ids.tolist()
+        ):
+            node["id"] = new_id
+            node["parent"] = parent_id
+
+        return self.__class__(
+            nodes, node_id_cb=node_id, parent_id_cb=node_parent_id)
 
     def build_intermediate_nodes(self, make_intermediates_cb, set_parent_id_cb):
 
@@ -428,6 +874,12 @@ class Morphology(SimpleTree):
 
     def _insert_between(self, new_node, parent_id, child_id, set_parent_id_cb):
 
+        self.invalidate_caches()
+        if self._shares_topology:
+            self._parent_ids = dict(self._parent_ids)
+            self._child_ids = dict(self._child_ids)
+            self._shares_topology = False
+
         node_id = self.node_id_cb(new_node)
         self._nodes[node_id] = new_node
 
@@ -464,6 +916,71 @@ class Morphology(SimpleTree):
 
                 self._insert_between(new_node, parent_id, child_id, set_parent_id_cb)
 
+    def traversal_order(self, order=PREORDER, start_id=None, node_types=None):
+
+        """ Find the order in which a traversal would visit this morphology's
+        nodes. Orders are cached until this morphology is modified.
+
+            Parameters
+            ----------
+
+            order : str, optional
+                One of "preorder" (the default), "postorder" or "breadth_first".
+
+            start_id : hashable, optional
+                Begin the traversal from this node. Defaults to self.get_root_id().
+
+            node_types : list of int, optional
+                If provided, only descend into children of these types. The start
+                node is visited regardless of its type.
+
+            Returns
+            -------
+            A read-only array of indices into self.arrays. Use nodes_at to obtain
+            the corresponding nodes.
+
+        """
+
+        if start_id is None:
+            start_index = self.topology.root_indices[0]
+        else:
+            start_index = self.arrays.index_of_id(start_id)
+
+        return self.topology.traversal_order(start_index, order, node_types)
+
+    def batch_traversal(
+        self, visit_batch, order=PREORDER, start_id=None, node_types=None,
+        batch_size=None
+    ):
+
+        """ Apply a function to successive batches of nodes, in traversal order.
+        This avoids the per-node overhead of breadth_first_traversal and
+        depth_first_traversal.
+
+            Parameters
+            ----------
+
+            visit_batch : callable
+                Will be applied to each batch. Signature must be
+                visit_batch(indices), where indices is an array of indices into
+                self.arrays. Return is ignored.
+
+            order, start_id, node_types :
+                See traversal_order.
+
+            batch_size : int, optional
+                The maximum number of nodes per batch. Defaults to visiting all
+                nodes in a single batch.
+
+        """
+
+        indices = self.traversal_order(order, start_id, node_types)
+        if batch_size is None:
+            batch_size = max(len(indices), 1)
+
+        for batch_start in range(0, len(indices), batch_size):
+            visit_batch(indices[batch_start: batch_start + batch_size])
+
     def breadth_first_traversal(self, visit, neighbor_cb=None, start_id=None):
 
         """ Apply a function to each node of a connected graph in breadth-first order
@@ -484,32 +1001,20 @@ class Morphology(SimpleTree):
 
             Notes
             -----
-            assumes rooted, acyclic
+            assumes rooted, acyclic. When neighbor_cb is not provided, the traversal
+            order is determined (and cached) before any node is visited, so nodes
+            added by visit are not themselves visited.
 
         """
 
         if neighbor_cb is None:
-            def child_ids_cb(node_id):
-                nested_ids = self.child_ids([node_id])
-                return [nid for nids in nested_ids for nid in nids]
-            neighbor_cb = child_ids_cb
-
-        if start_id is None:
-            start_id = self.get_root_id()
-
-        neighbor_ids = deque([start_id])
-        visited_ids = set([])
-
-        while neighbor_ids:
-            current_id = neighbor_ids.popleft()
-            current_node = self.nodes([current_id])[0]
-
-            visit(current_node)
-            visited_ids.update([current_id])
+            for node in self.nodes_at(
+                self.traversal_order(BREADTH_FIRST, start_id)
+            ):
+                visit(node)
+            return
 
-            new_neighbor_ids = neighbor_cb(current_id)
-            new_neighbor_ids = set(new_neighbor_ids) - visited_ids
-            neighbor_ids.extend(new_neighbor_ids)
+        self._generic_traversal(visit, neighbor_cb, start_id, depth_first=False)
 
     def depth_first_traversal(self, visit, neighbor_cb=None, start_id=None):
 
@@ -531,32 +1036,37 @@ class Morphology(SimpleTree):
 
             Notes
             -----
-            assumes rooted, acyclic
+            assumes rooted, acyclic. When neighbor_cb is not provided, nodes are
+            visited in (cached) preorder. See breadth_first_traversal.
 
         """
 
         if neighbor_cb is None:
-            def child_ids_cb(node_id):
-                nested_ids = self.child_ids([node_id])
-                return [nid for nids in nested_ids for nid in nids]
-            neighbor_cb = child_ids_cb
+            for node in self.nodes_at(self.traversal_order(PREORDER, start_id)):
+                visit(node)
+            return
+
+        self._generic_traversal(visit, neighbor_cb, start_id, depth_first=True)
+
+    def _generic_traversal(self, visit, neighbor_cb, start_id, depth_first):
+
+        """ Traverse using an arbitrary neighbor callback. Used by
+        breadth_first_traversal and depth_first_traversal.
+        """
 
         if start_id is None:
             start_id = self.get_root_id()
 
         neighbor_ids = deque([start_id])
         visited_ids = set([])
+        next_id = neighbor_ids.pop if depth_first else neighbor_ids.popleft
 
         while neighbor_ids:
-            current_id = neighbor_ids.pop()
-            current_node = self.nodes([current_id])[0]
-
-            visit(current_node)
-            visited_ids.update([current_id])
+            current_id = next_id()
+            visit(self.nodes([current_id])[0])
+            visited_ids.add(current_id)
 
-            new_neighbor_ids = neighbor_cb(current_id)
-            new_neighbor_ids = set(new_neighbor_ids) - visited_ids
-            neighbor_ids.extend(new_neighbor_ids)
+            neighbor_ids.extend(set(neighbor_cb(current_id)) - visited_ids)
 
     def swap_nodes_edges(self, merge_cb=None, parent_id_cb=None, make_root_cb=None, start_id=None):
 
@@ -601,20 +1111,16 @@ class Morphology(SimpleTree):
         if make_root_cb is None:
             make_root_cb= default_make_root_cb
 
-        def node_id_cb(node):
-            return node['id']
-
-        if node_id_cb is None:
-            node_id_cb = node_id_cb
+        node_id_cb = node_id
 
         new_nodes = [make_root_cb(self)]
         visit = functools.partial(self._get_edge_and_merge, merge_cb, new_nodes)
 
         self.breadth_first_traversal(visit, start_id=start_id)
 
-        new_node_ids = set([node['id'] for node in new_nodes])
+        # parents which are not among the new nodes are treated as missing
         if parent_id_cb is None:
-            parent_id_cb = lambda node: node['parent_id'] if node['parent_id'] in new_node_ids else None
+            parent_id_cb = _edge_parent_id
 
         return self.__class__(new_nodes, node_id_cb=node_id_cb, parent_id_cb=parent_id_cb)
 
@@ -0,0 +1,1747 @@
+""" A compact, struct-of-arrays representation of a reconstruction's nodes.
+
+MorphologyArrays stores one entry per node in a handful of contiguous numpy
+arrays (ids, parent ids, types, coordinates, radii) along with a parent index
+and a CSR (compressed sparse row) child index. It is the storage format of
+ArrayMorphology and the basis of the vectorized (whole-reconstruction)
+calculations available on Morphology.
+"""
+
+from typing import (
+    Optional, Sequence, Any, Iterable, Dict, NamedTuple, Tuple, List)
+
+import hashlib
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from neuron_morphology.constants import SOMA
+
+
+# Used as the parent index of root nodes and as the index of missing ids
+NO_INDEX = -1
+
+# Supported traversal orders. See TopologyIndex.traversal_order
+PREORDER = "preorder"
+POSTORDER = "postorder"
+BREADTH_FIRST = "breadth_first"
+TRAVERSAL_ORDERS = (PREORDER, POSTORDER, BREADTH_FIRST)
+
+ID_DTYPE = np.int64
+TYPE_DTYPE = np.int32
+INDEX_DTYPE = np.int32
+FLOAT_DTYPE = np.float64
+
+# the node-wise columns of a MorphologyArrays
+COLUMNS = ("ids", "parent_ids", "types", "xyz", "radius")
+
+# see MorphologyArrays.content_hash
+CONTENT_HASH_VERSION = 1
+CONTENT_HASH_SIZE = 16
+
+# modifying these columns changes a reconstruction's topology
+_INDEXED_COLUMNS = ("ids", "parent_ids", "types")
+
+
+class MorphologyArrays:
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        parent_ids: Sequence[int],
+        types: Sequence[int],
+        xyz: Any,
+        radius: Optional[Sequence[float]] = None
+    ):
+        """ Node-wise columns describing a reconstruction.
+
+        Parameters
+        ----------
+        ids : the unique identifier of each node
+        parent_ids : the identifier of each node's parent. Nodes whose parent
+            identifier does not appear in ids (e.g. -1) are roots
+        types : the type (see neuron_morphology.constants) of each node
+        xyz : (N, 3) array-like of node positions
+        radius : the radius of each node. If not provided, radii are nan
+
+        """
+
+        self.ids: np.ndarray = _as_id_array(ids)
+        self.parent_ids: np.ndarray = _as_id_array(parent_ids)
+        self.types: np.ndarray = np.asarray(types, dtype=TYPE_DTYPE)
+        self.xyz: np.ndarray = np.asarray(
+            xyz, dtype=FLOAT_DTYPE).reshape((-1, 3))
+
+        if radius is None:
+            radius = np.full(len(self.ids), np.nan)
+        self.radius: np.ndarray = np.asarray(radius, dtype=FLOAT_DTYPE)
+
+        num_nodes = len(self.ids)
+        for name in ("parent_ids", "types", "xyz", "radius"):
+            if len(getattr(self, name)) != num_nodes:
+                raise ValueError(
+                    f"expected {num_nodes} {name}, found "
+                    f"{len(getattr(self, name))}"
+                )
+
+        self._id_lookup: Optional[Any] = None
+        self._parent_index: Optional[np.ndarray] = None
+        self._child_offsets: Optional[np.ndarray] = None
+        self._child_indices: Optional[np.ndarray] = None
+        self._topology: Optional["TopologyIndex"] = None
+        self._views: Dict[Any, "ArraysView"] = {}
+        self._spatial_indices: Dict[Any, "SpatialIndex"] = {}
+        self._node_orders: Dict[Any, "NodeOrders"] = {}
+        self._subtrees: Optional["SubtreeIndex"] = None
+        self._ancestry: Optional["AncestryIndex"] = None
+        self._content_hash: Optional[str] = None
+
+        # columns whose data may be shared with a clone. See writable
+        self._shared_columns: set = set()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getstate__(self):
+        # indices and other derived data are rebuilt on demand
+        return {name: getattr(self, name) for name in COLUMNS}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @classmethod
+    def from_nodes(
+        cls,
+        nodes: Iterable[Dict[str, Any]],
+        node_id_cb=None,
+        parent_id_cb=None
+    ) -> "MorphologyArrays":
+        """ Build arrays from a sequence of node dictionaries.
+
+        Parameters
+        ----------
+        nodes : each must have an "id" and "type". Missing positions and radii
+            are filled with nan. Missing parents are treated as roots.
+        node_id_cb : maps a node to its id. Defaults to node["id"]
+        parent_id_cb : maps a node to its parent's id (or None). Defaults to
+            node["parent"]
+
+        """
+
+        if node_id_cb is None:
+            node_id_cb = _default_node_id
+        if parent_id_cb is None:
+            parent_id_cb = _default_parent_id
+
+        nodes = list(nodes)
+        ids = [node_id_cb(node) for node in nodes]
+        parent_ids = [parent_id_cb(node) for node in nodes]
+        parent_ids = [NO_INDEX if pid is None else pid for pid in parent_ids]
+        xyz = [
+            (node.get("x", np.nan), node.get("y", np.nan), node.get("z", np.nan))
+            for node in nodes
+        ]
+
+        return cls(
+            ids=ids,
+            parent_ids=parent_ids,
+            types=[node.get("type", NO_INDEX) for node in nodes],
+            xyz=np.array(xyz, dtype=FLOAT_DTYPE).reshape((-1, 3)),
+            radius=[node.get("radius", np.nan) for node in nodes]
+        )
+
+    @property
+    def parent_index(self) -> np.ndarray:
+        """ For each node, the index (not id!) of its parent. Roots have
+        parent index -1.
+        """
+
+        if self._parent_index is None:
+            self._parent_index = self.index_of(self.parent_ids)
+        return self._parent_index
+
+    @property
+    def child_offsets(self) -> np.ndarray:
+        """ The children of node i are child_indices[offsets[i]: offsets[i+1]]
+        """
+
+        if self._child_offsets is None:
+            self._build_child_index()
+        return self._child_offsets
+
+    @property
+    def child_indices(self) -> np.ndarray:
+        """ Concatenated child indices of each node. Within a node, children
+        are listed in storage order. See child_offsets.
+        """
+
+        if self._child_indices is None:
+            self._build_child_index()
+        return self._child_indices
+
+    @property
+    def num_children(self) -> np.ndarray:
+        """ The number of children of each node
+        """
+
+        return np.diff(self.child_offsets)
+
+    @property
+    def topology(self) -> "TopologyIndex":
+        """ Precomputed answers to common topological queries (roots, leaves,
+        branch points, nodes by type). See TopologyIndex.
+        """
+
+        if self._topology is None:
+            self._topology = TopologyIndex(self)
+        return self._topology
+
+    def reset_index(self):
+        """ Discard the parent, child and topology indices. Must be called
+        after ids, parent_ids or types are modified in place.
+        """
+
+        self._id_lookup = None
+        self._parent_index = None
+        self._child_offsets = None
+        self._child_indices = None
+        self._topology = None
+        self._views = {}
+        self._spatial_indices = {}
+        self._node_orders = {}
+        self._subtrees = None
+        self._ancestry = None
+        self._content_hash = None
+
+    def content_hash(self) -> str:
+        """ A digest of the ids, parents, types, positions and radii of these
+        nodes. Equal for reconstructions with the same nodes, regardless of
+        their storage order. Computed once and cached until the columns are
+        modified through writable or set_column (or reset_index is called).
+
+        Returns
+        -------
+        A hexadecimal string.
+
+        """
+
+        if self._content_hash is None:
+            self._content_hash = self._compute_content_hash()
+        return self._content_hash
+
+    def _compute_content_hash(self) -> str:
+        """ Hash the node-wise columns in id order, as little-endian arrays.
+        Parents which are not present are hashed as -1.
+        """
+
+        lookup = self._get_id_lookup()
+        if isinstance(lookup, int):
+            order = slice(None)
+        elif isinstance(lookup, dict):
+            order = np.array(
+                [lookup[nid] for nid in sorted(lookup, key=repr)],
+                dtype=INDEX_DTYPE
+            )
+        else:
+            order = lookup[0]
+
+        parent_index = self.parent_index
+        parent_ids = np.where(
+            parent_index == NO_INDEX, -1, self.ids[parent_index]) \
+            if self.ids.dtype.kind in "iu" \
+            else np.array([
+                -1 if parent == NO_INDEX else self.ids[parent]
+                for parent in parent_index.tolist()
+            ], dtype=object)
+
+        digest = hashlib.blake2b(digest_size=CONTENT_HASH_SIZE)
+        digest.update(f"v{CONTENT_HASH_VERSION}:{len(self)}".encode())
+        for column, dtype in (
+            (self.ids, "<i8"),
+            (parent_ids, "<i8"),
+            (self.types, "<i4"),
+            (self.xyz, "<f8"),
+            (self.radius, "<f8"),
+        ):
+            column = column[order]
+            if column.dtype.kind == "O":
+                digest.update(repr(column.tolist()).encode())
+            else:
+                digest.update(np.ascontiguousarray(column, dtype=dtype).data)
+        return digest.hexdigest()
+
+    def spatial_index(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> "SpatialIndex":
+        """ A KD-tree (see SpatialIndex) over the positions of nodes of these
+        types (or of all nodes, if node_types is not provided). Built on first
+        access and cached until reset_index is called or xyz is modified
+        through writable or set_column.
+        """
+
+        key = tuple(sorted(node_types)) if node_types else None
+        if key not in self._spatial_indices:
+            indices = None if key is None else self.topology.indices_of_types(
+                key)
+            self._spatial_indices[key] = SpatialIndex(self.xyz, indices)
+        return self._spatial_indices[key]
+
+    def view(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> "ArraysView":
+        """ The subgraph of nodes of these types (see ArraysView). Views are
+        cached until reset_index is called.
+        """
+
+        key = tuple(node_types) if node_types else None
+        if key not in self._views:
+            self._views[key] = ArraysView(self, key)
+        return self._views[key]
+
+    @property
+    def subtrees(self) -> "SubtreeIndex":
+        """ Preorder positions and subtree sizes of these nodes, for
+        reductions over subtrees (see SubtreeIndex). Built on first access
+        and cached until reset_index is called.
+        """
+
+        if self._subtrees is None:
+            self._subtrees = SubtreeIndex(self)
+        return self._subtrees
+
+    @property
+    def ancestry(self) -> "AncestryIndex":
+        """ Depths, distances from the root and lowest common ancestors of
+        these nodes (see AncestryIndex). Built on first access and cached
+        until reset_index is called or xyz is modified through writable or
+        set_column.
+        """
+
+        if self._ancestry is None:
+            self._ancestry = AncestryIndex(self)
+        return self._ancestry
+
+    def node_orders(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> "NodeOrders":
+        """ Branch, centrifugal and Strahler orders, subtree sizes and subtree
+        path lengths of every node (see node_orders), considering only nodes
+        of these types (see view). Cached until reset_index is called or
+        xyz is modified through writable or set_column.
+        """
+
+        key = tuple(node_types) if node_types else None
+        if key not in self._node_orders:
+            self._node_orders[key] = node_orders(
+                self if key is None else self.view(key))
+        return self._node_orders[key]
+
+    def children_of_index(self, index: int) -> np.ndarray:
+        """ The indices of the children of the node at this index
+        """
+
+        offsets = self.child_offsets
+        return self.child_indices[offsets[index]: offsets[index + 1]]
+
+    def index_of(self, ids: Any) -> np.ndarray:
+        """ Find the storage index of each of the argued ids.
+
+        Parameters
+        ----------
+        ids : array-like of node ids
+
+        Returns
+        -------
+        An integer array of the same shape as ids. Ids which are not present
+            in this morphology are assigned the index -1.
+
+        """
+
+        ids = np.asarray(ids)
+        lookup = self._get_id_lookup()
+
+        if isinstance(lookup, dict):
+            return np.array(
+                [lookup.get(nid, NO_INDEX) for nid in ids.ravel().tolist()],
+                dtype=INDEX_DTYPE
+            ).reshape(ids.shape)
+
+        if ids.dtype.kind not in "iu":
+            ids = ids.astype(ID_DTYPE)
+
+        if isinstance(lookup, int):
+            index = ids - lookup
+            found = (index >= 0) & (index < len(self.ids))
+        else:
+            sorter, sorted_ids = lookup
+            position = np.searchsorted(sorted_ids, ids)
+            position[position >= len(sorted_ids)] = 0
+            found = sorted_ids[position] == ids if len(sorted_ids) else \
+                np.zeros(ids.shape, dtype=bool)
+            index = sorter[position] if len(sorter) else position
+
+        return np.where(found, index, NO_INDEX).astype(INDEX_DTYPE)
+
+    def index_of_id(self, node_id: Any) -> int:
+        """ Find the storage index of a single node id. Raises a KeyError if
+        the id is not present.
+        """
+
+        lookup = self._get_id_lookup()
+        if isinstance(lookup, dict):
+            return lookup[node_id]
+
+        try:
+            if isinstance(lookup, int):
+                index = node_id - lookup
+                if index >= 0 and index < len(self.ids) and index % 1 == 0:
+                    return int(index)
+            else:
+                sorter, sorted_ids = lookup
+                position = int(np.searchsorted(sorted_ids, node_id))
+                if position < len(sorted_ids) \
+                        and sorted_ids[position] == node_id:
+                    return int(sorter[position])
+        except TypeError:
+            pass
+
+        raise KeyError(node_id)
+
+    @property
+    def nbytes(self) -> int:
+        """ The number of bytes occupied by this object's arrays
+        """
+
+        arrays = [
+            self.ids, self.parent_ids, self.types, self.xyz, self.radius,
+            self._parent_index, self._child_offsets, self._child_indices
+        ]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def clone(self) -> "MorphologyArrays":
+        """ Make a copy-on-write copy of these arrays. The copy shares its
+        columns, id lookup, parent and child indices and topology with this
+        object. A column is copied only when it is first modified through
+        writable (or replaced through set_column) on either object.
+
+        Notes
+        -----
+        Writing directly to a column (e.g. arrays.xyz[0] = ...) of either
+        object after cloning will affect both.
+
+        """
+
+        clone = self.__class__(
+            ids=self.ids,
+            parent_ids=self.parent_ids,
+            types=self.types,
+            xyz=self.xyz,
+            radius=self.radius
+        )
+        clone._id_lookup = self._id_lookup
+        clone._parent_index = self._parent_index
+        clone._child_offsets = self._child_offsets
+        clone._child_indices = self._child_indices
+        clone._topology = self._topology
+        clone._content_hash = self._content_hash
+
+        self._shared_columns = set(COLUMNS)
+        clone._shared_columns = set(COLUMNS)
+        return clone
+
+    def writable(self, name: str) -> np.ndarray:
+        """ Get a column (one of COLUMNS) which may be modified in place,
+        copying it first if its data is shared with a clone.
+
+        Notes
+        -----
+        Call reset_index after modifying ids, parent_ids or types.
+
+        """
+
+        if name in self._shared_columns:
+            setattr(self, name, getattr(self, name).copy())
+            self._shared_columns.discard(name)
+        if name == "xyz":
+            self._spatial_indices = {}
+            self._node_orders = {}
+            self._ancestry = None
+        self._content_hash = None
+        return getattr(self, name)
+
+    def set_column(self, name: str, values: Any):
+        """ Replace a column (one of COLUMNS) with new values. Indices are
+        discarded if the replaced column affects topology.
+        """
+
+        current = getattr(self, name)
+        values = np.asarray(values, dtype=current.dtype).reshape(current.shape)
+        setattr(self, name, values)
+        self._shared_columns.discard(name)
+        if name == "xyz":
+            self._spatial_indices = {}
+            self._node_orders = {}
+            self._ancestry = None
+        self._content_hash = None
+
+        if name in _INDEXED_COLUMNS:
+            self.reset_index()
+
+    def in_preorder(
+        self,
+        renumber: bool = False,
+        start_id: int = 1
+    ) -> "MorphologyArrays":
+        """ Copy these arrays, storing nodes in the order of a depth-first
+        (preorder) traversal of each tree in turn. Each node's subtree then
+        occupies the contiguous range of storage indices beginning with that
+        node (see SubtreeIndex), and traversals read the columns
+        sequentially.
+
+        Parameters
+        ----------
+        renumber : if True, give nodes contiguous ids, in preorder. Otherwise
+            ids are kept
+        start_id : the id of the first node, if renumbering
+
+        Returns
+        -------
+        A new MorphologyArrays
+
+        """
+
+        subtrees = self.subtrees
+        order = subtrees.order
+        if len(order) != len(self):
+            raise ValueError("cannot reorder a reconstruction containing cycles")
+
+        if renumber:
+            parent_index = self.parent_index[order]
+            has_parent = parent_index != NO_INDEX
+            ids = np.arange(start_id, start_id + len(order))
+            parent_ids = np.where(
+                has_parent,
+                subtrees.position[np.where(has_parent, parent_index, 0)]
+                    + start_id,
+                -1
+            )
+        else:
+            ids = self.ids[order]
+            parent_ids = self.parent_ids[order]
+
+        return self.__class__(
+            ids=ids,
+            parent_ids=parent_ids,
+            types=self.types[order],
+            xyz=self.xyz[order],
+            radius=self.radius[order]
+        )
+
+    def copy(self) -> "MorphologyArrays":
+        """ Make an independent copy of these arrays
+        """
+
+        return self.__class__(
+            ids=self.ids.copy(),
+            parent_ids=self.parent_ids.copy(),
+            types=self.types.copy(),
+            xyz=self.xyz.copy(),
+            radius=self.radius.copy()
+        )
+
+    def _get_id_lookup(self):
+        """ Set up (if needed) and return a structure for mapping ids to
+        indices. This is either an integer offset (when ids are contiguous and
+        ascending), a sorter / sorted ids pair, or (for non-integer ids) a dict.
+        """
+
+        if self._id_lookup is not None:
+            return self._id_lookup
+
+        ids = self.ids
+        if ids.dtype.kind not in "iu":
+            lookup: Any = {nid: ii for ii, nid in enumerate(ids.tolist())}
+            if len(lookup) != len(ids):
+                raise ValueError("node ids must be unique")
+
+        elif len(ids) > 0 and np.array_equal(
+            ids, np.arange(ids[0], ids[0] + len(ids), dtype=ids.dtype)
+        ):
+            lookup = int(ids[0])
+
+        else:
+            sorter = np.argsort(ids, kind="stable").astype(INDEX_DTYPE)
+            sorted_ids = ids[sorter]
+            if len(sorted_ids) > 1 and np.any(sorted_ids[1:] == sorted_ids[:-1]):
+                raise ValueError("node ids must be unique")
+            lookup = (sorter, sorted_ids)
+
+        self._id_lookup = lookup
+        return lookup
+
+    def _build_child_index(self):
+        """ Construct the CSR child index from the parent index.
+        """
+
+        self._child_offsets, self._child_indices = _child_index(
+            self.parent_index, len(self))
+
+
+class ArraysView:
+
+    def __init__(
+        self,
+        arrays: MorphologyArrays,
+        node_types: Optional[Sequence[int]] = None
+    ):
+        """ The nodes of a reconstruction which are of certain types, along
+        with their own parent and child indices and topology. Node-wise
+        columns are not copied: like arrays, a view is indexed by storage
+        index, and its columns are those of arrays.
+
+        Parameters
+        ----------
+        arrays : the reconstruction to view. Obtain views through
+            MorphologyArrays.view, so that they are discarded along with
+            arrays' other indices.
+        node_types : include only nodes of these types. If not provided, all
+            nodes are included.
+
+        """
+
+        self.base = arrays
+        self.node_types = tuple(node_types) if node_types else None
+
+        if self.node_types is None:
+            self.mask: np.ndarray = np.ones(len(arrays), dtype=bool)
+        else:
+            self.mask = np.isin(arrays.types, self.node_types)
+        self.indices: np.ndarray = np.flatnonzero(
+            self.mask).astype(INDEX_DTYPE)
+
+        # a node's parent is only in the view if both are of these types
+        base_parent_index = arrays.parent_index
+        view_parent_index = np.where(
+            self.mask, base_parent_index, NO_INDEX).astype(INDEX_DTYPE)
+        has_parent = view_parent_index != NO_INDEX
+        outside = np.flatnonzero(has_parent)
+        outside = outside[~self.mask[view_parent_index[outside]]]
+
+        # every node (including those outside of the view) lists its
+        # children in the view, so that traversals may start anywhere
+        self.child_offsets, self.child_indices = _child_index(
+            view_parent_index, len(arrays))
+
+        view_parent_index[outside] = NO_INDEX
+        self.parent_index: np.ndarray = view_parent_index
+
+        self._topology: Optional["TopologyIndex"] = None
+        self._subtrees: Optional["SubtreeIndex"] = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.base.ids
+
+    @property
+    def parent_ids(self) -> np.ndarray:
+        return self.base.parent_ids
+
+    @property
+    def types(self) -> np.ndarray:
+        return self.base.types
+
+    @property
+    def xyz(self) -> np.ndarray:
+        return self.base.xyz
+
+    @property
+    def radius(self) -> np.ndarray:
+        return self.base.radius
+
+    @property
+    def num_children(self) -> np.ndarray:
+        """ The number of children in this view of each node
+        """
+
+        return np.diff(self.child_offsets)
+
+    @property
+    def topology(self) -> "TopologyIndex":
+        """ Roots, leaves, branch points and traversal orders of this view.
+        Roots are nodes in the view whose parent is not.
+        """
+
+        if self._topology is None:
+            self._topology = TopologyIndex(self, mask=self.mask)
+        return self._topology
+
+    @property
+    def subtrees(self) -> "SubtreeIndex":
+        """ Preorder positions and subtree sizes within this view. See
+        SubtreeIndex.
+        """
+
+        if self._subtrees is None:
+            self._subtrees = SubtreeIndex(self)
+        return self._subtrees
+
+    def children_of_index(self, index: int) -> np.ndarray:
+        """ The indices of the children in this view of the node at this index
+        """
+
+        offsets = self.child_offsets
+        return self.child_indices[offsets[index]: offsets[index + 1]]
+
+    def index_of_id(self, node_id: Any) -> int:
+        """ Find the storage index of a single node id. Raises a KeyError if
+        the id is not present in this view.
+        """
+
+        index = self.base.index_of_id(node_id)
+        if not self.mask[index]:
+            raise KeyError(node_id)
+        return index
+
+
+class TopologyIndex:
+
+    def __init__(
+        self,
+        arrays: Any,
+        mask: Optional[np.ndarray] = None
+    ):
+        """ Child counts, leaf / branch / root masks and per-type node indices
+        of a reconstruction, computed once so that repeated topological
+        queries need not rescan every node. All lists of indices are in
+        storage order.
+
+        Parameters
+        ----------
+        arrays : the reconstruction (a MorphologyArrays or ArraysView) to
+            index. Discard this index (see MorphologyArrays.reset_index) if
+            its topology or types change.
+        mask : if provided, only nodes for which this boolean array is True
+            are roots or are listed by type
+
+        """
+
+        # hold the columns themselves, rather than arrays, so that this index
+        # remains valid for clones after arrays' columns are replaced
+        self._types = arrays.types
+        self._child_offsets = arrays.child_offsets
+        self._child_indices = arrays.child_indices
+        self._typed_children: Dict[Tuple[int, ...], Tuple[Any, ...]] = {}
+        self._child_lists: Dict[
+            Tuple[int, ...], Tuple[List[int], List[int]]] = {}
+        self._traversal_orders: Dict[Tuple[Any, ...], np.ndarray] = {}
+
+        self.num_children: np.ndarray = arrays.num_children
+        self.is_root: np.ndarray = arrays.parent_index == NO_INDEX
+        self.is_leaf: np.ndarray = self.num_children == 0
+        self.is_branch: np.ndarray = self.num_children > 1
+        non_soma = arrays.types != SOMA
+        if mask is not None:
+            self.is_root &= mask
+            non_soma &= mask
+        self.root_indices: np.ndarray = np.flatnonzero(self.is_root)
+        self.non_soma_indices: np.ndarray = np.flatnonzero(non_soma)
+
+        if mask is None:
+            order = np.argsort(arrays.types, kind="stable")
+        else:
+            members = np.flatnonzero(mask)
+            order = members[np.argsort(arrays.types[members], kind="stable")]
+        unique_types, starts = np.unique(
+            arrays.types[order], return_index=True)
+        self.indices_by_type: Dict[int, np.ndarray] = {
+            node_type: indices
+            for node_type, indices in zip(
+                unique_types.tolist(), np.split(order, starts[1:]))
+        }
+
+    @property
+    def num_roots(self) -> int:
+        return len(self.root_indices)
+
+    def has_type(self, node_type: int) -> bool:
+        return node_type in self.indices_by_type
+
+    def indices_of_types(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ The indices of nodes of these types. Nodes are grouped by type, in
+        the order in which node_types is given. If node_types is not
+        provided, all non-soma nodes are returned.
+        """
+
+        if not node_types:
+            return self.non_soma_indices
+        return np.concatenate([
+            self.indices_by_type.get(
+                node_type, np.array([], dtype=INDEX_DTYPE))
+            for node_type in node_types
+        ]).astype(INDEX_DTYPE, copy=False)
+
+    def leaf_indices(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ The indices of childless nodes of these types (or non-soma nodes,
+        if node_types is not provided)
+        """
+
+        candidates = self.indices_of_types(node_types)
+        return candidates[self.is_leaf[candidates]]
+
+    def branching_indices(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ The indices of nodes of these types (or non-soma nodes, if
+        node_types is not provided) which have more than one child
+        """
+
+        candidates = self.indices_of_types(node_types)
+        return candidates[self.is_branch[candidates]]
+
+    def num_children_of_types(
+        self,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ For each node, the number of its children which are of these
+        types (or of any type, if node_types is not provided)
+        """
+
+        return self._get_children_of_types(node_types)[2]
+
+    def traversal_order(
+        self,
+        start_index: int,
+        order: str = PREORDER,
+        node_types: Optional[Sequence[int]] = None
+    ) -> np.ndarray:
+        """ The indices of the nodes reachable from a start node, in the
+        order they would be visited by a traversal. Results are cached per
+        (start_index, order, node_types).
+
+        Parameters
+        ----------
+        start_index : begin the traversal from the node at this index. It is
+            always visited, regardless of its type
+        order : one of "preorder" (depth first, parents before children),
+            "postorder" (depth first, children before parents) or
+            "breadth_first"
+        node_types : if provided, only descend into children of these types
+
+        Returns
+        -------
+        A read-only array of node indices. The children of each node are
+            visited in storage order.
+
+        """
+
+        if order not in TRAVERSAL_ORDERS:
+            raise ValueError(
+                f"unrecognized traversal order {order}. Expected one of "
+                f"{TRAVERSAL_ORDERS}"
+            )
+
+        key = (
+            int(start_index),
+            order,
+            tuple(node_types) if node_types else None
+        )
+        if key not in self._traversal_orders:
+            if order == BREADTH_FIRST:
+                offsets, children, _ = self._get_children_of_types(node_types)
+                result = _breadth_first_order(
+                    key[0], offsets, children, len(self.num_children))
+            else:
+                offsets, children = self._get_child_lists(node_types)
+                result = _depth_first_order(
+                    [key[0]], offsets, children, order,
+                    len(self.num_children)
+                )
+            result.flags.writeable = False
+            self._traversal_orders[key] = result
+
+        return self._traversal_orders[key]
+
+    def forest_order(self, order: str = PREORDER) -> np.ndarray:
+        """ The order in which traversals from each root in turn would visit
+        the nodes. Like traversal_order, results are cached.
+
+        Parameters
+        ----------
+        order : one of "preorder", "postorder" or "breadth_first". Each
+            tree is traversed completely before the next.
+
+        Returns
+        -------
+        A read-only array of node indices.
+
+        """
+
+        if order not in TRAVERSAL_ORDERS:
+            raise ValueError(
+                f"unrecognized traversal order {order}. Expected one of "
+                f"{TRAVERSAL_ORDERS}"
+            )
+
+        key = (None, order, None)
+        if key not in self._traversal_orders:
+            if order == BREADTH_FIRST or len(self.root_indices) <= 1:
+                result = np.concatenate(
+                    [self.traversal_order(root, order)
+                        for root in self.root_indices]
+                    or [np.array([], dtype=INDEX_DTYPE)]
+                ).astype(INDEX_DTYPE, copy=False)
+            else:
+                offsets, children = self._get_child_lists(None)
+                result = _depth_first_order(
+                    self.root_indices.tolist(), offsets, children, order,
+                    len(self.num_children)
+                )
+            result.flags.writeable = False
+            self._traversal_orders[key] = result
+
+        return self._traversal_orders[key]
+
+    def _get_children_of_types(self, node_types):
+        """ Build (or retrieve) a CSR child index restricted to children of
+        the argued types.
+        """
+
+        key = tuple(node_types) if node_types else ()
+        if key not in self._typed_children:
+            offsets = self._child_offsets
+            children = self._child_indices
+            counts = self.num_children
+            num_nodes = len(counts)
+
+            if key:
+                parents = np.repeat(
+                    np.arange(num_nodes, dtype=INDEX_DTYPE), counts)
+                keep = np.isin(self._types[children], key)
+                children = children[keep]
+                counts = np.bincount(parents[keep], minlength=num_nodes)
+                offsets = np.zeros(num_nodes + 1, dtype=INDEX_DTYPE)
+                np.cumsum(counts, out=offsets[1:])
+
+            self._typed_children[key] = (offsets, children, counts)
+        return self._typed_children[key]
+
+    def _get_child_lists(self, node_types):
+        """ The child index of _get_children_of_types, as lists (which
+        depth-first traversals read most quickly). Converted once, so that
+        traversals of small subtrees take time proportional to their size.
+        """
+
+        key = tuple(node_types) if node_types else ()
+        if key not in self._child_lists:
+            offsets, children, _ = self._get_children_of_types(node_types)
+            self._child_lists[key] = (offsets.tolist(), children.tolist())
+        return self._child_lists[key]
+
+
+class NearestNodes(NamedTuple):
+    """ The result of a nearest-node query. See SpatialIndex.nearest
+    """
+
+    # the distance from each query point to each of its nearest nodes. inf
+    # where fewer than k nodes were found
+    distance: np.ndarray
+
+    # the storage index of each of those nodes. -1 where fewer than k nodes
+    # were found
+    index: np.ndarray
+
+
+class SpatialIndex:
+
+    def __init__(
+        self,
+        xyz: np.ndarray,
+        indices: Optional[np.ndarray] = None
+    ):
+        """ A KD-tree over the positions of some or all of a reconstruction's
+        nodes, supporting nearest-node and radius queries in logarithmic
+        (rather than linear) time per query point.
+
+        Parameters
+        ----------
+        xyz : (N, 3) positions of all nodes in the reconstruction
+        indices : if provided, only index the nodes at these storage indices
+
+        """
+
+        if indices is None:
+            indices = np.arange(len(xyz), dtype=INDEX_DTYPE)
+        self.indices: np.ndarray = np.asarray(indices, dtype=INDEX_DTYPE)
+        self.tree = cKDTree(np.asarray(xyz)[self.indices].reshape((-1, 3)))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def nearest(
+        self,
+        points: Any,
+        k: int = 1,
+        tolerance: Optional[float] = None
+    ) -> NearestNodes:
+        """ Find the k nearest nodes to each of some points
+
+        Parameters
+        ----------
+        points : a single (3,) point or an (M, 3) array of points
+        k : how many nodes to find per point
+        tolerance : if provided, only find nodes at most this far from each
+            point
+
+        Returns
+        -------
+        Distances and storage indices of the nodes found, sorted by distance.
+            These have shape (M, k), or (M,) if k is 1 (dropping the first
+            dimension for a single point).
+
+        """
+
+        distance_upper_bound = np.inf if tolerance is None \
+            else np.nextafter(tolerance, np.inf)
+
+        if len(self.indices) == 0:
+            shape = np.shape(points)[:-1] + ((k,) if k > 1 else ())
+            return NearestNodes(
+                distance=np.full(shape, np.inf),
+                index=np.full(shape, NO_INDEX, dtype=INDEX_DTYPE)
+            )
+
+        distance, position = self.tree.query(
+            points, k=k, distance_upper_bound=distance_upper_bound)
+        found = position < len(self.indices)
+        index = np.where(
+            found, self.indices[np.where(found, position, 0)], NO_INDEX)
+
+        return NearestNodes(
+            distance=distance,
+            index=np.asarray(index, dtype=INDEX_DTYPE)
+        )
+
+    def within(self, points: Any, radius: float) -> Any:
+        """ Find the nodes at most radius away from some points
+
+        Parameters
+        ----------
+        points : a single (3,) point or an (M, 3) array of points
+        radius : the maximum distance. May be 0, for exact matches
+
+        Returns
+        -------
+        For a single point, a sorted array of the storage indices of the
+            nodes found. For many points, a list of such arrays.
+
+        """
+
+        points = np.asarray(points, dtype=FLOAT_DTYPE)
+        found = self.tree.query_ball_point(points, radius)
+        if points.ndim == 1:
+            return np.sort(self.indices[np.asarray(found, dtype=np.intp)])
+        return [
+            np.sort(self.indices[np.asarray(each, dtype=np.intp)])
+            for each in found
+        ]
+
+
+class SubtreeIndex:
+
+    def __init__(self, arrays: Any):
+        """ The position of each node in a preorder traversal of a
+        reconstruction, and the size of its subtree. In preorder, each node's
+        descendants immediately follow it, so that its subtree occupies a
+        contiguous range of positions. Reductions over subtrees (or over
+        ancestors) then need no recursion: sums are differences of cumulative
+        sums, and maxima and minima are found in a single pass over the
+        traversal.
+
+        Parameters
+        ----------
+        arrays : the reconstruction (a MorphologyArrays or ArraysView) to
+            index. Discard this index (see MorphologyArrays.reset_index) if
+            its topology changes.
+
+        """
+
+        parent_index = arrays.parent_index
+        num_nodes = len(parent_index)
+
+        # the storage index of the node at each position. Nodes which are not
+        # reached from a root (e.g. those in cycles, or outside of a view)
+        # have no position, and an empty subtree
+        self.order: np.ndarray = arrays.topology.forest_order(PREORDER)
+        self.position: np.ndarray = np.full(
+            num_nodes, NO_INDEX, dtype=INDEX_DTYPE)
+        self.position[self.order] = np.arange(
+            len(self.order), dtype=INDEX_DTYPE)
+
+        # children follow their parents, so visit positions in reverse
+        parents = parent_index.tolist()
+        sizes = [1] * num_nodes
+        for index in reversed(self.order.tolist()):
+            parent = parents[index]
+            if parent != NO_INDEX:
+                sizes[parent] += sizes[index]
+
+        self.size: np.ndarray = np.zeros(num_nodes, dtype=INDEX_DTYPE)
+        self.size[self.order] = np.array(sizes, dtype=INDEX_DTYPE)[self.order]
+
+        # the storage index of each node's parent
+        self.parent_index: np.ndarray = parent_index
+
+    def __len__(self):
+        return len(self.order)
+
+    def ranges(
+        self,
+        include_self: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """ The first position, and one past the last position, of each
+        node's subtree, by storage index. Empty for nodes which are not
+        reached.
+        """
+
+        start = np.where(
+            self.position == NO_INDEX, 0, self.position + (not include_self))
+        stop = np.maximum(
+            np.where(self.position == NO_INDEX, 0, self.position + self.size),
+            start
+        )
+        return start, stop
+
+    def sum(self, values: Any, include_self: bool = True) -> np.ndarray:
+        """ Sum values (one per node, by storage index) over each node's
+        subtree.
+
+        Parameters
+        ----------
+        values : the value of each node
+        include_self : if False, sum only over each node's descendants
+
+        Returns
+        -------
+        The sum for each node, by storage index. 0 for nodes which are not
+            reached from a root.
+
+        """
+
+        values = np.asarray(values)
+        ordered = values[self.order]
+        cumulative = np.zeros(len(ordered) + 1, dtype=ordered.dtype
+            if ordered.dtype.kind in "fc" else np.int64)
+        np.cumsum(ordered, out=cumulative[1:])
+
+        start, stop = self.ranges(include_self)
+        return cumulative[stop] - cumulative[start]
+
+    def count(self, mask: Any, include_self: bool = True) -> np.ndarray:
+        """ Count the nodes (e.g. tips) for which mask is True in each node's
+        subtree. See sum.
+        """
+
+        return self.sum(
+            np.asarray(mask, dtype=bool), include_self).astype(INDEX_DTYPE)
+
+    def max(
+        self,
+        values: Any,
+        include_self: bool = True,
+        initial: Any = -np.inf
+    ) -> np.ndarray:
+        """ Find the greatest of values (one per node, by storage index) in
+        each node's subtree. initial is reported for empty subtrees. See
+        sum.
+        """
+
+        return self._reduce(np.maximum, values, include_self, initial)
+
+    def min(
+        self,
+        values: Any,
+        include_self: bool = True,
+        initial: Any = np.inf
+    ) -> np.ndarray:
+        """ Find the least of values (one per node, by storage index) in each
+        node's subtree. initial is reported for empty subtrees. See sum.
+        """
+
+        return self._reduce(np.minimum, values, include_self, initial)
+
+    def ancestor_sum(
+        self,
+        values: Any,
+        include_self: bool = True
+    ) -> np.ndarray:
+        """ Sum values (one per node, by storage index) over each node's
+        ancestors. Each node's value is added to every node in its subtree.
+
+        Parameters
+        ----------
+        values : the value of each node
+        include_self : if False, sum only over each node's strict ancestors
+
+        Returns
+        -------
+        The sum for each node, by storage index. 0 for nodes which are not
+            reached from a root.
+
+        """
+
+        values = np.asarray(values)
+        ordered = values[self.order]
+        num_ordered = len(ordered)
+        position = np.arange(num_ordered)
+        stop = position + self.size[self.order]
+        weights = ordered.astype(FLOAT_DTYPE)
+
+        change = np.bincount(
+            position + (not include_self), weights=weights,
+            minlength=num_ordered + 2
+        ) - np.bincount(stop, weights=weights, minlength=num_ordered + 2)
+
+        dtype = values.dtype if values.dtype.kind in "fc" else np.int64
+        result = np.zeros(len(self.position), dtype=dtype)
+        result[self.order] = np.cumsum(change[:num_ordered])
+        return result
+
+    def _reduce(self, ufunc, values, include_self, initial):
+        values = np.asarray(values)
+        reached = self.position != NO_INDEX
+        reduced = np.full(
+            len(self.position), initial,
+            dtype=np.result_type(values, np.asarray(initial))
+        )
+        reduced[reached] = values[reached]
+
+        # NaNs are propagated to every ancestor, as ufunc would. Other values
+        # are compared directly below
+        missing = None
+        if reduced.dtype.kind == "f":
+            missing = np.isnan(reduced)
+            reduced[missing] = initial
+
+        # children follow their parents, so that visiting positions in
+        # reverse completes each subtree before it is reduced into its
+        # parent. This is linear in the number of nodes, however deep the
+        # tree
+        parents = self.parent_index.tolist()
+        subtree = reduced.tolist()
+        greatest = ufunc is np.maximum
+        for index in reversed(self.order.tolist()):
+            parent = parents[index]
+            if parent == NO_INDEX:
+                continue
+            value = subtree[index]
+            if value > subtree[parent] if greatest \
+                    else value < subtree[parent]:
+                subtree[parent] = value
+
+        reduced = np.array(subtree, dtype=reduced.dtype)
+        if missing is not None and np.any(missing):
+            reduced[self.count(missing) > 0] = np.nan
+
+        if not include_self:
+            # reduce each node's children's (inclusive) subtrees instead
+            # (seeded from any one child, since initial need not be
+            # ufunc's identity)
+            children = self.order[self.parent_index[self.order] != NO_INDEX]
+            of_children = self.parent_index[children]
+            excluded = np.full_like(reduced, initial)
+            excluded[of_children] = reduced[children]
+            ufunc.at(excluded, of_children, reduced[children])
+            reduced = excluded
+
+        reduced[~reached] = initial
+        return reduced
+
+
+class AncestryIndex:
+
+    # the greatest number of node pairs compared at once by pairwise
+    # queries, bounding the size of their intermediate arrays
+    PAIRWISE_CHUNK_SIZE = 2 ** 20
+
+    def __init__(self, arrays: MorphologyArrays):
+        """ Depths, path distances from the root and a lowest common ancestor
+        index of a reconstruction. Built once in O(N log N) time; afterwards
+        the lowest common ancestor of (and so the path distance between) any
+        two nodes is found in constant time, and many pairs can be queried at
+        once.
+
+        The lowest common ancestor of two nodes u and v, with u preceding v
+        in a preorder traversal, is the parent of the shallowest node
+        following u, up to and including v, in that traversal (or u itself,
+        if v descends from it). The shallowest node in any range of the
+        traversal is found from a sparse table of the shallowest nodes in
+        ranges of each power-of-two length.
+
+        Parameters
+        ----------
+        arrays : the reconstruction to index. Discard this index (see
+            MorphologyArrays.reset_index) if its topology or positions change.
+
+        """
+
+        parent_index = arrays.parent_index
+        subtrees = arrays.subtrees
+        order = subtrees.order
+        num_ordered = len(order)
+        reached = subtrees.position != NO_INDEX
+
+        self._order: np.ndarray = order
+        self._parent_index: np.ndarray = parent_index
+        self._tree: np.ndarray = np.cumsum(parent_index[order] == NO_INDEX) - 1
+
+        # nodes not reached from a root (e.g. those in cycles) have position
+        # -1, depth -1 and distance nan
+        self.position: np.ndarray = subtrees.position
+        self.depth: np.ndarray = np.where(
+            reached,
+            subtrees.ancestor_sum(
+                np.ones(len(parent_index), dtype=INDEX_DTYPE),
+                include_self=False
+            ),
+            NO_INDEX
+        ).astype(INDEX_DTYPE)
+        self.distance_from_root: np.ndarray = np.where(
+            reached, subtrees.ancestor_sum(compartment_lengths(arrays)), np.nan)
+
+        ordered_depth = self.depth[order]
+        self._ordered_depth: np.ndarray = ordered_depth
+        position = np.arange(num_ordered)
+
+        # _table[k, i] is the preorder position of the shallowest node among
+        # positions i to i + 2 ** k - 1
+        levels = [position.astype(INDEX_DTYPE)]
+        span = 1
+        while 2 * span <= num_ordered:
+            previous = levels[-1]
+            left = previous[:len(previous) - span]
+            right = previous[span:]
+            levels.append(np.where(
+                ordered_depth[left] <= ordered_depth[right], left, right))
+            span *= 2
+
+        self._table: np.ndarray = np.zeros(
+            (len(levels), max(num_ordered, 1)), dtype=INDEX_DTYPE)
+        for level, values in enumerate(levels):
+            self._table[level, :len(values)] = values
+
+    def lowest_common_ancestor(self, a: Any, b: Any) -> np.ndarray:
+        """ Find the deepest node from which both of two nodes descend (a node
+        is considered to descend from itself).
+
+        Parameters
+        ----------
+        a, b : storage indices of nodes. May be arrays of matching (or
+            broadcastable) shapes, for querying many pairs at once.
+
+        Returns
+        -------
+        The storage index of each pair's lowest common ancestor, or -1 for
+            pairs which are in different trees.
+
+        """
+
+        a, b = np.broadcast_arrays(
+            np.asarray(a, dtype=np.intp), np.asarray(b, dtype=np.intp))
+        first = np.minimum(self.position[a], self.position[b])
+        last = np.maximum(self.position[a], self.position[b])
+
+        valid = first != NO_INDEX
+        safe_first = np.where(valid, first, 0)
+        safe_last = np.where(valid, last, 0)
+        valid &= self._tree[safe_first] == self._tree[safe_last]
+
+        # the range following the earlier node, up to and including the later
+        start = np.minimum(safe_first + 1, safe_last)
+        span = safe_last - start + 1
+        level = np.floor(np.log2(span)).astype(np.intp)
+        left = self._table[level, start]
+        right = self._table[level, safe_last - (1 << level) + 1]
+        shallowest = np.where(
+            self._ordered_depth[left] <= self._ordered_depth[right],
+            left, right
+        )
+
+        ancestor = self._parent_index[self._order[shallowest]]
+        ancestor = np.where(
+            safe_first == safe_last, self._order[safe_first], ancestor)
+        return np.where(valid, ancestor, NO_INDEX).astype(INDEX_DTYPE)
+
+    def path_distance(self, a: Any, b: Any) -> np.ndarray:
+        """ Find the length of the path through the reconstruction between
+        two nodes
+
+        Parameters
+        ----------
+        a, b : storage indices of nodes. May be arrays of matching (or
+            broadcastable) shapes, for querying many pairs at once.
+
+        Returns
+        -------
+        The sum of the lengths of the compartments between each pair of
+            nodes. inf for pairs which are in different trees.
+
+        """
+
+        ancestor = self.lowest_common_ancestor(a, b)
+        found = ancestor != NO_INDEX
+        distance = self.distance_from_root[a] + self.distance_from_root[b] \
+            - 2 * self.distance_from_root[np.where(found, ancestor, 0)]
+        return np.where(found, np.maximum(distance, 0.0), np.inf)
+
+    def pairwise_path_distance(
+        self,
+        a: Any,
+        b: Optional[Any] = None
+    ) -> np.ndarray:
+        """ Find the path distance between each of some nodes and each of
+        some others.
+
+        Parameters
+        ----------
+        a : storage indices of M nodes
+        b : storage indices of K nodes. If not provided, use a
+
+        Returns
+        -------
+        An (M, K) array of path distances (see path_distance)
+
+        """
+
+        a = np.asarray(a, dtype=np.intp).reshape(-1)
+        b = a if b is None else np.asarray(b, dtype=np.intp).reshape(-1)
+
+        result = np.empty((len(a), len(b)))
+        rows = max(self.PAIRWISE_CHUNK_SIZE // max(len(b), 1), 1)
+        for start in range(0, len(a), rows):
+            result[start: start + rows] = self.path_distance(
+                a[start: start + rows, np.newaxis], b[np.newaxis, :])
+        return result
+
+
+class CompartmentGeometry(NamedTuple):
+    """ Geometric properties of a collection of compartments (parent-child
+    pairs of nodes). Each compartment occupies the same position in every
+    array.
+    """
+
+    # the storage index of each compartment's parent (proximal) node
+    parent_index: np.ndarray
+
+    # the storage index of each compartment's child (distal) node
+    child_index: np.ndarray
+
+    # the euclidean distance between parent and child
+    length: np.ndarray
+
+    # the lateral surface area of each compartment, treated as a frustum
+    surface_area: np.ndarray
+
+    # the volume of each compartment, treated as a frustum
+    volume: np.ndarray
+
+    # (N, 3) the position halfway between parent and child
+    midpoint: np.ndarray
+
+
+def compartment_geometry(
+    arrays: MorphologyArrays,
+    node_types: Optional[Sequence[int]] = None
+) -> CompartmentGeometry:
+    """ Calculate the geometric properties of every compartment in a
+    reconstruction at once. Each compartment is treated as a circular conic
+    frustum, so that:
+        surface_area = pi * (r_1 + r_2) * sqrt( (r_2 - r_1) ** 2 + L ** 2 )
+        volume = pi * L * (r_1 ** 2 + r_1 * r_2 + r_2 ** 2) / 3
+
+    Parameters
+    ----------
+    arrays : describes the reconstruction's nodes
+    node_types : if provided, only compartments whose parent and child are
+        both of these types are included
+
+    Returns
+    -------
+    The geometry of each included compartment, ordered by the storage index
+        of the child node.
+
+    """
+
+    child_index = np.flatnonzero(arrays.parent_index != NO_INDEX)
+    parent_index = arrays.parent_index[child_index]
+
+    if node_types:
+        keep = np.isin(arrays.types[child_index], node_types) \
+            & np.isin(arrays.types[parent_index], node_types)
+        child_index = child_index[keep]
+        parent_index = parent_index[keep]
+
+    parent_xyz = arrays.xyz[parent_index]
+    child_xyz = arrays.xyz[child_index]
+    delta = child_xyz - parent_xyz
+    length = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+
+    parent_radius = arrays.radius[parent_index]
+    child_radius = arrays.radius[child_index]
+
+    surface_area = np.pi * (parent_radius + child_radius) * np.sqrt(
+        (child_radius - parent_radius) ** 2 + length ** 2)
+    volume = (np.pi * length / 3) * (
+        parent_radius ** 2 + parent_radius * child_radius + child_radius ** 2)
+
+    return CompartmentGeometry(
+        parent_index=parent_index,
+        child_index=child_index,
+        length=length,
+        surface_area=surface_area,
+        volume=volume,
+        midpoint=(parent_xyz + child_xyz) * 0.5
+    )
+
+
+class NodeOrders(NamedTuple):
+    """ Topological orders and subtree sizes of every node of a
+    reconstruction. See node_orders. Nodes which are not reached from a root
+    (e.g. those outside of a view) have orders of -1 and empty subtrees.
+    """
+
+    # the number of ancestors of each node which are roots or branch points.
+    # Roots have branch order 0 and their descendants at least 1
+    branch_order: np.ndarray
+
+    # the number of ancestors of each node which are branch points
+    centrifugal_order: np.ndarray
+
+    # the Strahler order of each node. Leaves have order 1. Other nodes take
+    # the greatest order among their children, plus one if more than one child
+    # has that order
+    strahler_order: np.ndarray
+
+    # the number of nodes in the subtree rooted at each node, including it
+    subtree_size: np.ndarray
+
+    # the summed length of the compartments in the subtree rooted at each node
+    subtree_length: np.ndarray
+
+
+def node_orders(arrays: Any) -> NodeOrders:
+    """ Calculate the branch, centrifugal and Strahler orders, subtree size
+    and subtree path length of every node of a reconstruction. Apart from
+    Strahler orders (which are found in a single traversal), these are
+    subtree and ancestor reductions (see SubtreeIndex).
+
+    Parameters
+    ----------
+    arrays : the reconstruction (a MorphologyArrays or ArraysView). Branch
+        points, leaves and roots are determined by its parent and child
+        indices, so that the orders of a view consider only nodes in that view
+
+    Returns
+    -------
+    The orders of each node, by storage index
+
+    """
+
+    parent_index = arrays.parent_index
+    num_nodes = len(parent_index)
+    num_children = arrays.num_children
+    subtrees = arrays.subtrees
+    reached = subtrees.position != NO_INDEX
+
+    # visit children before parents, finding the greatest Strahler order
+    # among each node's children (and the number of children having that
+    # order)
+    parents = parent_index.tolist()
+    strahler = [NO_INDEX] * num_nodes
+    max_child = [0] * num_nodes
+    num_max_child = [0] * num_nodes
+
+    for index in reversed(subtrees.order.tolist()):
+        current = max_child[index]
+        if current == 0:
+            current = 1
+        elif num_max_child[index] > 1:
+            current += 1
+        strahler[index] = current
+
+        parent = parents[index]
+        if parent == NO_INDEX:
+            continue
+        if current > max_child[parent]:
+            max_child[parent] = current
+            num_max_child[parent] = 1
+        elif current == max_child[parent]:
+            num_max_child[parent] += 1
+
+    is_branch = num_children > 1
+    is_root_or_branch = is_branch | (parent_index == NO_INDEX)
+
+    branch_order = np.where(
+        reached,
+        subtrees.ancestor_sum(is_root_or_branch, include_self=False),
+        NO_INDEX
+    ).astype(INDEX_DTYPE)
+    centrifugal_order = np.where(
+        reached, subtrees.ancestor_sum(is_branch, include_self=False),
+        NO_INDEX
+    ).astype(INDEX_DTYPE)
+
+    return NodeOrders(
+        branch_order=branch_order,
+        centrifugal_order=centrifugal_order,
+        strahler_order=np.array(strahler, dtype=INDEX_DTYPE),
+        subtree_size=subtrees.size,
+        subtree_length=subtrees.sum(
+            compartment_lengths(arrays), include_self=False)
+    )
+
+
+def compartment_lengths(arrays: Any) -> np.ndarray:
+    """ The length of the compartment joining each node to its parent (0 for
+    roots), by storage index
+    """
+
+    parent_index = arrays.parent_index
+    has_parent = parent_index != NO_INDEX
+    delta = arrays.xyz - arrays.xyz[
+        np.where(has_parent, parent_index, np.arange(len(parent_index)))]
+    return np.sqrt(np.einsum("ij,ij->i", delta, delta))
+
+
+def _child_index(
+    parent_index: np.ndarray,
+    num_nodes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Construct a CSR child index (offsets, children) from a parent index
+    """
+
+    non_root = np.flatnonzero(parent_index != NO_INDEX)
+    order = np.argsort(parent_index[non_root], kind="stable")
+
+    counts = np.bincount(parent_index[non_root], minlength=num_nodes)
+    offsets = np.zeros(num_nodes + 1, dtype=INDEX_DTYPE)
+    np.cumsum(counts, out=offsets[1:])
+
+    return offsets, non_root[order].astype(INDEX_DTYPE)
+
+
+def _breadth_first_order(
+    start: int,
+    offsets: np.ndarray,
+    children: np.ndarray,
+    num_nodes: int
+) -> np.ndarray:
+    """ Visit a tree level by level, expanding each level's children at once
+    """
+
+    levels = _breadth_first_levels(
+        np.array([start], dtype=INDEX_DTYPE), offsets, children, num_nodes)
+    return np.concatenate(levels).astype(INDEX_DTYPE, copy=False)
+
+
+def _breadth_first_levels(
+    starts: np.ndarray,
+    offsets: np.ndarray,
+    children: np.ndarray,
+    num_nodes: int
+) -> List[np.ndarray]:
+    """ Find the nodes at each depth below some start nodes. The children of
+    the nodes in each level make up the next level.
+    """
+
+    frontier = np.asarray(starts, dtype=INDEX_DTYPE)
+    levels = [frontier]
+    num_visited = len(frontier)
+
+    while True:
+        child_starts = offsets[frontier]
+        counts = offsets[frontier + 1] - child_starts
+        total = int(counts.sum())
+        if total == 0:
+            break
+
+        num_visited += total
+        if num_visited > num_nodes:
+            raise ValueError("cannot traverse a cyclic graph")
+
+        # the position of each new child within the concatenated child ranges
+        level_starts = np.cumsum(counts) - counts
+        within = np.arange(total) - np.repeat(level_starts, counts)
+        frontier = children[np.repeat(child_starts, counts) + within]
+        levels.append(frontier)
+
+    return levels
+
+
+def _depth_first_order(
+    starts: Sequence[int],
+    offsets: List[int],
+    children: List[int],
+    order: str,
+    num_nodes: int
+) -> np.ndarray:
+    """ Visit the trees below each of some start nodes in turn, depth-first,
+    using an explicit stack. offsets and children are a CSR child index (see
+    MorphologyArrays.child_offsets), as lists.
+    """
+
+    visited = []
+
+    # for postorder, visit each node's last child first, then reverse
+    preorder = order == PREORDER
+    stack = list(starts)
+    if preorder:
+        stack.reverse()
+
+    while stack:
+        current = stack.pop()
+        visited.append(current)
+        if len(visited) > num_nodes:
+            raise ValueError("cannot traverse a cyclic graph")
+
+        current_children = children[offsets[current]: offsets[current + 1]]
+        if preorder:
+            current_children.reverse()
+        stack.extend(current_children)
+
+    if not preorder:
+        visited.reverse()
+    return np.array(visited, dtype=INDEX_DTYPE)
+
+
+def _as_id_array(ids: Any) -> np.ndarray:
+    """ Convert ids to an integer array if possible, leaving other hashables
+    as an object array.
+    """
+
+    ids = np.asarray(ids)
+    if ids.dtype.kind in "iub" or (ids.dtype.kind == "f" and ids.size == 0):
+        return ids.astype(ID_DTYPE, copy=False)
+    if ids.dtype.kind == "f" and np.all(np.mod(ids, 1) == 0):
+        return ids.astype(ID_DTYPE)
+    return ids
+
+
+def _default_node_id(node):
+    return node["id"]
+
+
+def _default_parent_id(node):
+    return node.get("parent")
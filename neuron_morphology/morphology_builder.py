@@ -1,10 +1,55 @@
 import warnings
 import random
+from typing import NamedTuple, Dict, Optional
 
-from neuron_morphology.morphology import Morphology
+import numpy as np
+
+from neuron_morphology.morphology import Morphology, node_id, node_parent_id
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology_arrays import MorphologyArrays, NO_INDEX
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
+
+class NeuriteStatistics(NamedTuple):
+    """ Parameters of the random branching process used to generate neurites
+    of one type. See MorphologyBuilder.random_neurites
+    """
+
+    # how many neurites of this type leave the active node
+    num_stems: int = 1
+
+    # the mean length of a branch (from its start to a bifurcation or tip).
+    # Branch lengths are gamma distributed
+    mean_branch_length: float = 50.0
+
+    # the shape parameter of the branch length distribution. Larger values
+    # make branch lengths less variable
+    branch_length_shape: float = 2.0
+
+    # the (approximate) distance between successive nodes along a branch
+    node_spacing: float = 1.0
+
+    # the probability that a branch ends in a bifurcation, rather than a tip
+    bifurcation_probability: float = 0.5
+
+    # branches of this order always end in tips
+    max_branch_order: int = 10
+
+    # the angle (in radians) between each child branch and its parent
+    bifurcation_angle: float = np.pi / 6
+
+    # the standard deviation of each node's displacement from a straight
+    # branch, as a fraction of the node spacing
+    jitter: float = 0.1
+
+    # the radius of nodes on the stems
+    stem_radius: float = 1.0
+
+    # radii are multiplied by this factor at each bifurcation
+    radius_taper: float = 0.8
+
+
 class MorphologyBuilder:
     
     @property
@@ -32,6 +77,9 @@ class MorphologyBuilder:
         self._parent_queue = []
         self.nodes = []
         self.rng = random.Random()
+
+        # nodes added in bulk. See add_arrays
+        self._chunks = []
         
     def up(self, by=1):
         """ Terminate a branch. Set the active node to the previous active 
@@ -103,6 +151,86 @@ class MorphologyBuilder:
         self._parent_queue.append(node_id)
         return self
 
+    def add_arrays(self, parent_index, xyz, types, radius=1):
+        """ Add many nodes at once. The active node is unchanged.
+
+        Parameters
+        ----------
+        parent_index : for each new node, the index (among the new nodes) of
+            its parent. Nodes with negative parent index are made children of
+            the active node (or roots, if the active node is unset).
+        xyz : (N, 3) positions of the new nodes
+        types : the type of each new node, or a single type for all of them
+        radius : the radius of each new node, or a single radius for all of
+            them
+
+        """
+
+        parent_index = np.asarray(parent_index, dtype=np.int64)
+        num_nodes = len(parent_index)
+        if np.any(parent_index >= num_nodes):
+            raise ValueError(
+                f"parent indices must be less than the number of new nodes "
+                f"({num_nodes})"
+            )
+
+        ids = np.arange(self._id, self._id + num_nodes)
+        self._id += num_nodes
+
+        self._chunks.append(MorphologyArrays(
+            ids=ids,
+            parent_ids=np.where(
+                parent_index < 0, self.parent_id, parent_index + self._id - num_nodes),
+            types=np.broadcast_to(types, (num_nodes,)),
+            xyz=xyz,
+            radius=np.broadcast_to(radius, (num_nodes,))
+        ))
+        return self
+
+    def random_neurites(
+        self,
+        statistics: Dict[int, NeuriteStatistics],
+        seed: Optional[int] = None
+    ):
+        """ Grow random neurites from the active node. Each neurite is built
+        branch by branch: a branch of random length ends either in a
+        bifurcation (starting two child branches) or in a tip. The active
+        node is unchanged.
+
+        Parameters
+        ----------
+        statistics : maps node types (e.g. AXON) to parameters describing the
+            neurites of that type to grow
+        seed : for the random number generator. The same seed and statistics
+            always produce the same neurites.
+
+        """
+
+        if not self._parent_queue:
+            raise ValueError(
+                "attempted to create neurites, but the active node is unset")
+        active = next(
+            node for node in reversed(self.nodes)
+            if node["id"] == self.active_node_id
+        )
+        origin = np.array(
+            [active["x"], active["y"], active["z"]], dtype=float)
+
+        rng = np.random.default_rng(seed)
+        columns = []
+        num_nodes = 0
+        for node_type, stats in statistics.items():
+            parent_index, xyz, radius = _random_neurites(
+                stats, origin, rng, num_nodes)
+            columns.append((parent_index, xyz, np.full(len(xyz), node_type), radius))
+            num_nodes += len(xyz)
+
+        if columns:
+            parent_index, xyz, types, radius = (
+                np.concatenate(column) for column in zip(*columns))
+            self.add_arrays(parent_index, xyz.reshape((-1, 3)), types, radius)
+        return self
+
     def axon(self, x=None, y=None, z=None, radius=1):
         """ Convenvience for creating an axon node. Will not create a root.
         """
@@ -120,13 +248,153 @@ class MorphologyBuilder:
         """
         return self.child(x, y, z, BASAL_DENDRITE, radius)
         
-    def build(self):
+    def build_arrays(self):
+        """ Construct a MorphologyArrays describing all of the nodes added to
+        this builder. This is a non-destructive operation.
+        """
+
+        chunks = list(self._chunks)
+        if self.nodes:
+            chunks.append(MorphologyArrays.from_nodes(self.nodes))
+        if not chunks:
+            return MorphologyArrays([], [], [], np.zeros((0, 3)), [])
+
+        ids = np.concatenate([chunk.ids for chunk in chunks])
+        order = np.argsort(ids, kind="stable")
+        return MorphologyArrays(
+            ids=ids[order],
+            parent_ids=np.concatenate(
+                [chunk.parent_ids for chunk in chunks])[order],
+            types=np.concatenate([chunk.types for chunk in chunks])[order],
+            xyz=np.concatenate([chunk.xyz for chunk in chunks])[order],
+            radius=np.concatenate([chunk.radius for chunk in chunks])[order]
+        )
+
+    def build(self, array_backed=False):
         """ Construct a Morphology object using this builder. This is a non-
         destructive operation. The Morphology will be validated at this stage.
+
+        Parameters
+        ----------
+        array_backed : if True, build an ArrayMorphology, which is much faster
+            for large reconstructions
+
         """
 
+        if array_backed:
+            return ArrayMorphology(self.build_arrays())
+
+        if self._chunks:
+            return Morphology.from_arrays(self.build_arrays())
+
         return Morphology(
             self.nodes, 
-            node_id_cb=lambda node: node["id"],
-            parent_id_cb=lambda node: node["parent"]
+            node_id_cb=node_id,
+            parent_id_cb=node_parent_id
+        )
+
+
+def _random_neurites(
+    stats: NeuriteStatistics,
+    origin: np.ndarray,
+    rng: np.random.Generator,
+    first_index: int
+):
+    """ Generate the nodes of random neurites, one branch order at a time.
+
+    Parameters
+    ----------
+    stats : describes the neurites to generate
+    origin : the position from which the neurites' stems start
+    rng : used to draw all random values
+    first_index : offset the returned parent indices by this amount
+
+    Returns
+    -------
+    parent_index : of each node. Stems have parent index -1
+    xyz : (N, 3) positions of the nodes
+    radius : of each node
+
+    """
+
+    num_stems = stats.num_stems
+    start = np.tile(origin, (num_stems, 1))
+    direction = _random_unit_vectors(rng, num_stems)
+    branch_parent = np.full(num_stems, NO_INDEX, dtype=np.int64)
+
+    parent_indices = []
+    positions = []
+    radii = []
+    num_nodes = first_index
+
+    for order in range(stats.max_branch_order + 1):
+        num_branches = len(start)
+        if num_branches == 0:
+            break
+
+        lengths = rng.gamma(
+            stats.branch_length_shape,
+            stats.mean_branch_length / stats.branch_length_shape,
+            num_branches
         )
+        counts = np.maximum(
+            np.round(lengths / stats.node_spacing).astype(np.int64), 1)
+        spacing = lengths / counts
+
+        # the position of each node along its branch
+        total = int(counts.sum())
+        branch = np.repeat(np.arange(num_branches), counts)
+        step = np.arange(1, total + 1) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        xyz = start[branch] \
+            + direction[branch] * (step * spacing[branch])[:, np.newaxis] \
+            + rng.normal(
+                scale=stats.jitter * stats.node_spacing, size=(total, 3))
+
+        parent_index = np.arange(num_nodes - 1, num_nodes + total - 1)
+        firsts = np.cumsum(counts) - counts
+        parent_index[firsts] = branch_parent
+
+        parent_indices.append(parent_index)
+        positions.append(xyz)
+        radii.append(np.full(
+            total, stats.stem_radius * stats.radius_taper ** order))
+
+        # the last node of some branches bifurcates
+        lasts = firsts + counts - 1
+        bifurcates = rng.random(num_branches) < stats.bifurcation_probability
+        if order == stats.max_branch_order:
+            bifurcates[:] = False
+
+        parent_direction = np.repeat(direction[bifurcates], 2, axis=0)
+        perpendicular = np.cross(
+            parent_direction, _random_unit_vectors(rng, len(parent_direction)))
+        perpendicular /= np.maximum(
+            np.linalg.norm(perpendicular, axis=1), 1e-12)[:, np.newaxis]
+        perpendicular[1::2] *= -1
+
+        angle = stats.bifurcation_angle
+        direction = np.cos(angle) * parent_direction \
+            + np.sin(angle) * perpendicular
+        start = np.repeat(xyz[lasts[bifurcates]], 2, axis=0)
+        branch_parent = np.repeat(lasts[bifurcates] + num_nodes, 2)
+
+        num_nodes += total
+
+    if not positions:
+        return (
+            np.zeros(0, dtype=np.int64), np.zeros((0, 3)), np.zeros(0))
+    return (
+        np.concatenate(parent_indices),
+        np.concatenate(positions),
+        np.concatenate(radii)
+    )
+
+
+def _random_unit_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    """ Draw vectors uniformly distributed on the unit sphere
+    """
+
+    vectors = rng.normal(size=(count, 3))
+    return vectors / np.maximum(
+        np.linalg.norm(vectors, axis=1), 1e-12)[:, np.newaxis]
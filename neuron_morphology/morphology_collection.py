@@ -0,0 +1,232 @@
+""" Store many reconstructions as one set of concatenated node arrays, so that
+population-level calculations (see features.batched) can process every
+reconstruction with a few NumPy operations rather than a Python loop.
+"""
+
+from typing import (
+    Any, Iterator, List, Mapping, Optional, Sequence, Tuple)
+from contextlib import contextmanager
+
+import numpy as np
+
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology_arrays import (
+    MorphologyArrays, COLUMNS, NO_INDEX, INDEX_DTYPE)
+from neuron_morphology.feature_extractor.run_cache import RunCache
+
+
+class MorphologyCollection:
+
+    def __init__(
+        self,
+        identifiers: Sequence[str],
+        arrays: Sequence[MorphologyArrays]
+    ):
+        """ A population of reconstructions, stored as concatenated node
+        columns along with the offset of each reconstruction's first node.
+
+        Parameters
+        ----------
+        identifiers : a unique label for each reconstruction
+        arrays : the node arrays of each reconstruction
+
+        Notes
+        -----
+        Node ids need only be unique within a reconstruction. Parent indices
+        are global: the parent of node i is node parent_index[i] of the
+        collection (or NO_INDEX for roots).
+
+        """
+
+        if len(identifiers) != len(arrays):
+            raise ValueError(
+                f"expected {len(arrays)} identifiers, found {len(identifiers)}")
+        if len(set(identifiers)) != len(identifiers):
+            raise ValueError("reconstruction identifiers must be unique")
+
+        self.identifiers: List[str] = list(identifiers)
+
+        sizes = np.array([len(item) for item in arrays], dtype=np.int64)
+        self.offsets: np.ndarray = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.offsets[1:])
+
+        for name in COLUMNS:
+            if arrays:
+                column = np.concatenate([getattr(item, name) for item in arrays])
+            else:
+                column = getattr(MorphologyArrays([], [], [], []), name)
+            setattr(self, name, column)
+
+        # the reconstruction to which each node belongs
+        self.cells: np.ndarray = np.repeat(
+            np.arange(len(arrays), dtype=INDEX_DTYPE), sizes)
+
+        parent_index = np.empty(self.offsets[-1], dtype=np.int64)
+        for item, start, stop in zip(
+                arrays, self.offsets[:-1], self.offsets[1:]):
+            local = item.parent_index
+            parent_index[start: stop] = np.where(
+                local == NO_INDEX, NO_INDEX, local + start)
+        self.parent_index: np.ndarray = parent_index
+
+        self._num_children: Optional[np.ndarray] = None
+
+        # intermediate results shared by batched features. See cached_run
+        self.run_cache: Optional[RunCache] = None
+
+    @classmethod
+    def from_morphologies(
+        cls,
+        morphologies: Mapping[str, Any]
+    ) -> "MorphologyCollection":
+        """ Build a collection from a mapping of identifiers to Morphologies
+        """
+
+        return cls(
+            list(morphologies.keys()),
+            [morphology.arrays for morphology in morphologies.values()]
+        )
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def __getitem__(self, cell: int) -> ArrayMorphology:
+        """ A single reconstruction of this collection. Its columns are views
+        of the collection's, and are copied if modified.
+        """
+
+        start, stop = self.offsets[cell], self.offsets[cell + 1]
+        arrays = MorphologyArrays(**{
+            name: getattr(self, name)[start: stop] for name in COLUMNS})
+        arrays._shared_columns = set(COLUMNS)
+        return ArrayMorphology(arrays)
+
+    def __iter__(self) -> Iterator[Tuple[str, ArrayMorphology]]:
+        for cell, identifier in enumerate(self.identifiers):
+            yield identifier, self[cell]
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_children(self) -> np.ndarray:
+        """ The number of children of each node
+        """
+
+        if self._num_children is None:
+            parents = self.parent_index[self.parent_index != NO_INDEX]
+            self._num_children = np.bincount(
+                parents, minlength=self.num_nodes)
+        return self._num_children
+
+    def has_type(self, node_type: int) -> np.ndarray:
+        """ Whether each reconstruction has any nodes of this type
+        """
+
+        return self.count(self.types == node_type) > 0
+
+    def num_roots(self) -> np.ndarray:
+        """ The number of root nodes of each reconstruction
+        """
+
+        return self.count(self.parent_index == NO_INDEX)
+
+    def first_roots(self) -> np.ndarray:
+        """ The index of each reconstruction's first root (in storage order),
+        or NO_INDEX if it has none
+        """
+
+        roots = np.flatnonzero(self.parent_index == NO_INDEX)
+        first = np.full(len(self), NO_INDEX, dtype=np.int64)
+        cells, positions = np.unique(self.cells[roots], return_index=True)
+        first[cells] = roots[positions]
+        return first
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        """ The number of nodes of each reconstruction for which a boolean
+        array is True
+        """
+
+        return np.bincount(
+            self.cells[mask], minlength=len(self)).astype(np.int64)
+
+    @contextmanager
+    def cached_run(self) -> Iterator[RunCache]:
+        """ Memoize intermediate results (see run_cache.memoize) calculated
+        from this collection until the end of a with block. See
+        Data.cached_run.
+        """
+
+        if self.run_cache is not None:
+            yield self.run_cache
+            return
+
+        cache = RunCache()
+        self.run_cache = cache
+        try:
+            yield cache
+        finally:
+            cache.clear()
+            self.run_cache = None
+
+
+def segment_sum(
+    cells: np.ndarray,
+    values: np.ndarray,
+    num_cells: int
+) -> np.ndarray:
+    """ Sum values (one row per item) within each reconstruction
+
+    Parameters
+    ----------
+    cells : the reconstruction to which each item belongs
+    values : (N,) or (N, K) array of item values
+    num_cells : the number of reconstructions
+
+    Returns
+    -------
+    (num_cells,) or (num_cells, K) array of sums. Empty reconstructions sum
+        to 0.
+
+    """
+
+    if values.ndim == 1:
+        return np.bincount(cells, weights=values, minlength=num_cells)
+    return np.stack([
+        np.bincount(cells, weights=values[:, dim], minlength=num_cells)
+        for dim in range(values.shape[1])
+    ], axis=1)
+
+
+def segment_extrema(
+    cells: np.ndarray,
+    values: np.ndarray,
+    num_cells: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """ Find the minimum and maximum of values (one row per item) within each
+    reconstruction.
+
+    Parameters
+    ----------
+    cells : the reconstruction to which each item belongs. Must be sorted.
+    values : (N,) or (N, K) array of item values
+    num_cells : the number of reconstructions
+
+    Returns
+    -------
+    The minima and maxima, as (num_cells,) or (num_cells, K) arrays. Empty
+        reconstructions have nan extrema.
+
+    """
+
+    shape = (num_cells,) + values.shape[1:]
+    minima = np.full(shape, np.nan)
+    maxima = np.full(shape, np.nan)
+    if len(cells) == 0:
+        return minima, maxima
+
+    occupied, starts = np.unique(cells, return_index=True)
+    minima[occupied] = np.minimum.reduceat(values, starts, axis=0)
+    maxima[occupied] = np.maximum.reduceat(values, starts, axis=0)
+    return minima, maxima
@@ -0,0 +1,155 @@
+""" Node-type-filtered views of a Morphology. See Morphology.view.
+"""
+
+from typing import Optional, Sequence, List, Dict, Any, Callable
+
+import numpy as np
+
+from neuron_morphology.morphology_arrays import (
+    ArraysView, TopologyIndex, CompartmentGeometry, compartment_geometry,
+    NO_INDEX, PREORDER)
+
+
+class MorphologyView:
+
+    def __init__(self, morphology: Any, arrays: ArraysView):
+        """ The subgraph of a morphology formed by the nodes of certain
+        types. A view shares its nodes and node-wise arrays with the
+        morphology; only its parent and child indices, roots and traversal
+        orders are its own. These are computed once (per morphology and
+        node types), rather than on each visit to a node.
+
+        Parameters
+        ----------
+        morphology : the viewed morphology. Obtain views through
+            Morphology.view, so that they are discarded when the morphology is
+            modified.
+        arrays : the node-type-filtered arrays of this morphology
+
+        """
+
+        self.morphology = morphology
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(self.arrays)
+
+    @property
+    def node_types(self) -> Optional[Sequence[int]]:
+        return self.arrays.node_types
+
+    @property
+    def topology(self) -> TopologyIndex:
+        """ Roots, leaves, branch points and traversal orders of this view.
+        All indices are storage indices of the viewed morphology's arrays.
+        """
+
+        return self.arrays.topology
+
+    @property
+    def indices(self) -> np.ndarray:
+        """ The storage indices of the nodes in this view
+        """
+
+        return self.arrays.indices
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        return self.morphology.nodes_at(self.arrays.indices)
+
+    def node_by_id(self, node_id: Any) -> Dict[str, Any]:
+        return self.morphology.node_at(self.arrays.index_of_id(node_id))
+
+    def children_of(self, node: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """ The children of a node which are in this view. The node itself
+        need not be.
+        """
+
+        index = self.morphology.arrays.index_of_id(
+            self.morphology.node_id_cb(node))
+        return self.morphology.nodes_at(self.arrays.children_of_index(index))
+
+    def parent_of(self, node: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ The parent of a node in this view, or None if that node is a root
+        of this view.
+        """
+
+        index = self.arrays.index_of_id(self.morphology.node_id_cb(node))
+        parent = self.arrays.parent_index[index]
+        if parent == NO_INDEX:
+            return None
+        return self.morphology.node_at(parent)
+
+    def get_roots(self) -> List[Dict[str, Any]]:
+        """ Nodes in this view whose parent (if any) is not
+        """
+
+        return self.morphology.nodes_at(self.topology.root_indices)
+
+    def get_leaf_nodes(self) -> List[Dict[str, Any]]:
+        """ Nodes in this view with no children in this view
+        """
+
+        return self.morphology.nodes_at(
+            self.topology.leaf_indices(self.node_types))
+
+    def get_branching_nodes(self) -> List[Dict[str, Any]]:
+        """ Nodes in this view with more than one child in this view
+        """
+
+        return self.morphology.nodes_at(
+            self.topology.branching_indices(self.node_types))
+
+    def traversal_order(
+        self,
+        order: str = PREORDER,
+        start_id: Optional[Any] = None
+    ) -> np.ndarray:
+        """ Find the order in which a traversal of this view would visit its
+        nodes.
+
+        Parameters
+        ----------
+        order : One of "preorder" (the default), "postorder" or
+            "breadth_first".
+        start_id : Begin the traversal from this node, which need not be in
+            this view. If not provided, each root of this view is traversed
+            in turn.
+
+        Returns
+        -------
+        A read-only array of storage indices. Use Morphology.nodes_at to obtain
+            the corresponding nodes.
+
+        """
+
+        topology = self.topology
+        if start_id is not None:
+            start_index = self.morphology.arrays.index_of_id(start_id)
+            return topology.traversal_order(start_index, order)
+
+        return topology.forest_order(order)
+
+    def batch_traversal(
+        self,
+        visit_batch: Callable[[np.ndarray], Any],
+        order: str = PREORDER,
+        start_id: Optional[Any] = None,
+        batch_size: Optional[int] = None
+    ):
+        """ Apply a function to successive batches of storage indices, in
+        traversal order. See traversal_order and Morphology.batch_traversal.
+        """
+
+        indices = self.traversal_order(order, start_id)
+        if batch_size is None:
+            batch_size = max(len(indices), 1)
+
+        for batch_start in range(0, len(indices), batch_size):
+            visit_batch(indices[batch_start: batch_start + batch_size])
+
+    def get_compartment_geometry(self) -> CompartmentGeometry:
+        """ Calculate the geometry of each compartment whose nodes are both
+        in this view. See Morphology.get_compartment_geometry.
+        """
+
+        return compartment_geometry(self.arrays)
@@ -0,0 +1,169 @@
+""" Resample a reconstruction so that its nodes are regularly spaced along
+each of its neurites. See Morphology.resample.
+"""
+
+import numpy as np
+
+from neuron_morphology.constants import SOMA
+from neuron_morphology.morphology_arrays import (
+    MorphologyArrays, NO_INDEX, PREORDER, INDEX_DTYPE, FLOAT_DTYPE)
+
+
+def resample_arrays(
+    arrays: MorphologyArrays,
+    spacing: float,
+    keep_original_nodes: bool = False,
+    start_id: int = 1
+) -> MorphologyArrays:
+    """ Place nodes at regular intervals along each unbranched section of a
+    reconstruction.
+
+    A section runs from a root, branch point, tip or either side of a change
+    of node type to the next one along a neurite. These nodes, along with all
+    soma nodes, are always kept. New nodes are placed every spacing units of path
+    distance from the start of each section (but not at or past its end),
+    with positions and radii linearly interpolated between the adjacent
+    original nodes. Compartments which cross a change of node type, or whose
+    nodes are soma nodes, are not resampled.
+
+    Parameters
+    ----------
+    arrays : the reconstruction to resample
+    spacing : the path distance between successive new nodes
+    keep_original_nodes : if True, nodes in the middle of a section are kept
+        alongside the new ones. Otherwise they are discarded.
+    start_id : the id of the first node of the result
+
+    Returns
+    -------
+    A new reconstruction. Nodes are given contiguous ids, in a depth-first
+        (preorder) ordering, and new nodes take the type of the original
+        node at the distal end of their compartment.
+
+    """
+
+    if not spacing > 0:
+        raise ValueError(f"spacing must be positive, found {spacing}")
+
+    topology = arrays.topology
+    parent_index = arrays.parent_index
+    types = arrays.types
+
+    order = topology.forest_order(PREORDER)
+    if len(order) != len(arrays):
+        raise ValueError("cannot resample a reconstruction containing cycles")
+
+    has_parent = parent_index != NO_INDEX
+    safe_parent = np.where(has_parent, parent_index, 0)
+    changes_type = has_parent & (types != types[safe_parent])
+
+    # the nodes on both sides of a change of type are significant, so that
+    # each compartment crossing a change of type is a section of its own
+    precedes_change = np.zeros(len(arrays), dtype=bool)
+    precedes_change[parent_index[changes_type]] = True
+
+    significant = ~has_parent | (topology.num_children != 1) \
+        | (types == SOMA) | changes_type | precedes_change
+
+    # in preorder, each section's nodes (excluding its start) are contiguous
+    ordered_parent = parent_index[order]
+    ordered_has_parent = ordered_parent != NO_INDEX
+    delta = arrays.xyz[order] - arrays.xyz[np.where(
+        ordered_has_parent, ordered_parent, order)]
+    length = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+    cumulative = np.cumsum(length)
+
+    starts_section = ordered_has_parent & significant[
+        np.where(ordered_has_parent, ordered_parent, 0)]
+    section_firsts = np.flatnonzero(starts_section)
+    section_lasts = np.append(section_firsts[1:], len(order)) - 1
+
+    # a section's end is always significant, so it ends just before the next
+    # section or root begins
+    section_begin = cumulative[section_firsts] - length[section_firsts]
+    section_length = cumulative[section_lasts] - section_begin
+
+    # a compartment crossing a change of type is always a section of its own
+    first_nodes = order[section_firsts]
+    resampled = (types[first_nodes] != SOMA) & ~changes_type[first_nodes]
+    num_new = np.where(
+        resampled,
+        np.maximum(np.ceil(section_length / spacing).astype(np.int64) - 1, 0),
+        0
+    )
+
+    # the path distance of each new node from the start of the traversal
+    total_new = int(num_new.sum())
+    new_section = np.repeat(np.arange(len(num_new)), num_new)
+    within = np.arange(1, total_new + 1) \
+        - np.repeat(np.cumsum(num_new) - num_new, num_new)
+    new_position = section_begin[new_section] + within * spacing
+
+    # the preorder position of each new node's compartment's distal node
+    compartment = np.searchsorted(cumulative, new_position, side="left")
+    compartment = np.clip(
+        compartment, section_firsts[new_section], section_lasts[new_section])
+    distal = order[compartment]
+    proximal = parent_index[distal]
+
+    compartment_length = length[compartment]
+    remaining = np.divide(
+        cumulative[compartment] - new_position, compartment_length,
+        out=np.zeros(total_new), where=compartment_length > 0
+    )
+    fraction = np.clip(1 - remaining, 0, 1)
+
+    new_xyz = arrays.xyz[proximal] \
+        + fraction[:, np.newaxis] * (arrays.xyz[distal] - arrays.xyz[proximal])
+    new_radius = arrays.radius[proximal] \
+        + fraction * (arrays.radius[distal] - arrays.radius[proximal])
+
+    # merge kept nodes and new nodes. New nodes precede the distal node of
+    # their compartment, in order of position
+    kept_positions = np.flatnonzero(
+        np.ones(len(order), dtype=bool) if keep_original_nodes
+        else significant[order]
+    )
+    sort_position = np.concatenate([kept_positions, compartment])
+    sort_distance = np.concatenate([cumulative[kept_positions], new_position])
+    is_new = np.concatenate([
+        np.zeros(len(kept_positions), dtype=bool),
+        np.ones(total_new, dtype=bool)
+    ])
+    merged = np.lexsort((~is_new, sort_distance, sort_position))
+
+    source = np.concatenate([order[kept_positions], distal])[merged]
+    merged_is_new = is_new[merged]
+    merged_position = sort_position[merged]
+
+    # the output index of each kept node
+    output_of_original = np.full(len(arrays), NO_INDEX, dtype=INDEX_DTYPE)
+    kept_outputs = np.flatnonzero(~merged_is_new)
+    output_of_original[source[kept_outputs]] = kept_outputs
+
+    # within a section, each output node's parent is its predecessor. The
+    # first output node of a section descends from the section's start
+    section_of_position = np.cumsum(starts_section) - 1
+    merged_section = section_of_position[merged_position]
+    is_root = ~merged_is_new & (parent_index[source] == NO_INDEX)
+    output_parent = np.arange(-1, len(merged) - 1, dtype=INDEX_DTYPE)
+    first_of_section = np.ones(len(merged), dtype=bool)
+    first_of_section[1:] = merged_section[1:] != merged_section[:-1]
+    first_of_section &= ~is_root
+    output_parent[first_of_section] = output_of_original[
+        ordered_parent[section_firsts[merged_section[first_of_section]]]]
+    output_parent[is_root] = NO_INDEX
+
+    ids = np.arange(start_id, start_id + len(merged))
+    xyz = np.concatenate([arrays.xyz[order[kept_positions]], new_xyz])[merged]
+    radius = np.concatenate(
+        [arrays.radius[order[kept_positions]], new_radius])[merged]
+
+    return MorphologyArrays(
+        ids=ids,
+        parent_ids=np.where(
+            output_parent == NO_INDEX, -1, output_parent + start_id),
+        types=types[source],
+        xyz=xyz.astype(FLOAT_DTYPE, copy=False),
+        radius=radius
+    )
@@ -0,0 +1,173 @@
+""" Place a morphology's node arrays in shared memory, so that processes
+started by multiprocessing (e.g. the workers of a Pool) can use the same
+reconstruction without each reading, parsing or unpickling a copy of it.
+
+A parent process creates a SharedMorphology, sends its (small, picklable)
+handle to workers, and keeps the SharedMorphology open until the workers are
+done. Workers call handle.load() to obtain an ArrayMorphology backed directly
+by the shared memory block.
+"""
+
+from typing import NamedTuple, Tuple, Dict, Any
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology_arrays import MorphologyArrays, COLUMNS
+
+
+# the indices of a MorphologyArrays which are shared along with its columns
+SHARED_INDICES = ("_parent_index", "_child_offsets", "_child_indices")
+
+# each array begins at a multiple of this many bytes within the block
+_ALIGNMENT = 64
+
+# blocks attached in this process, by name. See SharedMorphologyHandle.load
+_attached: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedArray(NamedTuple):
+    """ Describes an array stored in a shared memory block
+    """
+
+    # the MorphologyArrays attribute holding this array
+    name: str
+
+    # the array's numpy dtype, as a string
+    dtype: str
+
+    # the array's shape
+    shape: Tuple[int, ...]
+
+    # the position (in bytes) of the array's first element within the block
+    offset: int
+
+
+class SharedMorphologyHandle(NamedTuple):
+    """ A picklable reference to a morphology in shared memory. See
+    SharedMorphology.
+    """
+
+    # the name of the shared memory block
+    block_name: str
+
+    # the arrays stored in the block
+    arrays: Tuple[SharedArray, ...]
+
+    def load(self) -> ArrayMorphology:
+        """ Attach to the shared memory block and wrap its arrays (without
+        copying them) in an ArrayMorphology. The shared arrays are read-only:
+        a column is copied into this process's memory the first time it is
+        modified (see MorphologyArrays.writable).
+
+        Notes
+        -----
+        Only call this from processes started by multiprocessing (which share
+        the resource tracker of the process that created the block), and only
+        while the SharedMorphology is open.
+
+        """
+
+        block = _attached.get(self.block_name)
+        if block is None:
+            block = shared_memory.SharedMemory(name=self.block_name)
+            _attached[self.block_name] = block
+
+        values = {}
+        for shared in self.arrays:
+            array = np.ndarray(
+                shared.shape,
+                dtype=np.dtype(shared.dtype),
+                buffer=block.buf,
+                offset=shared.offset
+            )
+            array.flags.writeable = False
+            values[shared.name] = array
+
+        arrays = MorphologyArrays(
+            **{name: values[name] for name in COLUMNS})
+        for name in SHARED_INDICES:
+            if name in values:
+                setattr(arrays, name, values[name])
+        arrays._shared_columns = set(COLUMNS)
+
+        return ArrayMorphology(arrays)
+
+
+class SharedMorphology:
+
+    def __init__(self, morphology: Any):
+        """ Copy a morphology's node arrays, along with its parent and child
+        indices, into a new shared memory block. Additional node data (e.g.
+        the extra columns of an ArrayMorphology) are not shared.
+
+        Parameters
+        ----------
+        morphology : the reconstruction to share. Any Morphology with
+            integer node ids is supported.
+
+        Notes
+        -----
+        The block is freed by close (or on leaving a with statement). Do
+        not close it while other processes may still load it.
+
+        """
+
+        arrays = morphology.arrays
+        if arrays.ids.dtype.kind not in "iu":
+            raise ValueError(
+                "only morphologies with integer node ids can be shared")
+
+        # build the indices here, so that workers need not
+        arrays.child_offsets
+
+        sources = [(name, getattr(arrays, name)) for name in COLUMNS] + [
+            (name, getattr(arrays, name)) for name in SHARED_INDICES]
+
+        layout = []
+        size = 0
+        for name, array in sources:
+            layout.append(SharedArray(
+                name=name,
+                dtype=array.dtype.str,
+                shape=tuple(array.shape),
+                offset=size
+            ))
+            size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        self.block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for shared, (_, array) in zip(layout, sources):
+            target = np.ndarray(
+                shared.shape,
+                dtype=array.dtype,
+                buffer=self.block.buf,
+                offset=shared.offset
+            )
+            target[...] = array
+            del target
+
+        self.handle = SharedMorphologyHandle(
+            block_name=self.block.name,
+            arrays=tuple(layout)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.block.size
+
+    def close(self):
+        """ Release and free the shared memory block
+        """
+
+        if self.block is not None:
+            _attached.pop(self.block.name, None)
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,9 +1,18 @@
 import pandas as pd
-from neuron_morphology.morphology import Morphology
+import numpy as np
+from neuron_morphology.morphology import Morphology, node_id, node_parent_id
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology_arrays import MorphologyArrays
 from cloudfiles import CloudFiles
 import io
 import os
 import csv 
+import gzip
+import struct
+import contextlib
+import zipfile
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 SWC_COLUMNS = (
     "id",
@@ -16,19 +25,141 @@ SWC_COLUMNS = (
 )
 COLUMN_CASTS = {"id": int, "parent": int, "type": int}
 
+# binary morphologies are numpy archives (.npz) of node columns
+BINARY_SUFFIX = ".npz"
+BINARY_FORMAT_VERSION = 1
 
-def read_swc(path, columns=SWC_COLUMNS, sep=" ", casts=COLUMN_CASTS):
+# swc files with this suffix are gzip-compressed
+GZIP_SUFFIX = ".gz"
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_COMPRESSION_LEVEL = 6
+
+# the number of nodes formatted at once when writing swc files
+WRITE_CHUNK_SIZE = 65536
+
+SWC_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("type", np.int32),
+    ("x", np.float64),
+    ("y", np.float64),
+    ("z", np.float64),
+    ("radius", np.float64),
+    ("parent", np.int64),
+])
+
+
+def _as_cloudpath(path):
+    """ Convert a local path to a file:// url. Urls are returned unchanged.
+    """
 
-    """Read an swc file into a pandas dataframe"""
     if os.path.dirname(path) == "":
         path = "./" + path
-
     if "://" not in path:
         path = "file://" + path
+    return path
 
-    cloudpath, file = os.path.split(path)
-    cf = CloudFiles(cloudpath)
-    path = io.BytesIO(cf.get(file))
+
+def local_path(path):
+    """ If path refers to a local file (either a plain path or a file://
+    url), return its filesystem path. Otherwise return None
+    """
+
+    if path.startswith("file://"):
+        return path[len("file://"):]
+    if "://" not in path:
+        return path
+    return None
+
+
+def is_gzipped(path):
+    """ Determine (from its suffix) whether path refers to a gzip-compressed
+    swc file
+    """
+
+    return path.endswith(GZIP_SUFFIX)
+
+
+def _read_bytes(path):
+    """ Fetch the (decompressed) contents of a local or cloud file
+    """
+
+    cloudpath, file = os.path.split(_as_cloudpath(path))
+    content = CloudFiles(cloudpath).get(file, raw=is_gzipped(file))
+    if content is None:
+        raise FileNotFoundError(path)
+    return _decompress(file, content)
+
+
+def _decompress(name, content):
+    """ Decompress the contents of a .gz file. Contents which were already
+    decompressed in transit are returned unchanged.
+    """
+
+    if is_gzipped(name) and content[:2] == GZIP_MAGIC:
+        return gzip.decompress(content)
+    return content
+
+
+def read_swc_records(path):
+
+    """Read an swc file into a structured numpy array, with one record per
+    node and one field per swc column (see SWC_DTYPE). Local files
+    (including .swc.gz files) are tokenized directly by numpy, rather than
+    being copied into memory and parsed by pandas.
+    """
+
+    source = local_path(path)
+    if source is None:
+        source = io.StringIO(_read_bytes(path).decode("utf-8"))
+    return parse_swc_records(source)
+
+
+def parse_swc_records(source):
+
+    """Parse swc-formatted text into a structured numpy array (see
+    read_swc_records). source may be a local path or a text file-like
+    object.
+    """
+
+    try:
+        return np.loadtxt(
+            source, dtype=SWC_DTYPE, comments="#", usecols=range(7), ndmin=1
+        )
+    except ValueError:
+        # integer columns written as floats (e.g. "1.0")
+        if isinstance(source, io.StringIO):
+            source.seek(0)
+        values = np.loadtxt(
+            source, dtype=np.float64, comments="#", usecols=range(7), ndmin=2
+        )
+        records = np.empty(len(values), dtype=SWC_DTYPE)
+        for ii, column in enumerate(SWC_COLUMNS):
+            records[column] = values[:, ii]
+        return records
+
+
+def read_swc_arrays(path):
+
+    """Read an swc file into a MorphologyArrays"""
+
+    return _arrays_from_records(read_swc_records(path))
+
+
+def _arrays_from_records(records):
+    return MorphologyArrays(
+        ids=records["id"],
+        parent_ids=records["parent"],
+        types=records["type"],
+        xyz=np.stack([records["x"], records["y"], records["z"]], axis=1),
+        radius=records["radius"]
+    )
+
+
+def read_swc(path, columns=SWC_COLUMNS, sep=" ", casts=COLUMN_CASTS):
+
+    """Read an swc file (which may be gzip-compressed) into a pandas
+    dataframe"""
+    path = io.BytesIO(_read_bytes(path))
 
     df = pd.read_csv(path, names=columns, comment="#", sep=sep, index_col=False)
     apply_casts(df, casts)
@@ -39,30 +170,112 @@ def write_swc(
     data, path, comments=None, sep=" ", columns=SWC_COLUMNS, casts=COLUMN_CASTS
 ):
 
-    """Write an swc file from a pandas dataframe"""
+    """Write an swc file (gzip-compressed, if path ends with .gz) from a
+    pandas dataframe. The dataframe is not modified."""
 
-    if comments is None:
-        comments = []
-    comments = ["# " + comment + "\n" for comment in comments]
+    data = data[[col for col in columns]].astype(casts)
 
-    apply_casts(data, casts)
+    with _swc_text_stream(path) as stream:
+        _write_rows(
+            stream, [data[col].values for col in columns], comments, sep)
+
+
+def write_swc_arrays(
+    arrays, target, comments=None, sep=" ", chunk_size=WRITE_CHUNK_SIZE
+):
+
+    """Write node arrays to an swc file, formatting a chunk of nodes at a
+    time rather than building a dataframe.
+
+    Parameters
+    ----------
+    arrays : a MorphologyArrays describing the nodes to write
+    target : a local path or cloud url (gzip-compressed if it ends with
+        .gz), or a writable text or binary file-like object
+    comments : lines to write (each prefixed with "# ") before the nodes
+    sep : separates the columns of each line
+    chunk_size : the number of nodes to format at once
+
+    """
+
+    columns = [
+        arrays.ids,
+        arrays.types,
+        arrays.xyz[:, 0],
+        arrays.xyz[:, 1],
+        arrays.xyz[:, 2],
+        arrays.radius,
+        arrays.parent_ids
+    ]
+
+    if isinstance(target, str):
+        with _swc_text_stream(target) as stream:
+            _write_rows(stream, columns, comments, sep, chunk_size)
+    elif isinstance(target, io.TextIOBase):
+        _write_rows(target, columns, comments, sep, chunk_size)
+    else:
+        wrapper = io.TextIOWrapper(target, encoding="utf-8", newline="")
+        _write_rows(wrapper, columns, comments, sep, chunk_size)
+        wrapper.flush()
+        wrapper.detach()
+
+
+@contextlib.contextmanager
+def _swc_text_stream(path):
+    """ Open a text stream which writes to a local or cloud swc file. Local
+    files are written as the stream is; cloud files are uploaded when the
+    stream is closed.
+    """
+
+    compressed = is_gzipped(path)
+    target = local_path(path)
+
+    if target is not None:
+        if compressed:
+            stream = gzip.open(
+                target, "wt", encoding="utf-8", newline="",
+                compresslevel=GZIP_COMPRESSION_LEVEL
+            )
+        else:
+            stream = open(target, "w", encoding="utf-8", newline="")
+        with stream:
+            yield stream
+        return
 
-    data = data[[col for col in columns]]
-    if os.path.dirname(path) == "":
-        path = "./" + path
-    if "://" not in path:
-        path = "file://" + path
-    cloudpath, file = os.path.split(path)
-    cf = CloudFiles(cloudpath)
     buffer = io.BytesIO()
-    charset = "utf-8"
-    wrapper = io.TextIOWrapper(buffer, encoding=charset,newline='',
-                               line_buffering=True)
-    wrapper.writelines(comments)
-    data.to_csv(wrapper, sep=sep, index=False, header=None, mode="a")
-    wrapper.flush()
-    buffer.seek(0)
-    cf.put(file, buffer.getvalue(), content_type="application/x-swc")
+    if compressed:
+        with gzip.GzipFile(
+            fileobj=buffer, mode="wb", compresslevel=GZIP_COMPRESSION_LEVEL
+        ) as compressor, io.TextIOWrapper(
+            compressor, encoding="utf-8", newline=""
+        ) as stream:
+            yield stream
+        content = buffer.getvalue()
+    else:
+        stream = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        yield stream
+        stream.flush()
+        content = stream.detach().getvalue()
+
+    cloudpath, file = os.path.split(path)
+    CloudFiles(cloudpath).put(
+        file, content, content_type="application/x-swc", raw=compressed)
+
+
+def _write_rows(stream, columns, comments=None, sep=" ",
+                chunk_size=WRITE_CHUNK_SIZE):
+    """ Write comment lines, then one line per row of some columns. Values
+    are formatted as by str, so floats round-trip exactly.
+    """
+
+    stream.writelines("# " + comment + "\n" for comment in comments or [])
+
+    line = sep.join(["%s"] * len(columns)) + "\n"
+    num_rows = len(columns[0]) if columns else 0
+    for start in range(0, num_rows, chunk_size):
+        rows = zip(*(
+            column[start: start + chunk_size].tolist() for column in columns))
+        stream.write("".join(map(line.__mod__, rows)))
 
 
 def apply_casts(df, casts):
@@ -71,28 +284,314 @@ def apply_casts(df, casts):
         df[key] = df[key].astype(typ)
 
 
-def morphology_from_swc(swc_path):
+def is_binary_morphology(path):
+    """ Determine (from its suffix) whether path refers to a binary
+    morphology (see write_binary_morphology) rather than an swc file
+    """
+
+    return path.endswith(BINARY_SUFFIX)
+
+
+def write_binary_morphology(morphology, path):
+
+    """Write a morphology's node columns to a versioned, uncompressed numpy
+    archive (.npz). Unlike swc files, these can be memory-mapped when read
+    (see read_binary_morphology).
+    """
+
+    arrays = morphology.arrays
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        format_version=np.array(BINARY_FORMAT_VERSION),
+        id=arrays.ids,
+        type=arrays.types,
+        xyz=arrays.xyz,
+        radius=arrays.radius,
+        parent=arrays.parent_ids
+    )
+
+    target = local_path(path)
+    if target is not None:
+        with open(target, "wb") as archive:
+            archive.write(buffer.getbuffer())
+    else:
+        cloudpath, file = os.path.split(path)
+        CloudFiles(cloudpath).put(
+            file, buffer.getvalue(), content_type="application/octet-stream")
 
-    swc_data = read_swc(swc_path, sep=" ")
 
-    nodes = swc_data.to_dict("records")
-    for node in nodes:
-        # unfortunately, pandas automatically promotes numeric types to float in to_dict
-        node["parent"] = int(node["parent"])
-        node["id"] = int(node["id"])
-        node["type"] = int(node["type"])
+def read_binary_morphology(path, mmap_mode="c"):
+
+    """Read a binary morphology (see write_binary_morphology) into a
+    MorphologyArrays.
+
+    Parameters
+    ----------
+    path : the archive to read. Local archives are memory-mapped; others are
+        read into memory.
+    mmap_mode : passed to numpy.memmap. The default ("c", copy-on-write)
+        allows the loaded arrays to be modified without altering the file.
+        If None, the columns are read into memory.
+
+    """
+
+    source = local_path(path)
+    if source is not None and mmap_mode is not None:
+        columns = _memmap_npz(source, mmap_mode)
+    else:
+        if source is None:
+            cloudpath, file = os.path.split(path)
+            source = io.BytesIO(CloudFiles(cloudpath).get(file))
+        with np.load(source) as archive:
+            columns = {key: archive[key] for key in archive.files}
+
+    return _arrays_from_binary_columns(columns, path)
+
+
+def _arrays_from_binary_columns(columns, path):
+    """ Check the version of a binary morphology's columns and wrap them in a
+    MorphologyArrays
+    """
+
+    if "format_version" not in columns:
+        raise ValueError(f"{path} is not a binary morphology")
+    version = int(columns["format_version"])
+    if version > BINARY_FORMAT_VERSION:
+        raise ValueError(
+            f"{path} has format version {version}, but only versions up to "
+            f"{BINARY_FORMAT_VERSION} are supported"
+        )
+
+    return MorphologyArrays(
+        ids=columns["id"],
+        parent_ids=columns["parent"],
+        types=columns["type"],
+        xyz=columns["xyz"],
+        radius=columns["radius"]
+    )
+
+
+def _memmap_npz(path, mmap_mode):
+    """ Memory-map each array stored in an uncompressed .npz archive. Falls
+    back to reading compressed members into memory.
+    """
+
+    columns = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as raw:
+        for info in archive.infolist():
+            name = info.filename[:-len(".npy")]
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member)
+                continue
+
+            # skip the member's local header to reach the .npy data
+            raw.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", raw.read(4))
+            raw.seek(name_length + extra_length, os.SEEK_CUR)
+
+            version = np.lib.format.read_magic(raw)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(raw)
+            else:
+                header = np.lib.format.read_array_header_2_0(raw)
+            shape, fortran_order, dtype = header
+
+            if int(np.prod(shape)) == 0:
+                columns[name] = np.empty(shape, dtype=dtype)
+                continue
+
+            columns[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode=mmap_mode,
+                offset=raw.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C"
+            )
+
+    return columns
+
+
+def _morphology_from_columns(ids, types, xs, ys, zs, radii, parents):
+    """ Build a Morphology from python lists of swc column values
+    """
+
+    nodes = [
+        {
+            "id": node_id,
+            "type": node_type,
+            "x": x,
+            "y": y,
+            "z": z,
+            "radius": radius,
+            "parent": parent
+        }
+        for node_id, node_type, x, y, z, radius, parent in zip(
+            ids, types, xs, ys, zs, radii, parents
+        )
+    ]
 
     return Morphology(
         nodes,
-        node_id_cb=lambda node: node["id"],
-        parent_id_cb=lambda node: node["parent"],
+        node_id_cb=node_id,
+        parent_id_cb=node_parent_id,
     )
 
 
+def morphology_from_swc(swc_path):
+    """ Read a Morphology from an swc file or a binary morphology (see
+    write_binary_morphology)
+    """
+
+    if is_binary_morphology(swc_path):
+        arrays = read_binary_morphology(swc_path)
+        return _morphology_from_columns(
+            arrays.ids.tolist(),
+            arrays.types.tolist(),
+            *arrays.xyz.T.tolist(),
+            arrays.radius.tolist(),
+            arrays.parent_ids.tolist()
+        )
+
+    records = read_swc_records(swc_path)
+
+    # tolist produces python ints and floats, so no per-node casting is needed
+    return _morphology_from_columns(
+        *(records[column].tolist() for column in SWC_COLUMNS))
+
+
+def _morphology_from_content(name, content, array_backed):
+    """ Build a morphology from the raw bytes of an swc file or a binary
+    morphology
+    """
+
+    content = _decompress(name, content)
+    if is_binary_morphology(name):
+        with np.load(io.BytesIO(content)) as archive:
+            arrays = _arrays_from_binary_columns(
+                {key: archive[key] for key in archive.files}, name)
+    else:
+        arrays = _arrays_from_records(
+            parse_swc_records(io.StringIO(content.decode("utf-8"))))
+
+    if array_backed:
+        return ArrayMorphology(arrays)
+    return _morphology_from_columns(
+        arrays.ids.tolist(),
+        arrays.types.tolist(),
+        *arrays.xyz.T.tolist(),
+        arrays.radius.tolist(),
+        arrays.parent_ids.tolist()
+    )
+
+
+def _load_batch(cloudpath, members, array_backed):
+    """ Fetch a batch of files sharing a prefix with a single CloudFiles
+    request (or two, if only some are gzip-compressed), then parse each.
+    """
+
+    # .gz files are fetched as stored and decompressed here
+    cf = CloudFiles(cloudpath)
+    contents = {}
+    for raw in (False, True):
+        files = [file for _, file in members if is_gzipped(file) == raw]
+        if files:
+            contents.update(cf.get(files, return_dict=True, raw=raw))
+
+    loaded = []
+    for path, file in members:
+        if contents.get(file) is None:
+            raise FileNotFoundError(path)
+        loaded.append((
+            path,
+            _morphology_from_content(file, contents[file], array_backed)
+        ))
+    return loaded
+
+
+def morphologies_from_swc_many(
+    paths, num_threads=8, batch_size=16, array_backed=False
+):
+    """ Read many swc files (or binary morphologies) concurrently.
+
+    Paths are grouped by directory (or bucket prefix) and fetched in
+    batches, each with a single CloudFiles get. Batches are fetched and
+    parsed on a pool of num_threads threads, with at most 2 * num_threads
+    batches in flight at once.
+
+    Parameters
+    ----------
+    paths : iterable of local paths or cloud urls (e.g. file://, gs://, s3://)
+    num_threads : the maximum number of batches to load at once
+    batch_size : the maximum number of files per batch
+    array_backed : if True, yield ArrayMorphologies rather than Morphologies
+
+    Yields
+    ------
+    (path, morphology) tuples, in the order that loading completes (not the
+        order of paths)
+
+    """
+
+    groups = {}
+    for path in paths:
+        cloudpath, file = os.path.split(_as_cloudpath(path))
+        groups.setdefault(cloudpath, []).append((path, file))
+
+    batches = (
+        (cloudpath, members[start: start + batch_size])
+        for cloudpath, members in groups.items()
+        for start in range(0, len(members), batch_size)
+    )
+
+    executor = ThreadPoolExecutor(max_workers=num_threads)
+    pending = set()
+    try:
+        while True:
+            for cloudpath, members in itertools.islice(
+                batches, 2 * num_threads - len(pending)
+            ):
+                pending.add(executor.submit(
+                    _load_batch, cloudpath, members, array_backed))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def array_morphology_from_swc(swc_path):
+    """ Read an swc file into an ArrayMorphology, without building a
+    dictionary per node. Binary morphologies (see write_binary_morphology)
+    are memory-mapped.
+    """
+
+    if is_binary_morphology(swc_path):
+        return ArrayMorphology(read_binary_morphology(swc_path))
+    return ArrayMorphology(read_swc_arrays(swc_path))
+
+
 def morphology_to_swc(morphology, swc_path, comments=None):
     """
-    Write an swc file from a morphology object
+    Write an swc file from a morphology object. If swc_path ends with .gz,
+    the file is gzip-compressed. If swc_path ends with .npz, write a binary
+    morphology instead (see write_binary_morphology). Binary morphologies do
+    not store comments.
     """
 
-    df = pd.DataFrame(morphology.nodes())
-    write_swc(df, swc_path, comments=comments)
+    if is_binary_morphology(swc_path):
+        write_binary_morphology(morphology, swc_path)
+        return
+
+    if isinstance(morphology, ArrayMorphology):
+        arrays = morphology.arrays
+    else:
+        # read the nodes afresh, in case they were modified in place
+        arrays = MorphologyArrays.from_nodes(morphology.nodes())
+    write_swc_arrays(arrays, swc_path, comments=comments)
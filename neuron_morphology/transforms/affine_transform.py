@@ -186,15 +186,14 @@ class AffineTransform(TransformBase):
         else:
             scaling_factor = 1
 
-        for node in morphology.nodes():
-            coordinates = np.array((node['x'], node['y'], node['z']),
-                                   dtype=float)
-            new_coordinates = self.transform(coordinates)
-            node['x'] = new_coordinates[0]
-            node['y'] = new_coordinates[1]
-            node['z'] = new_coordinates[2]
+        # nodes may have been moved in place since the arrays were built
+        morphology.refresh_caches()
+        arrays = morphology.arrays
+        morphology.set_coordinates(
+            self.transform(arrays.xyz),
             # approximate with uniform scaling in each dimension
-            node['radius'] *= scaling_factor
+            arrays.radius * scaling_factor
+        )
 
         return morphology
 
@@ -1,7 +1,29 @@
+import numpy as np
+
 from neuron_morphology.validation.result import MarkerValidationError as ve
 from neuron_morphology.constants import *
 
 
+def _markers_at_tips(markers, morphology, node_types):
+
+    """ For each marker, whether its coordinates correspond to a tip of these node types. Coordinates are
+        looked up in a spatial index of the morphology, rather than compared against each tip
+    """
+
+    if not markers:
+        return []
+
+    """ Subtract one from the coordinates because there is a known discrepancy between the coordinates of 
+        the marker file and the swc file
+    """
+    points = np.array([[marker['original_x'] - 1, marker['original_y'] - 1, marker['original_z'] - 1]
+                       for marker in markers], dtype=float)
+
+    is_leaf = morphology.topology.is_leaf
+    matches = morphology.arrays.spatial_index(node_types).within(points, 0)
+    return [bool(np.any(is_leaf[match])) for match in matches]
+
+
 def validate_coordinates_corresponding_to_dendrite_tip(marker_file, morphology):
 
     """ This function checks whether the coordinates for each dendrite marker
@@ -9,29 +31,16 @@ def validate_coordinates_corresponding_to_dendrite_tip(marker_file, morphology):
 
     result = []
     marker_types = [CUT_DENDRITE]
-    morphology_tip_nodes = []
-    morphology_dendrite_nodes = morphology.get_node_by_types([BASAL_DENDRITE, APICAL_DENDRITE])
-
-    for node in morphology_dendrite_nodes:
-        if not morphology.children_of(node):
-            morphology_tip_nodes.append(node)
+    markers = [marker for marker in marker_file if marker['name'] in marker_types]
+    tip_markers = _markers_at_tips(markers, morphology, [BASAL_DENDRITE, APICAL_DENDRITE])
 
-    for marker in marker_file:
-        tip_marker = False
-        if marker['name'] in marker_types:
-            for node in morphology_tip_nodes:
-
-                """ Subtract one from the coordinates because there is a known discrepancy between the coordinates of 
-                    the marker file and the swc file
-                """
-                if (marker['original_x'] - 1) == node['x'] and (marker['original_y'] - 1) == node['y'] and (marker['original_z'] - 1) == node['z']:
-                    tip_marker = True
-            if not tip_marker:
-                result.append(ve("Coordinates for each dendrite (type 10) needs to correspond to a tip of a dendrite "
-                                 "type (type 3 or 4) in the related morphology", {'x': marker['original_x'],
-                                                                                  'y': marker['original_y'],
-                                                                                  'z': marker['original_z'],
-                                                                                  'name': marker['name']}, "Info"))
+    for marker, tip_marker in zip(markers, tip_markers):
+        if not tip_marker:
+            result.append(ve("Coordinates for each dendrite (type 10) needs to correspond to a tip of a dendrite "
+                             "type (type 3 or 4) in the related morphology", {'x': marker['original_x'],
+                                                                              'y': marker['original_y'],
+                                                                              'z': marker['original_z'],
+                                                                              'name': marker['name']}, "Info"))
 
     return result
 
@@ -43,30 +52,16 @@ def validate_coordinates_corresponding_to_axon_tip(marker_file, morphology):
 
     result = []
     marker_types = [NO_RECONSTRUCTION]
-    morphology_tip_nodes = []
-    morphology_axon_nodes = morphology.get_node_by_types([AXON])
-
-    for node in morphology_axon_nodes:
-        if not morphology.children_of(node):
-            morphology_tip_nodes.append(node)
-
-    for marker in marker_file:
-        tip_marker = False
-        if marker['name'] in marker_types:
-            for node in morphology_tip_nodes:
-
-                """ Subtract one from the coordinates because there is a known discrepancy between the coordinates of 
-                    the marker file and the swc file
-                """
-                if (marker['original_x'] - 1) == node['x'] and (marker['original_y'] - 1) == node['y'] \
-                    and (marker['original_z'] - 1) == node['z']:
-                    tip_marker = True
-            if not tip_marker:
-                result.append(ve("Coordinates for each axon (type 20) needs to correspond to a tip of an axon "
-                                 "type (type 2) in the related morphology", {'x': marker['original_x'],
-                                                                             'y': marker['original_y'],
-                                                                             'z': marker['original_z'],
-                                                                             'name': marker['name']}, "Info"))
+    markers = [marker for marker in marker_file if marker['name'] in marker_types]
+    tip_markers = _markers_at_tips(markers, morphology, [AXON])
+
+    for marker, tip_marker in zip(markers, tip_markers):
+        if not tip_marker:
+            result.append(ve("Coordinates for each axon (type 20) needs to correspond to a tip of an axon "
+                             "type (type 2) in the related morphology", {'x': marker['original_x'],
+                                                                         'y': marker['original_y'],
+                                                                         'z': marker['original_z'],
+                                                                         'name': marker['name']}, "Info"))
 
     return result
 
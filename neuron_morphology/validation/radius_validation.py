@@ -1,4 +1,3 @@
-import collections
 import numpy as np
 from neuron_morphology.validation.result import NodeValidationError as ve
 from neuron_morphology.constants import *
@@ -63,33 +62,27 @@ def validate_radius_has_negative_slope_dendrite(morphology, dendrite):
     if root['type'] is not SOMA:
         return result
 
-    nodes_by_branch_order = collections.defaultdict(list)
-
-    root_children = morphology.get_children_of_node_by_types(root, [dendrite])
-    to_visit = [(child, 1) for child in root_children]
-
-    while to_visit:
-        (node, parent_order) = to_visit.pop()
-        children = morphology.get_children_of_node_by_types(node, [dendrite])
-
-        if len(children) > 1:
-            order = parent_order + 1
-        else:
-            order = parent_order
-
-        nodes_by_branch_order[order].append(node)
-        to_visit.extend([(child_node, order)
-                         for child_node in children])
-
-    orders = sorted(nodes_by_branch_order.keys())
-    avg_radius = []
-
-    for order in orders:
-        nodes = nodes_by_branch_order[order]
-        total_radius = 0
-        for node in nodes:
-            total_radius += node['radius']
-        avg_radius.append(total_radius / len(nodes))
+    # the dendrite nodes descending (through dendrite nodes) from the root
+    view = morphology.view([dendrite])
+    root_index = morphology.arrays.index_of_id(morphology.node_id_cb(root))
+    nodes = np.concatenate(
+        [view.topology.traversal_order(stem)
+            for stem in view.arrays.children_of_index(root_index)]
+        or [np.array([], dtype=int)]
+    )
+
+    # a node's order counts the branch points from the root up to and
+    # including the node itself
+    node_orders = morphology.node_orders([dendrite])
+    node_order = 1 + node_orders.centrifugal_order[nodes] \
+        + (view.arrays.num_children[nodes] > 1)
+
+    orders, inverse = np.unique(node_order, return_inverse=True)
+    avg_radius = np.bincount(
+        inverse, weights=morphology.arrays.radius[nodes]) \
+        / np.bincount(inverse)
+    orders = orders.tolist()
+    avg_radius = avg_radius.tolist()
 
     if len(orders) > 1:
         if slope_linear_regression_branch_order_avg_radius(orders,
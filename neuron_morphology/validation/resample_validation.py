@@ -5,13 +5,19 @@ from neuron_morphology.constants import *
 def validate_distance_between_connected_nodes(morphology):
 
     result = []
-    for compartment in morphology.compartments:
-        node1 = compartment[0]
-        node2 = compartment[1]
-        if node1['type'] is not SOMA and node2['type'] is not SOMA:
-            if morphology.get_compartment_length(compartment) > 50.0:
-                result.append(ve("The distance between two nodes should be less than 50px", [node1['id'], node2['id']],
-                                 "Error"))
+    morphology.refresh_caches()
+    arrays = morphology.arrays
+    geometry = morphology.get_compartment_geometry()
+
+    too_long = (arrays.types[geometry.parent_index] != SOMA) \
+        & (arrays.types[geometry.child_index] != SOMA) \
+        & (geometry.length > 50.0)
+
+    parent_ids = arrays.ids[geometry.parent_index[too_long]].tolist()
+    child_ids = arrays.ids[geometry.child_index[too_long]].tolist()
+    for parent_id, child_id in zip(parent_ids, child_ids):
+        result.append(ve("The distance between two nodes should be less than 50px", [parent_id, child_id],
+                         "Error"))
 
     return result
 
@@ -0,0 +1,131 @@
+import unittest
+from unittest import mock
+import tempfile
+import shutil
+import os
+
+import numpy as np
+import pandas as pd
+
+from neuron_morphology.swc_io import write_swc
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.features.layer.layered_point_depths import \
+    LayeredPointDepths
+from neuron_morphology.feature_extractor.batch_executor import BatchExecutor
+
+
+class TestBatchExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        nodes = (
+            MorphologyBuilder()
+                .root()
+                    .axon()
+                        .axon()
+                            .axon().up(3)
+                    .basal_dendrite()
+                        .basal_dendrite().up()
+                        .basal_dendrite()
+                .nodes
+        )
+
+        self.reconstructions = []
+        for index in range(5):
+            path = os.path.join(self.tmpdir, f"{index}.swc")
+            write_swc(pd.DataFrame(nodes), path)
+            self.reconstructions.append(
+                {"swc_path": path, "identifier": str(index)})
+
+        self.lpd_path = os.path.join(self.tmpdir, "layered_point_depths.csv")
+        LayeredPointDepths(
+            ids=np.arange(len(nodes)),
+            layer_name=["1"] * (len(nodes) - 1) + ["wm"],
+            depth=np.arange(len(nodes)) * 10.0,
+            local_layer_pia_side_depth=[0] * len(nodes),
+            local_layer_wm_side_depth=[100] * len(nodes),
+            point_type=[node["type"] for node in nodes]
+        ).to_csv(self.lpd_path)
+
+        self.global_parameters = {
+            "layered_point_depths_path": self.lpd_path,
+            "reference_layer_depths": {
+                "names": ["1", "wm"],
+                "boundaries": [0, 100, 200]
+            }
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hydrate_once(self):
+        read = LayeredPointDepths.read
+        with mock.patch.object(
+                LayeredPointDepths, "read", side_effect=read) as patched, \
+                BatchExecutor(
+                    "aibs_default",
+                    global_parameters=self.global_parameters
+                ) as executor:
+            outputs = dict(executor.map(self.reconstructions))
+
+        self.assertEqual(patched.call_count, 1)
+        self.assertEqual(sorted(outputs), ["0", "1", "2", "3", "4"])
+        self.assertIn(
+            "axon.normalized_depth_histogram",
+            outputs["0"]["selected_features"]
+        )
+
+    def test_pool(self):
+        with BatchExecutor("aibs_default") as executor:
+            expected = dict(executor.map(self.reconstructions))
+
+        with BatchExecutor(
+            "aibs_default",
+            num_processes=2,
+            max_in_flight=2,
+            max_tasks_per_child=1
+        ) as executor:
+            obtained = dict(executor.map(iter(self.reconstructions)))
+
+        self.assertIsNone(executor._pool)
+        self.assertEqual(sorted(obtained), sorted(expected))
+        for identifier, run in expected.items():
+            self.assertEqual(
+                run["selected_features"],
+                obtained[identifier]["selected_features"]
+            )
+            self.assertEqual(
+                run["results"]["axon.num_tips"],
+                obtained[identifier]["results"]["axon.num_tips"]
+            )
+
+    def test_error(self):
+        self.reconstructions[2]["swc_path"] = os.path.join(
+            self.tmpdir, "missing.swc")
+
+        executor = BatchExecutor("aibs_default", num_processes=2)
+        with self.assertRaises(FileNotFoundError), executor:
+            for _ in executor.map(self.reconstructions):
+                pass
+
+        self.assertIsNone(executor._pool)
+
+    def test_chunksize(self):
+        executor = BatchExecutor(
+            "aibs_default",
+            num_processes=4,
+            max_in_flight=40,
+            target_chunk_seconds=1.0
+        )
+        self.assertEqual(executor.chunksize(), 1)
+
+        executor._observe(4, 0.4)
+        self.assertEqual(executor.chunksize(), 10)
+
+        executor._observe(1, 1.0)
+        self.assertEqual(executor.chunksize(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from neuron_morphology.constants import AXON, BASAL_DENDRITE
+from neuron_morphology.morphology_builder import (
+    MorphologyBuilder, NeuriteStatistics)
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.mark import Intrinsic
+from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.feature_extractor.run_cache import RunCache
+from neuron_morphology.feature_extractor.utilities import unnest
+from neuron_morphology.feature_extractor.concurrent_extraction import (
+    dumps_features, _chunks)
+from neuron_morphology.features.default_features import default_features
+
+
+@marked(Intrinsic)
+def unlucky(data):
+    raise ValueError("this feature always fails")
+
+
+class TestConcurrentExtraction(unittest.TestCase):
+
+    def setUp(self):
+        statistics = {
+            AXON: NeuriteStatistics(num_stems=1, max_branch_order=5),
+            BASAL_DENDRITE: NeuriteStatistics(num_stems=4, max_branch_order=3)
+        }
+        self.morphology = MorphologyBuilder().root().random_neurites(
+            statistics, seed=11).build()
+
+        self.extractor = FeatureExtractor(default_features + [unlucky])
+        self.serial = self.extractor.extract(
+            Data(self.morphology), capture_errors=True)
+
+    def assert_same_results(self, run):
+        expected = unnest(self.serial.results)
+        obtained = unnest(run.results)
+
+        self.assertEqual(list(obtained), list(expected))
+        for key, value in expected.items():
+            np.testing.assert_allclose(
+                np.asarray(obtained[key], dtype=float),
+                np.asarray(value, dtype=float),
+                err_msg=key
+            )
+        self.assertEqual(list(run.failures), list(self.serial.failures))
+
+    def test_failures(self):
+        self.assertIn("unlucky", self.serial.failures)
+        self.assertNotIn("unlucky", self.serial.results)
+        self.assertIsInstance(
+            self.serial.failures["unlucky"].error, ValueError)
+
+    def test_threads(self):
+        run = self.extractor.extract(
+            Data(self.morphology), num_threads=4, capture_errors=True)
+        self.assert_same_results(run)
+
+    def test_processes(self):
+        run = self.extractor.extract(
+            Data(self.morphology),
+            num_threads=2,
+            num_processes=2,
+            capture_errors=True
+        )
+        self.assert_same_results(run)
+        self.assertIn("this feature always fails",
+            run.failures["unlucky"].traceback)
+
+    def test_raise(self):
+        for options in ({}, {"num_threads": 4}):
+            with self.assertRaises(ValueError):
+                self.extractor.extract(Data(self.morphology), **options)
+
+    def test_dumps_features(self):
+        loaded = pickle.loads(dumps_features(self.extractor.features))
+
+        self.assertEqual(
+            [feature.name for feature in loaded],
+            [feature.name for feature in self.extractor.features]
+        )
+        self.assertEqual(
+            [feature.intermediates() for feature in loaded],
+            [feature.intermediates() for feature in self.extractor.features]
+        )
+
+    def test_chunks(self):
+        self.assertEqual(_chunks([1, 2, 3, 4, 5], 2), [[1, 2], [3, 4, 5]])
+        self.assertEqual(_chunks([1, 2], 4), [[1], [2]])
+
+
+class TestRunCacheThreads(unittest.TestCase):
+
+    def test_calculated_once(self):
+        cache = RunCache()
+        results = []
+
+        def calculate():
+            time.sleep(0.05)
+            return object()
+
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get("a", 1, calculate)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(cache.statistics()["a"].misses, 1)
+        self.assertEqual(cache.statistics()["a"].hits, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
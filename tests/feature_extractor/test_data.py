@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 
 from neuron_morphology.feature_extractor.data import Data, get_morphology
 from neuron_morphology.morphology_builder import MorphologyBuilder
@@ -28,6 +29,36 @@ class TestData(unittest.TestCase):
         self.assertEqual(aa.__class__.__name__, "Morphology")
         self.assertEqual(bb.__class__.__name__, "Morphology")
 
+    def test_refreshed_in_place(self):
+        data = Data(self.morphology)
+        node = self.morphology.nodes()[3]
+        moved = self.morphology.arrays.xyz[3, 0] + 5
+        node["x"] = moved
+
+        with data.cached_run():
+            self.assertEqual(get_morphology(data).arrays.xyz[3, 0], moved)
+            self.assertFalse(self.morphology.refresh_caches())
+
+    def test_refreshed_once(self):
+        data = Data(self.morphology)
+        with mock.patch.object(
+                self.morphology, "refresh_caches",
+                wraps=self.morphology.refresh_caches) as refresh:
+            for _ in range(3):
+                get_morphology(data)
+            self.assertEqual(refresh.call_count, 1)
+
+            with data.cached_run():
+                get_morphology(data)
+            self.assertEqual(refresh.call_count, 2)
+
+            get_morphology(data)
+            get_morphology(data)
+            self.assertEqual(refresh.call_count, 3)
+
+            get_morphology(self.morphology)
+            self.assertEqual(refresh.call_count, 4)
+
     def test_hash(self):
         dat = Data(self.morphology)
         self.assertEqual({dat}, {dat})
\ No newline at end of file
@@ -0,0 +1,124 @@
+import unittest
+
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.mark import Mark
+from neuron_morphology.feature_extractor.marked_feature import (
+    marked, requires, specialize)
+from neuron_morphology.feature_extractor.feature_specialization import \
+    FeatureSpecialization
+from neuron_morphology.feature_extractor.feature_extraction_run import \
+    FeatureExtractionRun
+from neuron_morphology.feature_extractor.intermediate import (
+    Intermediate, schedule, keyword_arguments)
+from neuron_morphology.features.default_features import default_features
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.features.path import PATH_DISTANCES
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestIntermediate(unittest.TestCase):
+
+    def setUp(self):
+        self.squares = Intermediate("squares")
+        self.cubes = Intermediate("cubes")
+        self.sums = Intermediate("sums", requires=(self.squares,))
+        self.calculated = []
+        self.held = {}
+
+        self.does_math = Mark.factory("DoesMath")
+
+        def product(name):
+            def calculate(data):
+                self.calculated.append(name)
+                return name
+            return lambda data: Intermediate(name).memoize(
+                data, calculate, data)
+
+        squares = product("squares")
+        cubes = product("cubes")
+
+        def feature(name, *products):
+            def calculate(data):
+                result = [product(data) for product in products]
+                self.held[name] = len(data.run_cache)
+                return result
+            calculate.__name__ = name
+            return marked(self.does_math)(calculate)
+
+        self.first = requires(self.squares)(feature("first", squares))
+        self.second = requires(self.cubes)(feature("second", cubes))
+        self.third = requires(self.squares)(feature("third", squares))
+
+        self.data = Data(MorphologyBuilder().root().build())
+
+    def test_specialized_requirements(self):
+
+        @requires(lambda power=2, **kwargs: [
+            self.squares if power == 2 else self.cubes])
+        def power_sum(data, power=2):
+            return power
+
+        cubed = FeatureSpecialization.factory("Cubed", set(), {"power": 3})
+        self.assertEqual(power_sum.intermediates(), {self.squares})
+        self.assertEqual(
+            specialize(power_sum, {cubed})["Cubed.power_sum"].intermediates(),
+            {self.cubes}
+        )
+
+    def test_transitive_requirements(self):
+
+        @marked(self.does_math)
+        @requires(self.sums)
+        def summary(data):
+            return 0
+
+        self.assertEqual(summary.intermediates(), {self.sums, self.squares})
+        self.assertEqual(summary.marks, {self.does_math})
+
+    def test_keyword_arguments(self):
+
+        def fn(data, a=1, b=2):
+            pass
+
+        specialized = specialize(
+            fn, {FeatureSpecialization.factory("B", set(), {"b": 3})})
+
+        self.assertEqual(
+            keyword_arguments(specialized["B.fn"].feature), {"a": 1, "b": 3})
+
+    def test_schedule(self):
+        obtained = schedule([
+            {self.squares}, {self.cubes}, set(), {self.squares}])
+
+        # products with a single consumer are calculated and evicted first
+        self.assertEqual(obtained.order, [2, 1, 0, 3])
+        self.assertEqual(obtained.evictions, [[], ["cubes"], [], ["squares"]])
+
+    def test_extract(self):
+        run = (
+            FeatureExtractionRun(self.data)
+                .select_marks({self.does_math})
+                .select_features([self.first, self.second, self.third])
+                .extract()
+        )
+
+        self.assertEqual(list(run.results), ["first", "second", "third"])
+        self.assertEqual(self.calculated, ["cubes", "squares"])
+
+        # cubes are evicted before squares are calculated
+        self.assertEqual(self.held, {"first": 1, "third": 1, "second": 1})
+
+    def test_default_features(self):
+        features = {
+            feature.name: feature
+            for feature in FeatureExtractor(default_features).features
+        }
+
+        self.assertEqual(
+            features["axon.tip.moments"].intermediates(),
+            {COORD_TYPE.TIP.intermediate}
+        )
+        self.assertEqual(
+            features["max_path_distance"].intermediates(), {PATH_DISTANCES})
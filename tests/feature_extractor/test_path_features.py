@@ -225,3 +225,54 @@ class TestMaxPathDistance(PathTestCase):
         self.assertEqual(feature_extraction_run.results["dendrite.max_path_distance"], 4)
         self.assertEqual(feature_extraction_run.results["basal_dendrite.max_path_distance"], 3)
         self.assertEqual(feature_extraction_run.results["apical_dendrite.max_path_distance"], 4)
+
+
+class TestPathDistances(PathTestCase):
+
+    def test_from_root(self):
+        distances = path.calculate_path_distances(self.morphology)
+        index = self.morphology.arrays.index_of_id(11)
+        self.assertAlmostEqual(distances.from_root[index], 50)
+
+    def test_max_downstream(self):
+        distances = path.calculate_path_distances(self.morphology)
+        index = self.morphology.arrays.index_of_id(3)
+        # 3 -> 5 -> 7 is longer than 3 -> 4 -> 11
+        self.assertAlmostEqual(distances.max_downstream[index], 9 + 20 + 1629 ** 0.5)
+        self.assertEqual(distances.tip_type[index], AXON)
+
+    def test_tip_types(self):
+        distances = path.calculate_path_distances(
+            self.morphology, node_types=[APICAL_DENDRITE])
+        index = self.morphology.arrays.index_of_id(0)
+        self.assertAlmostEqual(distances.max_downstream[index], 2 + 23 + 2)
+        self.assertEqual(distances.tip_type[index], APICAL_DENDRITE)
+
+    def test_deeply_nested(self):
+        # each spine node bifurcates, so that a recursive implementation
+        # would need one stack frame per spine node
+        nodes = [{"id": 0, "parent_id": -1, "type": SOMA,
+                  "x": 0, "y": 0, "z": 0, "radius": 1}]
+        num_spine = 5000
+        for ii in range(1, num_spine + 1):
+            nodes.append({"id": 2 * ii - 1, "parent_id": max(2 * ii - 3, 0),
+                          "type": AXON, "x": ii, "y": 0, "z": 0, "radius": 1})
+            nodes.append({"id": 2 * ii, "parent_id": 2 * ii - 1,
+                          "type": AXON, "x": ii, "y": 0.5, "z": 0, "radius": 1})
+
+        morphology = Morphology(
+            nodes,
+            node_id_cb=lambda node: node["id"],
+            parent_id_cb=lambda node: node["parent_id"]
+        )
+        max_path = num_spine + 0.5
+        self.assertAlmostEqual(path.max_path_distance(morphology), max_path)
+        self.assertAlmostEqual(
+            path.early_branch_path(morphology), 0.5 / max_path)
+
+        # the last spine node does not bifurcate
+        num_bifurcations = num_spine - 1
+        euclidean = num_bifurcations * 0.5 + (num_bifurcations - 1) + 1.25 ** 0.5
+        along_path = num_bifurcations * 0.5 + (num_bifurcations - 1) + 1.5
+        self.assertAlmostEqual(
+            path.mean_contraction(morphology), euclidean / along_path)
@@ -0,0 +1,134 @@
+import unittest
+
+import numpy as np
+
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.marked_feature import marked
+from neuron_morphology.feature_extractor.mark import Geometric
+from neuron_morphology.feature_extractor.feature_extraction_run import \
+    FeatureExtractionRun
+from neuron_morphology.feature_extractor.run_cache import (
+    RunCache, CacheStatistics, memoize, memoized)
+from neuron_morphology.features.statistics.coordinates import COORD_TYPE
+from neuron_morphology.morphology_builder import MorphologyBuilder
+
+
+class TestRunCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def square(value, offset=0):
+            self.calls.append(value)
+            return value ** 2 + offset
+        self.square = square
+
+        self.morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2).up()
+                        .axon(0, 1, 1).up(2)
+                    .basal_dendrite(1, 0, 0)
+                .build()
+        )
+
+    def test_get(self):
+        cache = RunCache()
+        self.assertEqual(cache.get("a", 2, lambda: self.square(2)), 4)
+        self.assertEqual(cache.get("a", 2, lambda: self.square(2)), 4)
+        self.assertEqual(cache.get("a", 3, lambda: self.square(3)), 9)
+
+        self.assertEqual(self.calls, [2, 3])
+        self.assertEqual(
+            cache.statistics(), {"a": CacheStatistics(hits=1, misses=2)})
+
+    def test_clear(self):
+        cache = RunCache()
+        cache.get("a", 2, lambda: self.square(2))
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(
+            cache.statistics(), {"a": CacheStatistics(hits=0, misses=1)})
+
+    def test_memoize_without_cache(self):
+        data = Data(self.morphology)
+        memoize(data, "square", self.square, 2)
+        memoize(data, "square", self.square, 2)
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_memoize(self):
+        data = Data(self.morphology)
+        with data.cached_run():
+            memoize(data, "square", self.square, 2, offset=1)
+            memoize(data, "square", self.square, 2, offset=1)
+            memoize(data, "square", self.square, 2, offset=2)
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_memoize_unhashable(self):
+        data = Data(self.morphology)
+        with data.cached_run() as cache:
+            memoize(data, "square", self.square, np.arange(2))
+            memoize(data, "square", self.square, np.arange(2))
+            self.assertEqual(len(cache), 0)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_memoize_lists(self):
+        data = Data(self.morphology)
+        with data.cached_run():
+            memoize(data, "len", len, [1, 2])
+            memoize(data, "len", len, [1, 2])
+            self.assertEqual(
+                data.run_cache.statistics()["len"],
+                CacheStatistics(hits=1, misses=1)
+            )
+
+    def test_memoized(self):
+
+        @memoized()
+        def num_nodes(data, node_types=None):
+            self.calls.append(node_types)
+            return len(data.morphology.get_node_by_types(node_types))
+
+        data = Data(self.morphology)
+        with data.cached_run():
+            self.assertEqual(num_nodes(data), 5)
+            self.assertEqual(num_nodes(data), 5)
+        self.assertEqual(self.calls, [None])
+
+    def test_cached_run_evicts(self):
+        data = Data(self.morphology)
+        with data.cached_run() as cache:
+            with data.cached_run() as inner:
+                self.assertIs(cache, inner)
+            COORD_TYPE.TIP.get_coordinates(data)
+            self.assertEqual(len(cache), 1)
+
+        self.assertIsNone(data.run_cache)
+        self.assertEqual(len(cache), 0)
+
+    def test_extraction_run(self):
+
+        @marked(Geometric)
+        def num_tips(data):
+            return len(COORD_TYPE.TIP.get_coordinates(data))
+
+        @marked(Geometric)
+        def tip_height(data):
+            coordinates = np.array(COORD_TYPE.TIP.get_coordinates(data))
+            return float(np.ptp(coordinates[:, 1]))
+
+        run = (
+            FeatureExtractionRun(Data(self.morphology))
+                .select_marks({Geometric})
+                .select_features([num_tips, tip_height])
+                .extract()
+        )
+
+        self.assertEqual(run.results, {"num_tips": 3, "tip_height": 1.0})
+        self.assertEqual(
+            run.cache_statistics,
+            {"tip_coordinates": CacheStatistics(hits=1, misses=1)}
+        )
+        self.assertIsNone(run.data.run_cache)
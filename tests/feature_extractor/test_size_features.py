@@ -84,6 +84,21 @@ class TestTotalLength(MorphoSizeTest):
         obtained = size.total_length(self.morphology, [AXON])
         self.assertEqual(obtained, 10)
 
+    def test_modified_in_place(self):
+        self.assertEqual(size.total_length(self.morphology, [AXON]), 10)
+        self.assertAlmostEqual(
+            size.total_volume(self.morphology, [AXON]), math.pi * 10)
+
+        node = self.morphology.node_by_id(2)
+        node["z"] = 130
+        node["radius"] = 2
+
+        self.assertEqual(size.total_length(self.morphology, [AXON]), 20)
+        self.assertAlmostEqual(
+            size.total_volume(self.morphology, [AXON]),
+            math.pi * 20 * (1 + 2 + 4) / 3
+        )
+
 
 class TestTotalSurfaceArea(MorphoSizeTest):
     # see morphology tests for tests that vary radii
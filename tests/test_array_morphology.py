@@ -0,0 +1,613 @@
+import unittest
+import pickle
+import itertools
+import time
+
+import numpy as np
+
+from neuron_morphology.constants import *
+from neuron_morphology.morphology import Morphology
+from neuron_morphology.array_morphology import ArrayMorphology
+from neuron_morphology.morphology_arrays import MorphologyArrays
+from tests.objects import (test_node,
+                           test_morphology_small,
+                           test_morphology_small_branching,
+                           test_morphology_small_multiple_trees,
+                           test_morphology_large,
+                           )
+
+
+class TestMorphologyArrays(unittest.TestCase):
+
+    def setUp(self):
+        self.arrays = MorphologyArrays(
+            ids=[10, 30, 20, 40],
+            parent_ids=[-1, 10, 10, 20],
+            types=[SOMA, AXON, AXON, AXON],
+            xyz=np.zeros((4, 3))
+        )
+
+    def test_index_of(self):
+        obtained = self.arrays.index_of([20, 10, 50])
+        self.assertEqual(obtained.tolist(), [2, 0, -1])
+
+    def test_index_of_contiguous(self):
+        arrays = MorphologyArrays(
+            ids=[1, 2, 3], parent_ids=[-1, 1, 2], types=[1, 2, 2],
+            xyz=np.zeros((3, 3))
+        )
+        self.assertEqual(arrays.index_of([3, 1, 4, 0]).tolist(), [2, 0, -1, -1])
+
+    def test_parent_index(self):
+        self.assertEqual(self.arrays.parent_index.tolist(), [-1, 0, 0, 2])
+
+    def test_child_index(self):
+        self.assertEqual(self.arrays.child_offsets.tolist(), [0, 2, 2, 3, 3])
+        self.assertEqual(self.arrays.child_indices.tolist(), [1, 2, 3])
+        self.assertEqual(self.arrays.num_children.tolist(), [2, 0, 1, 0])
+
+    def test_index_of_id(self):
+        self.assertEqual(self.arrays.index_of_id(40), 3)
+        with self.assertRaises(KeyError):
+            self.arrays.index_of_id(50)
+        with self.assertRaises(KeyError):
+            self.arrays.index_of_id("10")
+
+    def test_topology(self):
+        topology = self.arrays.topology
+        self.assertIs(topology, self.arrays.topology)
+        self.assertEqual(topology.root_indices.tolist(), [0])
+        self.assertEqual(topology.leaf_indices().tolist(), [1, 3])
+        self.assertEqual(topology.branching_indices([SOMA]).tolist(), [0])
+        self.assertEqual(topology.indices_of_types([AXON, SOMA]).tolist(), [1, 2, 3, 0])
+        self.assertTrue(topology.has_type(AXON))
+        self.assertFalse(topology.has_type(APICAL_DENDRITE))
+
+    def test_small_traversals(self):
+        # a long axon, with a short side branch from each of its nodes
+        num_spine = 50_000
+        spine = np.arange(num_spine)
+        arrays = MorphologyArrays(
+            ids=np.arange(2 * num_spine),
+            parent_ids=np.concatenate([spine - 1, spine]),
+            types=np.full(2 * num_spine, AXON),
+            xyz=np.zeros((2 * num_spine, 3))
+        )
+        topology = arrays.topology
+
+        start = time.perf_counter()
+        topology.forest_order()
+        full = time.perf_counter() - start
+
+        # after the child index is first converted, traversals of the side
+        # branches should take time proportional to their own size, not that
+        # of the whole reconstruction
+        topology.traversal_order(0, node_types=[AXON])
+        start = time.perf_counter()
+        for branch in range(num_spine, num_spine + 500):
+            self.assertEqual(topology.traversal_order(branch).tolist(), [branch])
+            self.assertEqual(
+                topology.traversal_order(branch, node_types=[AXON]).tolist(),
+                [branch]
+            )
+        self.assertLess(time.perf_counter() - start, full)
+
+    def test_reset_index(self):
+        topology = self.arrays.topology
+        self.arrays.types[3] = APICAL_DENDRITE
+        self.arrays.reset_index()
+        self.assertIsNot(topology, self.arrays.topology)
+        self.assertTrue(self.arrays.topology.has_type(APICAL_DENDRITE))
+
+    def test_clone_copies_on_write(self):
+        topology = self.arrays.topology
+        clone = self.arrays.clone()
+        self.assertIs(clone.parent_index, self.arrays.parent_index)
+        self.assertIs(clone.topology, topology)
+
+        clone.writable("xyz")[0, 0] = 5
+        self.assertEqual(self.arrays.xyz[0, 0], 0)
+        self.assertIs(clone.radius, self.arrays.radius)
+
+        self.arrays.writable("types")[3] = APICAL_DENDRITE
+        self.arrays.reset_index()
+        self.assertEqual(clone.types[3], AXON)
+        self.assertFalse(clone.topology.has_type(APICAL_DENDRITE))
+
+    def test_set_column(self):
+        topology = self.arrays.topology
+        self.arrays.set_column("radius", [1, 2, 3, 4])
+        self.assertIs(topology, self.arrays.topology)
+        self.arrays.set_column("parent_ids", [-1, 10, 10, 30])
+        self.assertEqual(self.arrays.parent_index.tolist(), [-1, 0, 0, 1])
+
+    def test_spatial_index(self):
+        self.arrays.writable("xyz")[:, 0] = [0, 1, 2, 3]
+        index = self.arrays.spatial_index([AXON])
+        self.assertIs(index, self.arrays.spatial_index([AXON]))
+
+        nearest = index.nearest([[0.1, 0, 0], [2.6, 0, 0]])
+        self.assertEqual(nearest.index.tolist(), [1, 3])
+        self.assertTrue(np.allclose(nearest.distance, [0.9, 0.4]))
+
+        nearest = index.nearest([0, 0, 0], k=2, tolerance=2)
+        self.assertEqual(nearest.index.tolist(), [1, 2])
+        self.assertEqual(index.nearest([9, 0, 0], tolerance=1).index, -1)
+
+        self.assertEqual(index.within([1.5, 0, 0], 0.5).tolist(), [1, 2])
+        self.assertEqual(
+            [found.tolist() for found in index.within([[0, 0, 0], [3, 0, 0]], 0)],
+            [[], [3]]
+        )
+
+        self.arrays.set_column("xyz", np.ones((4, 3)))
+        self.assertIsNot(index, self.arrays.spatial_index([AXON]))
+
+    def test_content_hash(self):
+        digest = self.arrays.content_hash()
+        self.assertEqual(digest, self.arrays.content_hash())
+
+        reordered = MorphologyArrays(
+            ids=[40, 10, 20, 30],
+            parent_ids=[20, -1, 10, 10],
+            types=[AXON, SOMA, AXON, AXON],
+            xyz=np.zeros((4, 3))
+        )
+        self.assertEqual(digest, reordered.content_hash())
+
+        clone = self.arrays.clone()
+        self.assertEqual(digest, clone.content_hash())
+        clone.writable("radius")[0] = 2
+        self.assertNotEqual(digest, clone.content_hash())
+        self.assertEqual(digest, self.arrays.content_hash())
+
+        self.arrays.set_column("parent_ids", [-1, 10, 10, 30])
+        self.assertNotEqual(digest, self.arrays.content_hash())
+
+    def test_morphology_content_hash(self):
+        morphology = Morphology.from_arrays(self.arrays)
+        digest = morphology.content_hash()
+        self.assertEqual(digest, self.arrays.content_hash())
+
+        for node in morphology.nodes():
+            node["z"] = 2 * node["z"] + 1
+        self.assertNotEqual(digest, morphology.content_hash())
+
+        for node in morphology.nodes():
+            node["z"] = (node["z"] - 1) / 2
+        self.assertEqual(digest, morphology.content_hash())
+
+        morphology.nodes()[0]["radius"] = 3
+        self.assertNotEqual(digest, morphology.content_hash())
+
+    def test_duplicate_ids(self):
+        arrays = MorphologyArrays(
+            ids=[1, 3, 3], parent_ids=[-1, 1, 1], types=[1, 2, 2],
+            xyz=np.zeros((3, 3))
+        )
+        with self.assertRaises(ValueError):
+            arrays.parent_index
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            MorphologyArrays(
+                ids=[1, 2], parent_ids=[-1], types=[1, 2],
+                xyz=np.zeros((2, 3))
+            )
+
+
+class TestArrayMorphology(unittest.TestCase):
+
+    def setUp(self):
+        self.dict_backed = test_morphology_large()
+        self.morphology = ArrayMorphology.from_morphology(self.dict_backed)
+
+    def test_len(self):
+        self.assertEqual(len(self.morphology), 17)
+
+    def test_nodes(self):
+        self.assertEqual(self.dict_backed.nodes(), self.morphology.nodes())
+
+    def test_node_by_id(self):
+        expected = test_node(id=4, type=BASAL_DENDRITE, x=460, y=660, z=30, radius=3, parent_node_id=3)
+        self.assertEqual(expected, self.morphology.node_by_id(4))
+
+    def test_node_values_are_python_scalars(self):
+        node = self.morphology.node_by_id(1)
+        self.assertIs(node["type"], SOMA)
+        self.assertIsInstance(node["id"], int)
+        self.assertIsInstance(node["x"], float)
+
+    def test_children_of(self):
+        root = self.morphology.get_root()
+        self.assertEqual(
+            [child["id"] for child in self.morphology.children_of(root)],
+            [2, 6, 12]
+        )
+
+    def test_parent_of(self):
+        node = self.morphology.node_by_id(13)
+        self.assertEqual(self.morphology.parent_of(node)["id"], 12)
+        self.assertIsNone(self.morphology.parent_of(self.morphology.get_root()))
+
+    def test_get_node_by_types(self):
+        obtained = self.morphology.get_node_by_types([AXON, BASAL_DENDRITE])
+        expected = self.dict_backed.get_node_by_types([AXON, BASAL_DENDRITE])
+        self.assertEqual(expected, obtained)
+
+    def test_get_compartments(self):
+        self.assertEqual(
+            self.dict_backed.compartments, self.morphology.compartments)
+        self.assertEqual(
+            self.dict_backed.get_compartments(None, [AXON]),
+            self.morphology.get_compartments(None, [AXON])
+        )
+
+    def test_get_compartment_for_node(self):
+        node = self.morphology.node_by_id(3)
+        compartment = self.morphology.get_compartment_for_node(node)
+        self.assertEqual([compartment[0]["id"], compartment[1]["id"]], [2, 3])
+        self.assertIsNone(self.morphology.get_compartment_for_node(
+            self.morphology.get_root()))
+
+    def test_get_dimensions(self):
+        self.assertEqual(
+            self.dict_backed.get_dimensions([AXON]),
+            self.morphology.get_dimensions([AXON])
+        )
+        self.assertIsNone(self.morphology.get_dimensions([10]))
+
+    def test_get_segment_list(self):
+        self.assertEqual(
+            self.dict_backed.get_segment_list(),
+            self.morphology.get_segment_list()
+        )
+
+    def test_leaf_and_branching_nodes(self):
+        dict_backed = test_morphology_small_branching()
+        morphology = ArrayMorphology.from_morphology(dict_backed)
+        self.assertEqual(
+            dict_backed.get_leaf_nodes(), morphology.get_leaf_nodes())
+        self.assertEqual(
+            dict_backed.get_branching_nodes([BASAL_DENDRITE]),
+            morphology.get_branching_nodes([BASAL_DENDRITE])
+        )
+
+    def test_multiple_trees(self):
+        dict_backed = test_morphology_small_multiple_trees()
+        morphology = ArrayMorphology.from_morphology(dict_backed)
+        self.assertEqual(dict_backed.get_roots(), morphology.get_roots())
+        self.assertEqual(dict_backed.get_tree_list(), morphology.get_tree_list())
+
+    def test_set_node_value(self):
+        node = self.morphology.node_by_id(5)
+        node["x"] = 12.5
+        node["layer"] = "2/3"
+        self.assertEqual(self.morphology.arrays.xyz[4, 0], 12.5)
+        self.assertEqual(self.morphology.node_by_id(5)["layer"], "2/3")
+        self.assertIsNone(self.morphology.node_by_id(4)["layer"])
+
+    def test_set_node_type_updates_topology(self):
+        self.assertFalse(self.morphology.has_type(CUT_DENDRITE))
+        self.morphology.node_by_id(5)["type"] = CUT_DENDRITE
+        self.assertEqual(
+            [node["id"] for node in self.morphology.get_node_by_types([CUT_DENDRITE])],
+            [5]
+        )
+
+    def test_clone(self):
+        clone = self.morphology.clone()
+        self.assertTrue(np.shares_memory(clone.arrays.xyz, self.morphology.arrays.xyz))
+
+        clone.node_by_id(5)["x"] = 12.5
+        self.assertEqual(clone.node_by_id(5)["x"], 12.5)
+        self.assertEqual(self.morphology.node_by_id(5)["x"], 490)
+        self.assertTrue(np.shares_memory(clone.arrays.types, self.morphology.arrays.types))
+
+    def test_cannot_set_id(self):
+        with self.assertRaises(ValueError):
+            self.morphology.node_by_id(5)["id"] = 100
+
+    def test_breadth_first_traversal(self):
+        visited = []
+        self.morphology.breadth_first_traversal(
+            lambda node: visited.append(node["id"]))
+        self.assertEqual(sorted(visited), list(range(1, 18)))
+
+    def test_from_columns(self):
+        morphology = ArrayMorphology.from_columns(
+            ids=[1, 2, 3],
+            types=[SOMA, AXON, AXON],
+            x=[0, 1, 2], y=[0, 0, 0], z=[0, 0, 0],
+            radius=[1, 1, 1],
+            parent=[-1, 1, 2],
+            layer=["1", "1", "2/3"]
+        )
+        self.assertEqual(morphology.node_by_id(3)["layer"], "2/3")
+        self.assertEqual(morphology.get_leaf_nodes()[0]["id"], 3)
+
+    def test_pickle(self):
+        unpickled = pickle.loads(pickle.dumps(self.morphology))
+        self.assertEqual(self.morphology.nodes(), unpickled.nodes())
+
+    def test_smaller_than_dict_backed(self):
+        # each node dict costs hundreds of bytes; arrays cost tens
+        self.assertLess(self.morphology.arrays.nbytes, 100 * len(self.morphology))
+
+
+class TestMorphologyArraysProperty(unittest.TestCase):
+
+    def test_content_hash(self):
+        morphology = test_morphology_large()
+        array_backed = ArrayMorphology.from_morphology(morphology)
+        self.assertEqual(morphology.content_hash(), array_backed.content_hash())
+        self.assertNotEqual(
+            morphology.content_hash(), test_morphology_small().content_hash())
+
+        array_backed.node_by_id(5)["x"] = 0
+        self.assertNotEqual(morphology.content_hash(), array_backed.content_hash())
+
+    def test_arrays_cached_and_invalidated(self):
+        morphology = test_morphology_small()
+        arrays = morphology.arrays
+        self.assertIs(arrays, morphology.arrays)
+        self.assertEqual(arrays.ids.tolist(), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(arrays.parent_index.tolist(), [-1, 0, 1, 0, 3, 0, 5])
+
+        morphology.invalidate_caches()
+        self.assertIsNot(arrays, morphology.arrays)
+
+
+class TestMorphologyView(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = test_morphology_large()
+
+    def test_view_nodes(self):
+        view = self.morphology.view([AXON, APICAL_DENDRITE])
+        self.assertEqual(len(view), 12)
+        self.assertEqual(
+            [node["id"] for node in view.get_roots()], [6, 12])
+        self.assertEqual(
+            [node["id"] for node in view.get_leaf_nodes()], [17, 11])
+        self.assertIsNone(view.parent_of(view.node_by_id(12)))
+        self.assertEqual(view.parent_of(view.node_by_id(13))["id"], 12)
+        with self.assertRaises(KeyError):
+            view.node_by_id(2)
+
+    def test_children_of_node_outside_view(self):
+        view = self.morphology.view([AXON])
+        soma = self.morphology.get_soma()
+        self.assertEqual([node["id"] for node in view.children_of(soma)], [12])
+
+    def test_traversal_order(self):
+        view = self.morphology.view([BASAL_DENDRITE, AXON])
+        self.assertEqual(
+            self.morphology.arrays.ids[view.traversal_order()].tolist(),
+            [2, 3, 4, 5, 12, 13, 14, 15, 16, 17]
+        )
+        self.assertEqual(
+            view.traversal_order(start_id=1).tolist(),
+            self.morphology.traversal_order(
+                start_id=1, node_types=[BASAL_DENDRITE, AXON]).tolist()
+        )
+
+    def test_compartment_geometry(self):
+        obtained = self.morphology.view([AXON]).get_compartment_geometry()
+        expected = self.morphology.get_compartment_geometry([AXON])
+        self.assertTrue(np.allclose(obtained.length, expected.length))
+        self.assertEqual(obtained.child_index.tolist(), expected.child_index.tolist())
+
+    def test_shares_storage_and_cached(self):
+        arrays = self.morphology.arrays
+        view = self.morphology.view([AXON])
+        self.assertIs(view.arrays.xyz, arrays.xyz)
+        self.assertIs(view.arrays, self.morphology.view([AXON]).arrays)
+
+        self.morphology.invalidate_caches()
+        self.assertIsNot(view.arrays, self.morphology.view([AXON]).arrays)
+
+    def test_array_morphology(self):
+        morphology = ArrayMorphology.from_morphology(self.morphology)
+        view = morphology.view([APICAL_DENDRITE])
+        self.assertEqual(
+            [node["id"] for node in view.nodes()], list(range(6, 12)))
+
+        morphology.node_by_id(8)["type"] = AXON
+        view = morphology.view([APICAL_DENDRITE])
+        self.assertEqual(
+            [node["id"] for node in view.get_roots()], [6, 9])
+
+
+class TestNodeOrders(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = test_morphology_small_branching()
+
+    def test_orders(self):
+        orders = self.morphology.node_orders()
+        self.assertEqual(
+            orders.branch_order.tolist(), [0] + [1, 1, 2, 2] * 3)
+        self.assertEqual(
+            orders.centrifugal_order.tolist(), [0] + [1, 1, 2, 2] * 3)
+        self.assertEqual(
+            orders.strahler_order.tolist(), [3] + [2, 2, 1, 1] * 3)
+        self.assertEqual(
+            orders.subtree_size.tolist(), [13] + [4, 3, 1, 1] * 3)
+        self.assertAlmostEqual(
+            orders.subtree_length[1], 20 + np.sqrt(125))
+        self.assertEqual(orders.subtree_length[3], 0)
+
+    def test_view_orders(self):
+        orders = self.morphology.node_orders([BASAL_DENDRITE])
+        self.assertEqual(
+            orders.branch_order[:5].tolist(), [-1, 0, 1, 2, 2])
+        self.assertEqual(
+            orders.centrifugal_order[:5].tolist(), [-1, 0, 0, 1, 1])
+        self.assertEqual(orders.subtree_size[:6].tolist(), [0, 4, 3, 1, 1, 0])
+
+    def test_cached(self):
+        orders = self.morphology.node_orders()
+        self.assertIs(orders, self.morphology.node_orders())
+
+        self.morphology.arrays.writable("xyz")
+        self.assertIsNot(orders, self.morphology.node_orders())
+
+
+class TestAncestryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = test_morphology_small_branching()
+
+    def test_lowest_common_ancestor(self):
+        morphology = self.morphology
+        node = morphology.node_by_id
+        self.assertEqual(
+            morphology.lowest_common_ancestor(node(4), node(5))["id"], 3)
+        self.assertEqual(
+            morphology.lowest_common_ancestor(node(4), node(8))["id"], 1)
+        self.assertEqual(
+            morphology.lowest_common_ancestor(node(2), node(5))["id"], 2)
+        self.assertEqual(
+            morphology.lowest_common_ancestor(node(9), node(9))["id"], 9)
+
+    def test_path_distance(self):
+        morphology = self.morphology
+        node = morphology.node_by_id
+        self.assertAlmostEqual(
+            morphology.path_distance(node(4), node(5)), 10 + np.sqrt(125))
+        self.assertAlmostEqual(morphology.path_distance(node(2), node(4)), 20)
+        self.assertEqual(morphology.path_distance(node(4), node(4)), 0)
+
+    def test_pairwise(self):
+        morphology = self.morphology
+        tips = morphology.get_leaf_nodes()
+        obtained = morphology.path_distances(tips)
+        self.assertEqual(obtained.shape, (6, 6))
+        for (i, a), (j, b) in itertools.product(enumerate(tips), repeat=2):
+            self.assertAlmostEqual(
+                obtained[i, j], morphology.path_distance(a, b))
+
+    def test_separate_trees(self):
+        morphology = test_morphology_small_multiple_trees()
+        node = morphology.node_by_id
+        self.assertIsNone(morphology.lowest_common_ancestor(node(2), node(9)))
+        self.assertEqual(morphology.path_distance(node(2), node(9)), np.inf)
+        self.assertEqual(
+            morphology.arrays.ancestry.depth.tolist(),
+            [0, 1, 1, 1, 0, 1, 2, 3, 4]
+        )
+
+
+class TestSubtreeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.arrays = MorphologyArrays(
+            ids=[40, 10, 30, 20],
+            parent_ids=[20, -1, 10, 10],
+            types=[AXON, SOMA, AXON, AXON],
+            xyz=np.zeros((4, 3))
+        )
+        self.values = np.array([1, 2, 3, 4])
+
+    def test_order(self):
+        subtrees = self.arrays.subtrees
+        self.assertEqual(subtrees.order.tolist(), [1, 2, 3, 0])
+        self.assertEqual(subtrees.position.tolist(), [3, 0, 1, 2])
+        self.assertEqual(subtrees.size.tolist(), [1, 4, 1, 2])
+
+    def test_sum(self):
+        subtrees = self.arrays.subtrees
+        self.assertEqual(subtrees.sum(self.values).tolist(), [1, 10, 3, 5])
+        self.assertEqual(
+            subtrees.sum(self.values, include_self=False).tolist(),
+            [0, 8, 0, 1]
+        )
+        self.assertEqual(
+            subtrees.count(self.arrays.topology.is_leaf).tolist(),
+            [1, 2, 1, 1]
+        )
+
+    def test_max_min(self):
+        subtrees = self.arrays.subtrees
+        self.assertEqual(subtrees.max(self.values).tolist(), [1, 4, 3, 4])
+        self.assertEqual(
+            subtrees.max(self.values, include_self=False).tolist(),
+            [-np.inf, 4, -np.inf, 1]
+        )
+        self.assertEqual(subtrees.min(self.values).tolist(), [1, 1, 3, 1])
+
+    def test_deep_chain(self):
+        # reductions over a long unbranched chain (where subtrees are nested
+        # as deeply as possible) should take time linear in its length
+        elapsed = []
+        for num_nodes in (25_000, 200_000):
+            arrays = MorphologyArrays(
+                ids=np.arange(num_nodes),
+                parent_ids=np.arange(num_nodes) - 1,
+                types=np.full(num_nodes, AXON),
+                xyz=np.zeros((num_nodes, 3))
+            )
+            values = np.random.default_rng(0).permutation(num_nodes)
+            subtrees = arrays.subtrees
+
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                obtained = subtrees.max(values)
+                timings.append(time.perf_counter() - start)
+            elapsed.append(min(timings))
+
+            expected = np.maximum.accumulate(values[::-1])[::-1]
+            self.assertEqual(obtained.tolist(), expected.tolist())
+            self.assertEqual(
+                subtrees.min(values, include_self=False)[:-1].tolist(),
+                np.minimum.accumulate(values[::-1])[::-1][1:].tolist()
+            )
+
+        # 8 times as many nodes; quadratic scaling would take ~64 times as
+        # long
+        self.assertLess(elapsed[1], 24 * elapsed[0])
+
+    def test_ancestor_sum(self):
+        subtrees = self.arrays.subtrees
+        self.assertEqual(
+            subtrees.ancestor_sum(self.values).tolist(), [7, 2, 5, 6])
+        self.assertEqual(
+            subtrees.ancestor_sum(self.values, include_self=False).tolist(),
+            [6, 0, 2, 2]
+        )
+
+    def test_in_preorder(self):
+        reordered = self.arrays.in_preorder()
+        self.assertEqual(reordered.ids.tolist(), [10, 30, 20, 40])
+        self.assertEqual(reordered.parent_index.tolist(), [-1, 0, 0, 2])
+        self.assertEqual(reordered.subtrees.order.tolist(), [0, 1, 2, 3])
+
+        renumbered = self.arrays.in_preorder(renumber=True)
+        self.assertEqual(renumbered.ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(renumbered.parent_ids.tolist(), [-1, 1, 1, 3])
+
+    def test_morphology_in_preorder(self):
+        morphology = ArrayMorphology(self.arrays, extra_columns={
+            "layer": ["a", "b", "c", "d"]})
+        for candidate in (morphology, test_morphology_large()):
+            reordered = candidate.in_preorder(renumber=True)
+            self.assertIsInstance(reordered, type(candidate))
+            self.assertEqual(
+                reordered.arrays.subtrees.order.tolist(),
+                list(range(len(candidate)))
+            )
+            self.assertEqual(
+                reordered.content_hash(),
+                candidate.arrays.in_preorder(renumber=True).content_hash()
+            )
+
+        self.assertEqual(
+            [node["layer"] for node in morphology.in_preorder().nodes()],
+            ["b", "c", "d", "a"]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.morphology_builder import (
+    MorphologyBuilder, NeuriteStatistics)
 from neuron_morphology.constants import (
     SOMA, AXON, APICAL_DENDRITE, BASAL_DENDRITE)
 
@@ -40,4 +41,53 @@ class TestMorphologyBuilder(unittest.TestCase):
 
         roots = morphology.get_roots()
         self.assertEqual(roots[1]["parent"], -1)
-        self.assertEqual(morphology.nodes()[-1]["parent"], 2)
\ No newline at end of file
+        self.assertEqual(morphology.nodes()[-1]["parent"], 2)
+
+
+class TestBulkMorphologyBuilder(unittest.TestCase):
+
+    def test_add_arrays(self):
+        morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .add_arrays(
+                        parent_index=[-1, 0, 1, 1],
+                        xyz=[[0, 0, 1], [0, 0, 2], [0, 0, 3], [0, 1, 3]],
+                        types=AXON
+                    )
+                    .basal_dendrite(1, 0, 0)
+                .build()
+        )
+
+        self.assertEqual(len(morphology), 6)
+        self.assertEqual(morphology.node_by_id(1)["parent"], 0)
+        self.assertEqual(morphology.node_by_id(4)["parent"], 2)
+        self.assertEqual(morphology.node_by_id(5)["type"], BASAL_DENDRITE)
+        self.assertEqual(morphology.node_by_id(5)["parent"], 0)
+        self.assertEqual(
+            [node["id"] for node in morphology.get_branching_nodes()], [2])
+
+    def test_add_arrays_bad_parent(self):
+        with self.assertRaises(ValueError):
+            MorphologyBuilder().add_arrays([-1, 2], [[0, 0, 0], [0, 0, 1]], AXON)
+
+    def test_random_neurites(self):
+        statistics = {
+            AXON: NeuriteStatistics(num_stems=1, max_branch_order=4),
+            BASAL_DENDRITE: NeuriteStatistics(
+                num_stems=5, bifurcation_probability=0, mean_branch_length=10)
+        }
+
+        morphology = MorphologyBuilder().root().random_neurites(
+            statistics, seed=4).build(array_backed=True)
+        again = MorphologyBuilder().root().random_neurites(
+            statistics, seed=4).build()
+
+        self.assertEqual(len(morphology), len(again))
+        self.assertEqual(morphology.nodes(), again.nodes())
+        self.assertEqual(len(morphology.get_roots()), 1)
+        self.assertEqual(
+            len(morphology.get_children(morphology.get_root(), [BASAL_DENDRITE])), 5)
+        self.assertEqual(len(morphology.get_branching_nodes([BASAL_DENDRITE])), 0)
+        self.assertLessEqual(max(morphology.get_branch_order_for_node(node)
+            for node in morphology.get_leaf_nodes([AXON])), 5)
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+from neuron_morphology.constants import (
+    AXON, BASAL_DENDRITE, APICAL_DENDRITE)
+from neuron_morphology.morphology_builder import (
+    MorphologyBuilder, NeuriteStatistics)
+from neuron_morphology.morphology_collection import (
+    MorphologyCollection, segment_sum, segment_extrema)
+from neuron_morphology.feature_extractor.data import Data
+from neuron_morphology.feature_extractor.mark import RequiresApical
+from neuron_morphology.feature_extractor.feature_extractor import \
+    FeatureExtractor
+from neuron_morphology.feature_extractor.feature_writer import (
+    FeatureWriter, DEFAULT_FEATURE_FORMATTERS)
+from neuron_morphology.features.default_features import default_features
+from neuron_morphology.features.batched import BATCHED_KERNELS, base_function
+
+
+class TestMorphologyCollection(unittest.TestCase):
+
+    def setUp(self):
+        statistics = {
+            AXON: NeuriteStatistics(num_stems=1, max_branch_order=4),
+            BASAL_DENDRITE: NeuriteStatistics(num_stems=3, max_branch_order=3),
+            APICAL_DENDRITE: NeuriteStatistics(num_stems=1)
+        }
+
+        self.morphologies = {
+            "random": MorphologyBuilder().root().random_neurites(
+                statistics, seed=7).build(),
+
+            # has no axon or apical dendrite
+            "dendritic": (
+                MorphologyBuilder()
+                    .root(0, 0, 0)
+                        .basal_dendrite(0, 2, 0)
+                            .basal_dendrite(1, 3, 0).up()
+                            .basal_dendrite(-1, 3, 1).up(2)
+                        .basal_dendrite(0, -2, 0)
+                    .build()
+            ),
+
+            # has two roots
+            "forest": (
+                MorphologyBuilder()
+                    .root(1, 1, 1)
+                        .axon(1, 2, 1)
+                            .axon(1, 3, 1).up(2)
+                    .root(4, 4, 4)
+                        .basal_dendrite(4, 5, 4)
+                            .basal_dendrite(5, 6, 4).up()
+                            .basal_dendrite(3, 6, 4)
+                    .build()
+            )
+        }
+        self.collection = MorphologyCollection.from_morphologies(
+            self.morphologies)
+
+    def test_getitem(self):
+        for cell, (identifier, morphology) in enumerate(self.collection):
+            self.assertEqual(identifier, self.collection.identifiers[cell])
+            self.assertEqual(
+                morphology.nodes(), self.morphologies[identifier].nodes())
+
+    def test_parent_index(self):
+        forest = self.collection.offsets[2]
+        self.assertEqual(
+            self.collection.parent_index[forest: forest + 3].tolist(),
+            [-1, forest, forest + 1]
+        )
+        self.assertEqual(
+            self.collection.num_roots().tolist(), [1, 1, 2])
+
+    def test_has_type(self):
+        self.assertEqual(
+            self.collection.has_type(AXON).tolist(),
+            [True, False, True]
+        )
+
+    def test_duplicate_identifiers(self):
+        arrays = self.morphologies["dendritic"].arrays
+        with self.assertRaises(ValueError):
+            MorphologyCollection(["a", "a"], [arrays, arrays])
+
+    def test_segment_reductions(self):
+        cells = np.array([0, 0, 2, 2, 2])
+        values = np.array([1.0, 3.0, -1.0, 5.0, 2.0])
+
+        self.assertEqual(
+            segment_sum(cells, values, 4).tolist(), [4.0, 0.0, 6.0, 0.0])
+
+        minima, maxima = segment_extrema(cells, values, 4)
+        np.testing.assert_equal(minima, [1.0, np.nan, -1.0, np.nan])
+        np.testing.assert_equal(maxima, [3.0, np.nan, 5.0, np.nan])
+
+    def test_extract_collection(self):
+        extractor = FeatureExtractor(default_features)
+
+        # mean_fragmentation divides by zero on some of these morphologies
+        extractor.features = [
+            feature for feature in extractor.features
+            if "mean_fragmentation" not in feature.name
+        ]
+        self.assertTrue(any(
+            base_function(feature) in BATCHED_KERNELS
+            for feature in extractor.features
+        ))
+
+        with warnings.catch_warnings(), \
+                tempfile.TemporaryDirectory() as tmp:
+            warnings.simplefilter("ignore")
+
+            writer = FeatureWriter(
+                os.path.join(tmp, "heavy.h5"),
+                formatters=DEFAULT_FEATURE_FORMATTERS
+            )
+            for identifier, morphology in self.morphologies.items():
+                writer.add_run(
+                    identifier, extractor.extract(Data(morphology)).serialize())
+            expected = writer.build_output_table()
+
+            obtained = extractor.extract_collection(
+                self.collection).build_output_table()
+
+        self.assertEqual(list(obtained.columns), list(expected.columns))
+        self.assertEqual(list(obtained.index), list(expected.index))
+
+        for column in expected.columns:
+            for identifier in expected.index:
+                np.testing.assert_allclose(
+                    np.asarray(obtained.at[identifier, column], dtype=float),
+                    np.asarray(expected.at[identifier, column], dtype=float),
+                    rtol=1e-9,
+                    atol=1e-9,
+                    err_msg=f"{column} of {identifier}"
+                )
+
+    def test_required_marks(self):
+        extractor = FeatureExtractor(default_features)
+        with self.assertRaises(ValueError):
+            extractor.extract_collection(
+                self.collection, required_marks={RequiresApical})
+
+
+if __name__ == "__main__":
+    unittest.main()
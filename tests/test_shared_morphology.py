@@ -0,0 +1,99 @@
+import unittest
+import pickle
+import multiprocessing as mp
+
+import numpy as np
+
+from neuron_morphology.constants import SOMA, AXON, BASAL_DENDRITE
+from neuron_morphology.morphology_builder import MorphologyBuilder
+from neuron_morphology.shared_morphology import SharedMorphology
+from neuron_morphology.feature_extractor.run_feature_extraction import \
+    setup_data
+
+
+def _worker_summary(handle):
+    morphology = handle.load()
+    return (
+        morphology.content_hash(),
+        len(morphology.get_leaf_nodes()),
+        [node["id"] for node in morphology.get_roots()]
+    )
+
+
+class TestSharedMorphology(unittest.TestCase):
+
+    def setUp(self):
+        self.morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0)
+                    .axon(0, 0, 1)
+                        .axon(0, 0, 2).up()
+                        .axon(0, 1, 1).up(2)
+                    .basal_dendrite(1, 0, 0)
+                        .basal_dendrite(2, 0, 0)
+                .build()
+        )
+
+    def test_pickle(self):
+        unpickled = pickle.loads(pickle.dumps(self.morphology))
+        self.assertEqual(self.morphology.nodes(), unpickled.nodes())
+        self.assertEqual(
+            self.morphology.content_hash(), unpickled.content_hash())
+        self.assertEqual(
+            unpickled.parent_of(unpickled.node_by_id(1))["id"], 0)
+
+    def test_load(self):
+        with SharedMorphology(self.morphology) as shared:
+            loaded = pickle.loads(pickle.dumps(shared.handle)).load()
+
+            self.assertEqual(
+                self.morphology.content_hash(), loaded.content_hash())
+            self.assertEqual(
+                [node["id"] for node in loaded.get_leaf_nodes()],
+                [node["id"] for node in self.morphology.get_leaf_nodes()]
+            )
+            self.assertFalse(loaded.arrays.xyz.flags.writeable)
+
+    def test_modify_loaded(self):
+        with SharedMorphology(self.morphology) as shared:
+            first = shared.handle.load()
+            second = shared.handle.load()
+
+            first.set_coordinates(
+                first.arrays.xyz + 1, first.arrays.ids)
+            self.assertTrue(np.allclose(second.arrays.xyz[0], [0, 0, 0]))
+            self.assertTrue(np.allclose(first.arrays.xyz[0], [1, 1, 1]))
+
+    def test_setup_data(self):
+        with SharedMorphology(self.morphology) as shared:
+            identifier, data = setup_data(
+                {"identifier": "a", "morphology": shared.handle}, {})
+            self.assertEqual(identifier, "a")
+            self.assertEqual(
+                len(data.morphology.get_node_by_types([BASAL_DENDRITE])), 2)
+
+    def test_pool(self):
+        with SharedMorphology(self.morphology) as shared:
+            with mp.get_context("spawn").Pool(2) as pool:
+                obtained = pool.map(_worker_summary, [shared.handle] * 2)
+
+        self.assertEqual(obtained[0], obtained[1])
+        self.assertEqual(obtained[0][0], self.morphology.content_hash())
+        self.assertEqual(obtained[0][1:], (3, [0]))
+
+    def test_string_ids(self):
+        morphology = (
+            MorphologyBuilder()
+                .root(0, 0, 0, SOMA)
+                    .child(0, 0, 1, AXON)
+                .build()
+        )
+        for node in morphology.nodes():
+            node["id"] = str(node["id"])
+        morphology = type(morphology)(
+            morphology.nodes(),
+            node_id_cb=lambda node: node["id"],
+            parent_id_cb=lambda node: str(node["parent"])
+        )
+        with self.assertRaises(ValueError):
+            SharedMorphology(morphology)
@@ -1,8 +1,11 @@
 import unittest
+import io
 import os
 import shutil
 import tempfile
 
+import numpy as np
+
 from neuron_morphology.morphology_builder import MorphologyBuilder
 import neuron_morphology.swc_io as swcio
 
@@ -45,3 +48,139 @@ class TestSWCIO(unittest.TestCase):
             self.assertEqual(int(line[-1]), -1)
             line = test_swc.readline().rstrip().split(' ')
             self.assertEqual(float(line[-1]), 0.0)
+
+    def test_morphology_from_swc_matches_dataframe(self):
+        morph = swcio.morphology_from_swc(self.swc_file)
+        expected = swcio.read_swc(self.swc_file).to_dict("records")
+        self.assertEqual(len(morph), len(expected))
+        for node in expected[:100]:
+            obtained = morph.node_by_id(int(node["id"]))
+            self.assertEqual(list(obtained), list(swcio.SWC_COLUMNS))
+            self.assertEqual(obtained, node)
+            self.assertIsInstance(obtained["parent"], int)
+
+    def test_read_swc_records(self):
+        path = os.path.join(self.test_dir, 'test.swc')
+        with open(path, 'w') as swc_file:
+            swc_file.write(
+                "# a comment\n"
+                "1.0 1 0 0 0 2.5 -1\n"
+                "2 3 1.5 0 0 1 1.0 # trailing comment\n"
+            )
+
+        records = swcio.read_swc_records(path)
+        self.assertEqual(records["id"].tolist(), [1, 2])
+        self.assertEqual(records["parent"].tolist(), [-1, 1])
+        self.assertEqual(records["x"].tolist(), [0.0, 1.5])
+        self.assertEqual(records.dtype, swcio.SWC_DTYPE)
+
+    def test_array_morphology_from_swc(self):
+        test_swc_path = os.path.join(self.test_dir, 'test.swc')
+        swcio.morphology_to_swc(self.morphology, test_swc_path)
+
+        morph = swcio.array_morphology_from_swc("file://" + test_swc_path)
+        self.assertEqual(morph.nodes(), self.morphology.nodes())
+
+    def test_binary_round_trip(self):
+        path = os.path.join(self.test_dir, 'test.npz')
+        swcio.morphology_to_swc(self.morphology, path)
+
+        morph = swcio.morphology_from_swc(path)
+        self.assertEqual(morph.nodes(), self.morphology.nodes())
+        self.assertIsInstance(morph.node_by_id(1)['id'], int)
+
+        array_morph = swcio.array_morphology_from_swc(path)
+        self.assertEqual(array_morph.nodes(), self.morphology.nodes())
+
+    def test_binary_copy_on_write(self):
+        path = os.path.join(self.test_dir, 'test.npz')
+        swcio.write_binary_morphology(self.morphology, path)
+
+        morph = swcio.array_morphology_from_swc(path)
+        morph.node_by_id(1)['x'] = 100.0
+        self.assertEqual(morph.node_by_id(1)['x'], 100.0)
+        self.assertEqual(swcio.read_binary_morphology(path).xyz[1, 0], 0.0)
+
+    def test_binary_compressed(self):
+        path = os.path.join(self.test_dir, 'test.npz')
+        arrays = self.morphology.arrays
+        np.savez_compressed(
+            path, format_version=np.array(1), id=arrays.ids,
+            type=arrays.types, xyz=arrays.xyz, radius=arrays.radius,
+            parent=arrays.parent_ids
+        )
+        morph = swcio.array_morphology_from_swc(path)
+        self.assertEqual(morph.nodes(), self.morphology.nodes())
+
+    def test_binary_unsupported_version(self):
+        path = os.path.join(self.test_dir, 'test.npz')
+        np.savez(path, format_version=np.array(swcio.BINARY_FORMAT_VERSION + 1))
+        with self.assertRaises(ValueError):
+            swcio.read_binary_morphology(path)
+
+    def test_morphologies_from_swc_many(self):
+        paths = []
+        for ii in range(5):
+            path = os.path.join(self.test_dir, f'test_{ii}.swc')
+            swcio.morphology_to_swc(self.morphology, path)
+            paths.append("file://" + path)
+        path = os.path.join(self.test_dir, 'test.npz')
+        swcio.morphology_to_swc(self.morphology, path)
+        paths.append(path)
+
+        loaded = dict(swcio.morphologies_from_swc_many(
+            paths, num_threads=2, batch_size=2))
+        self.assertEqual(set(loaded), set(paths))
+        for morph in loaded.values():
+            self.assertEqual(morph.nodes(), self.morphology.nodes())
+
+        loaded = list(swcio.morphologies_from_swc_many(
+            paths[:2], array_backed=True))
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded[0][1].arrays.ids.tolist(),
+                         self.morphology.arrays.ids.tolist())
+
+    def test_gzipped_swc(self):
+        path = os.path.join(self.test_dir, 'test.swc.gz')
+        swcio.morphology_to_swc(self.morphology, path, comments=["gzipped"])
+        with open(path, 'rb') as swc_file:
+            self.assertEqual(swc_file.read(2), swcio.GZIP_MAGIC)
+
+        self.assertEqual(
+            swcio.morphology_from_swc(path).nodes(), self.morphology.nodes())
+        self.assertEqual(
+            swcio.array_morphology_from_swc("file://" + path).nodes(),
+            self.morphology.nodes()
+        )
+        self.assertEqual(swcio.read_swc(path)["parent"].tolist()[:2], [-1, 0])
+
+        loaded = list(swcio.morphologies_from_swc_many(
+            ["file://" + path, self.swc_file]))
+        self.assertEqual(len(loaded), 2)
+
+    def test_write_swc_arrays_to_stream(self):
+        stream = io.StringIO()
+        swcio.write_swc_arrays(
+            self.morphology.arrays, stream, comments=["a", "b"], chunk_size=3)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[:3], ["# a", "# b", "0 1 0.0 0.0 0.0 1.0 -1"])
+        self.assertEqual(len(lines), 2 + len(self.morphology))
+
+        binary = io.BytesIO()
+        swcio.write_swc_arrays(self.morphology.arrays, binary, chunk_size=3)
+        self.assertEqual(
+            swcio.parse_swc_records(io.StringIO(binary.getvalue().decode())).tolist(),
+            swcio.parse_swc_records(io.StringIO(stream.getvalue())).tolist()
+        )
+
+    def test_write_swc_does_not_modify_data(self):
+        data = swcio.read_swc(self.swc_file).astype({"id": float})
+        path = os.path.join(self.test_dir, 'test.swc')
+        swcio.write_swc(data, path)
+        self.assertEqual(data["id"].dtype, float)
+        self.assertEqual(swcio.read_swc(path)["id"].tolist(), data["id"].astype(int).tolist())
+
+    def test_morphologies_from_swc_many_missing(self):
+        paths = [os.path.join(self.test_dir, 'missing.swc')]
+        with self.assertRaises(FileNotFoundError):
+            list(swcio.morphologies_from_swc_many(paths))
@@ -1,4 +1,7 @@
 import unittest
+
+import numpy as np
+
 from neuron_morphology.constants import *
 from neuron_morphology.morphology import Morphology
 from tests.objects import (test_node,
@@ -261,6 +264,27 @@ class TestTree(unittest.TestCase):
             places=6
         )
 
+    def test_get_compartment_geometry(self):
+
+        morphology = test_morphology_small()
+        geometry = morphology.get_compartment_geometry()
+        compartments = morphology.compartments
+
+        self.assertEqual(len(geometry.length), len(compartments))
+        for ii, compartment in enumerate(compartments):
+            self.assertEqual(morphology.arrays.ids[geometry.child_index[ii]], compartment[1]['id'])
+            self.assertAlmostEqual(geometry.length[ii], morphology.get_compartment_length(compartment))
+            self.assertAlmostEqual(geometry.surface_area[ii], morphology.get_compartment_surface_area(compartment))
+            self.assertAlmostEqual(geometry.volume[ii], morphology.get_compartment_volume(compartment))
+            self.assertEqual(geometry.midpoint[ii].tolist(), morphology.get_compartment_midpoint(compartment))
+
+    def test_get_compartment_geometry_with_types(self):
+
+        morphology = test_morphology_small()
+        geometry = morphology.get_compartment_geometry([AXON])
+        self.assertEqual(morphology.arrays.ids[geometry.parent_index].tolist(), [6])
+        self.assertEqual(morphology.arrays.ids[geometry.child_index].tolist(), [7])
+
     def test_get_compartment_midpoint(self):
 
         morphology = test_morphology_small()
@@ -287,6 +311,197 @@ class TestTree(unittest.TestCase):
                               for branching_node in branching_nodes]),
                          expected_branching_node_ids)
 
+    def test_get_node_by_types_order(self):
+
+        morphology = test_morphology_small()
+        nodes = morphology.get_node_by_types([AXON, BASAL_DENDRITE])
+        self.assertEqual([node['id'] for node in nodes], [6, 7, 2, 3])
+        self.assertEqual(morphology.get_node_by_types([CUT_DENDRITE]), [])
+
+    def test_topology_invalidated_by_build_intermediate_nodes(self):
+
+        morphology = test_morphology_small()
+        self.assertEqual(len(morphology.get_node_by_types([AXON])), 2)
+
+        def make_intermediates(child, parent, max_id):
+            if child['id'] != 7:
+                return []
+            return [test_node(id=max_id + 1, type=AXON, x=950, y=600, z=30,
+                              radius=3, parent_node_id=parent['id'])]
+
+        def set_parent(node, parent_id):
+            node['parent'] = parent_id
+
+        morphology.build_intermediate_nodes(make_intermediates, set_parent)
+
+        axon_nodes = morphology.get_node_by_types([AXON])
+        self.assertEqual([node['id'] for node in axon_nodes], [6, 7, 8])
+        self.assertEqual(
+            [node['id'] for node in morphology.get_leaf_nodes([AXON])], [7])
+        self.assertEqual(morphology.parent_of(axon_nodes[1])['id'], 8)
+
+        compartment = morphology.get_compartment_for_node(axon_nodes[1])
+        self.assertEqual([node['id'] for node in compartment], [8, 7])
+        compartment = morphology.get_compartment_for_node(axon_nodes[2])
+        self.assertEqual([node['id'] for node in compartment], [6, 8])
+        self.assertEqual(len(morphology.compartments), 7)
+
+
+    def test_traversal_order(self):
+
+        morphology = test_morphology_small()
+        ids = morphology.arrays.ids
+        self.assertEqual(ids[morphology.traversal_order('preorder')].tolist(),
+                         [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(ids[morphology.traversal_order('postorder')].tolist(),
+                         [3, 2, 5, 4, 7, 6, 1])
+        self.assertEqual(ids[morphology.traversal_order('breadth_first')].tolist(),
+                         [1, 2, 4, 6, 3, 5, 7])
+
+    def test_traversal_order_with_types(self):
+
+        morphology = test_morphology_small()
+        order = morphology.traversal_order('breadth_first', node_types=[AXON])
+        self.assertEqual(morphology.arrays.ids[order].tolist(), [1, 6, 7])
+        self.assertIs(order, morphology.traversal_order('breadth_first', node_types=[AXON]))
+
+        order = morphology.traversal_order('preorder', start_id=4)
+        self.assertEqual(morphology.arrays.ids[order].tolist(), [4, 5])
+
+    def test_batch_traversal(self):
+
+        morphology = test_morphology_small()
+        batches = []
+        morphology.batch_traversal(
+            lambda indices: batches.append(morphology.arrays.ids[indices].tolist()),
+            order='breadth_first', batch_size=3)
+        self.assertEqual(batches, [[1, 2, 4], [6, 3, 5], [7]])
+
+    def test_depth_first_traversal(self):
+
+        morphology = test_morphology_small()
+        visited = []
+        morphology.depth_first_traversal(lambda node: visited.append(node['id']))
+        self.assertEqual(visited, [1, 2, 3, 4, 5, 6, 7])
+
+
+    def test_clone(self):
+
+        morphology = test_morphology_small()
+        morphology.arrays
+        clone = morphology.clone()
+
+        clone.node_by_id(3)['x'] = 0
+        self.assertEqual(morphology.node_by_id(3)['x'], 400)
+        self.assertIs(clone.get_compartment_for_node(clone.node_by_id(3))[1],
+                      clone.node_by_id(3))
+
+        def make_intermediates(child, parent, max_id):
+            if child['id'] != 7:
+                return []
+            return [test_node(id=max_id + 1, type=AXON, x=950, y=600, z=30,
+                              radius=3, parent_node_id=parent['id'])]
+
+        def set_parent(node, parent_id):
+            node['parent'] = parent_id
+
+        clone.build_intermediate_nodes(make_intermediates, set_parent)
+        self.assertEqual(len(clone), 8)
+        self.assertEqual(len(morphology), 7)
+        self.assertEqual(morphology.parent_of(morphology.node_by_id(7))['id'], 6)
+        self.assertEqual(clone.parent_of(clone.node_by_id(7))['id'], 8)
+
+    def test_nearest_nodes(self):
+
+        morphology = test_morphology_large()
+        nearest = morphology.nearest_nodes([[931, 630, 40], [401, 600, 10]])
+        self.assertEqual(
+            [node['id'] for node in morphology.nodes_at(nearest.index)], [13, 2])
+
+        nearest = morphology.nearest_nodes([401, 600, 10], node_types=[AXON], tolerance=10)
+        self.assertEqual(nearest.index, -1)
+
+    def test_nodes_within(self):
+
+        morphology = test_morphology_large()
+        found = morphology.nodes_within([945, 645, 45], 25, node_types=[AXON])
+        self.assertEqual([node['id'] for node in found], [13, 14])
+
+    def test_resample(self):
+
+        morphology = test_morphology_large()
+        resampled = morphology.resample(10)
+
+        self.assertEqual(resampled.arrays.ids.tolist(), list(range(1, len(resampled) + 1)))
+        self.assertEqual(len(resampled.get_leaf_nodes()), 3)
+        self.assertEqual(len(resampled.get_roots()), 1)
+
+        geometry = resampled.get_compartment_geometry([AXON])
+        self.assertTrue(np.allclose(geometry.length[:-1], 10))
+        self.assertLessEqual(geometry.length[-1], 10)
+        self.assertEqual(
+            [resampled.node_by_id(1)[key] for key in ('x', 'y', 'z')], [800, 610, 30])
+
+        # the axon is straight, so is unchanged in length
+        original = morphology.get_compartment_geometry([AXON])
+        self.assertAlmostEqual(geometry.length.sum(), original.length.sum())
+
+    def test_resample_keep_original_nodes(self):
+
+        morphology = test_morphology_large()
+        resampled = morphology.resample(10, keep_original_nodes=True)
+        self.assertAlmostEqual(
+            resampled.get_compartment_geometry().length.sum(),
+            morphology.get_compartment_geometry().length.sum()
+        )
+
+        original = {tuple(node[key] for key in ('x', 'y', 'z')) for node in morphology.nodes()}
+        obtained = {tuple(node[key] for key in ('x', 'y', 'z')) for node in resampled.nodes()}
+        self.assertTrue(original.issubset(obtained))
+
+    def test_resample_with_branches(self):
+
+        morphology = test_morphology_small_branching()
+        resampled = morphology.resample(1)
+        self.assertEqual(
+            len(resampled.get_branching_nodes()), len(morphology.get_branching_nodes()))
+        self.assertEqual(
+            len(resampled.get_leaf_nodes()), len(morphology.get_leaf_nodes()))
+        with self.assertRaises(ValueError):
+            morphology.resample(0)
+
+    def test_resample_type_change(self):
+
+        # soma -> basal dendrite (x = 5 ... 20) -> axon (x = 30, 40)
+        nodes = [test_node(id=1, type=SOMA)]
+        for node_id, (node_type, x) in enumerate(
+            [(BASAL_DENDRITE, 5), (BASAL_DENDRITE, 10), (BASAL_DENDRITE, 15),
+             (BASAL_DENDRITE, 20), (AXON, 30), (AXON, 40)], 2
+        ):
+            nodes.append(test_node(
+                id=node_id, type=node_type, x=x, parent_node_id=node_id - 1))
+        morphology = Morphology(
+            nodes,
+            node_id_cb=lambda node: node['id'],
+            parent_id_cb=lambda node: node['parent']
+        )
+
+        resampled = morphology.resample(2.5)
+        obtained = sorted(
+            (node['x'], node['type']) for node in resampled.nodes())
+
+        # compartments crossing a change of type are kept as they are
+        self.assertEqual(
+            [x for x, _ in obtained if 0 < x < 5 or 20 < x < 30], [])
+        self.assertIn((20, BASAL_DENDRITE), obtained)
+        self.assertIn((30, AXON), obtained)
+
+        # while the rest of each section is resampled
+        self.assertIn((7.5, BASAL_DENDRITE), obtained)
+        self.assertIn((17.5, BASAL_DENDRITE), obtained)
+        self.assertIn((32.5, AXON), obtained)
+        self.assertEqual(len(resampled.get_leaf_nodes()), 1)
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestTree)
@@ -114,6 +114,34 @@ class TestAffine(unittest.TestCase):
             assert np.allclose([node['x'], node['y'], node['z']],
                                self.transformed_vector[node['id']])
 
+    def test_transform_morphology_clone(self):
+        transformed = (AffineTransform(self.array)
+                       .transform_morphology(self.morphology, clone=True))
+
+        for node in transformed.nodes():
+            assert np.allclose([node['x'], node['y'], node['z']],
+                               self.transformed_vector[node['id']])
+        for node in self.morphology.nodes():
+            assert np.allclose([node['x'], node['y'], node['z']],
+                               self.vector[node['id']])
+        assert np.allclose(transformed.arrays.xyz, self.transformed_vector)
+        assert np.allclose(self.morphology.arrays.xyz, self.vector)
+
+    def test_transform_morphology_modified_in_place(self):
+        self.morphology.arrays
+        for node in self.morphology.nodes():
+            node['z'] = 10.0 * node['id']
+
+        for clone in (True, False):
+            transformed = (AffineTransform(np.eye(4))
+                           .transform_morphology(self.morphology, clone=clone))
+            for node in transformed.nodes():
+                self.assertEqual(node['z'], 10.0 * node['id'])
+            self.assertEqual(
+                transformed.arrays.xyz[:, 2].tolist(),
+                [10.0 * node['id'] for node in transformed.nodes()]
+            )
+
 
 class TestAffineConstructors(unittest.TestCase):
 
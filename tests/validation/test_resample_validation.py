@@ -33,6 +33,18 @@ class TestResampleValidationFunctions(ValidationTestCase):
             self.assertNodeErrors(e.validation_errors, "The distance between two nodes should be less than 50px"
                                   , [[2, 3]])
 
+    def test_distance_between_connected_nodes_modified_in_place(self):
+        nodes = [test_node(id=1, type=SOMA, parent_node_id=-1),
+                 test_node(id=2, type=AXON, x=10, parent_node_id=1),
+                 test_node(id=3, type=AXON, x=20, parent_node_id=2)]
+        morphology = test_tree(nodes)
+        self.assertEqual(
+            rev.validate_distance_between_connected_nodes(morphology), [])
+
+        morphology.node_by_id(3)["x"] = 100
+        errors = rev.validate_distance_between_connected_nodes(morphology)
+        self.assertNodeErrors(errors, "The distance between two nodes should be less than 50px", [[2, 3]])
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestResampleValidationFunctions)